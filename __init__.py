@@ -62,6 +62,7 @@ if "measureit_arch_main" in locals():
     importlib.reload(measureit_arch_viewports)
     importlib.reload(measureit_arch_styles)
     importlib.reload(measureit_arch_views)
+    importlib.reload(measureit_arch_batch)
     importlib.reload(measureit_arch_units)
     importlib.reload(measureit_arch_object)
     importlib.reload(measureit_arch_orientations)
@@ -81,6 +82,7 @@ else:
     from . import measureit_arch_viewports
     from . import measureit_arch_styles
     from . import measureit_arch_views
+    from . import measureit_arch_batch
     from . import measureit_arch_object
     from . import measureit_arch_orientations
     from . import measureit_arch_tables
@@ -210,6 +212,7 @@ classes = (
     measureit_arch_views.AddViewButton,
     measureit_arch_views.BatchViewRender,
     measureit_arch_views.BatchDXFRender,
+    measureit_arch_batch.BatchParallelRender,
     measureit_arch_views.OpenInBrowser,
 
     # Orientations
@@ -250,6 +253,10 @@ def register():
     bpy.app.handlers.load_post.append(measureit_arch_views.create_preset_view)
     bpy.app.handlers.load_post.append(measureit_arch_orientations.create_preset_transforms)
     bpy.app.handlers.save_pre.append(measureit_arch_main.save_handler)
+    bpy.app.handlers.depsgraph_update_post.append(measureit_arch_main.depsgraph_handler)
+    bpy.app.handlers.frame_change_post.append(measureit_arch_main.depsgraph_handler)
+    bpy.app.handlers.undo_post.append(measureit_arch_main.undo_handler)
+    bpy.app.handlers.redo_post.append(measureit_arch_main.undo_handler)
 
     # Register pointer properties
     Scene.MeasureItArchProps = bpy.props.PointerProperty(
@@ -291,6 +298,10 @@ def unregister():
 
     bpy.app.handlers.load_post.remove(measureit_arch_main.load_handler)
     bpy.app.handlers.save_pre.remove(measureit_arch_main.save_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(measureit_arch_main.depsgraph_handler)
+    bpy.app.handlers.frame_change_post.remove(measureit_arch_main.depsgraph_handler)
+    bpy.app.handlers.undo_post.remove(measureit_arch_main.undo_handler)
+    bpy.app.handlers.redo_post.remove(measureit_arch_main.undo_handler)
 
     # remove OpenGL data
     measureit_arch_main.ShowHideViewportButton.handle_remove(
@@ -300,6 +311,14 @@ def unregister():
     if 'measureit_arch_run_opengl' in wm:
         del wm['measureit_arch_run_opengl']
 
+    # Stop depth test workers
+    from . import vector_utils
+    vector_utils.close_sampling_pool()
+
+    # Free the text atlas GPU pages
+    from . import measureit_arch_text_atlas
+    measureit_arch_text_atlas.clear_text_atlas()
+
 
 if __name__ == '__main__':
     register()
@@ -33,9 +33,10 @@ import bpy_extras.object_utils as object_utils
 from math import degrees
 import bpy
 import ezdxf
+import numpy as np
+import weakref
 from .measureit_arch_utils import get_view, safe_name
 from . import vector_utils
-from decimal import *
 
 from mathutils import Vector, Matrix
 
@@ -45,21 +46,47 @@ from mathutils import Vector, Matrix
 hatch_col_id = 10
 hatch_col_dict = {}
 
+# Projected points are snapped to a grid of this size, so points that only
+# differ by float error match and segments can be compared as integers
+DXF_GRID_SIZE = 1e-6
 
+# Sine of the largest bend treated as straight when merging collinear lines,
+# matching the SVG export
+DXF_COLLINEAR_TOLERANCE = 1e-4
 
+# Snapped segments already in each DXF document's model space by layer, so
+# lines shared by several objects or line groups of a style are only written
+# once, while each layer still keeps all of its own lines
+drawn_segments = weakref.WeakKeyDictionary()
 
-def quantize_vec(vec,precision='1e-6', is_2d=True):
-    x = Decimal('{}'.format(vec.x)).quantize(Decimal(precision))
-    y = Decimal('{}'.format(vec.y)).quantize(Decimal(precision))
-    if not is_2d:
-        z = Decimal('{}'.format(vec.z)).quantize(Decimal(precision))
-        return(x,y,z)
-    return(x,y)
+
+def snap_to_grid(points):
+    """ Returns points as integer multiples of DXF_GRID_SIZE """
+    return np.rint(np.asarray(points, dtype=np.float64) / DXF_GRID_SIZE).astype(np.int64)
+
+
+def quantize_vec(vec, is_2d=True):
+    if is_2d:
+        point = (vec[0], vec[1])
+    else:
+        point = (vec[0], vec[1], vec[2])
+    return tuple((snap_to_grid(point) * DXF_GRID_SIZE).tolist())
+
+
+def segment_keys(grid_segs):
+    """
+    Returns a hashable key per snapped segment of shape (n, 2, 2), with
+    endpoints in (min, max) order so a segment and its reverse match
+    """
+    start = grid_segs[:, 0]
+    end = grid_segs[:, 1]
+    swap = (start[:, 0] > end[:, 0]) | ((start[:, 0] == end[:, 0]) & (start[:, 1] > end[:, 1]))
+    ordered = np.where(swap[:, None, None], grid_segs[:, ::-1], grid_segs)
+    return [tuple(key) for key in ordered.reshape(-1, 4).tolist()]
 
 def dxf_line_shader(lineGroup, itemProps, coords, lineWeight, rgb, dxf, myobj, mat=Matrix.Identity(4), make_block = False):
     view = get_view()
     dashed = False
-    line_buffer = []
     model_space = dxf.modelspace()
     ss_origin = vector_utils.get_worldscale_projection(myobj.location)
 
@@ -96,44 +123,61 @@ def dxf_line_shader(lineGroup, itemProps, coords, lineWeight, rgb, dxf, myobj, m
     dashed = "lineDrawDashed" in itemProps and itemProps.lineDrawDashed
     draw_hidden = 'lineDrawHidden' in itemProps and itemProps.lineDrawHidden
 
-    lines = []
-    for x in range(0, len(coords) - 1, 2):
-        line_segs = vector_utils.depth_test(coords[x], coords[x + 1], mat, itemProps)
+    line_points = []
+    for line_segs in vector_utils.depth_test_lines(coords, mat, itemProps):
         for line in line_segs:
             vis = line[0]
-            p1 = line[1]
-            p2 = line[2]
             if vis == -1:
                 continue
 
             if vis or draw_hidden:
-                if make_block:
-                    p1ss = vector_utils.get_worldscale_projection(mat @ Vector(p1)) 
-                    p2ss = vector_utils.get_worldscale_projection(mat @ Vector(p2))
-                else:
-                    p1ss = vector_utils.get_worldscale_projection(mat @ Vector(p1)) 
-                    p2ss = vector_utils.get_worldscale_projection(mat @ Vector(p2))
-
-                p1_float = quantize_vec(p1ss)
-                p2_float = quantize_vec(p2ss)
-                
-                # Check if we've drawn this line before
-                check_string_1 = "{}:{}".format(p1_float,p2_float)
-                check_string_2 = "{}:{}".format(p2_float,p1_float)
-
-                if p1_float == p2_float: # skip lines that are 0 length when projected
-                    continue
-
-                if check_string_1 in line_buffer or check_string_2 in line_buffer:
-                    continue
-                else:
-                    #print("{},{}".format(float(p1_float[0]),float(p2_float[0])))
-                    line_buffer.append(check_string_1)
-                    if make_block:
-                        block.add_line(Vector(p1_float)-ss_origin, Vector(p2_float)-ss_origin , dxfattribs={"layer": itemProps.name})
-                    else:
-                        line = model_space.add_line(p1_float, p2_float, dxfattribs={"layer": itemProps.name})
-            
+                line_points.append(line[1])
+                line_points.append(line[2])
+
+    if len(line_points) == 0:
+        return
+
+    # Project every line end point at once
+    segs = vector_utils.projection.world_scale(line_points, matrix=mat).reshape(-1, 2, 2)
+    grid_segs = snap_to_grid(segs)
+
+    # skip lines that are 0 length when projected
+    grid_segs = grid_segs[np.any(grid_segs[:, 0] != grid_segs[:, 1], axis=1)]
+
+    # Block geometry is shared by every reference to the block,
+    # so it's only checked against itself
+    if make_block:
+        line_buffer = set()
+    else:
+        line_buffer = drawn_segments.setdefault(dxf, {}).setdefault(itemProps.name, set())
+
+    new_segs = []
+    for key in segment_keys(grid_segs):
+        # Check if we've drawn this line before
+        if key in line_buffer:
+            continue
+        line_buffer.add(key)
+        new_segs.append((key[:2], key[2:]))
+
+    # Join connected segments into polylines
+    sceneProps = bpy.context.scene.MeasureItArchProps
+    chains = vector_utils.chain_segments(
+        new_segs, merge_collinear=sceneProps.merge_collinear_lines,
+        tolerance=DXF_COLLINEAR_TOLERANCE)
+
+    target = block if make_block else model_space
+    offset = Vector(ss_origin[:2]) if make_block else Vector((0, 0))
+    for chain in chains:
+        points = [Vector((p[0] * DXF_GRID_SIZE, p[1] * DXF_GRID_SIZE)) - offset for p in chain]
+        if len(points) == 2:
+            target.add_line(points[0], points[1], dxfattribs={"layer": itemProps.name})
+            continue
+
+        closed = chain[0] == chain[-1]
+        if closed:
+            points.pop()
+        target.add_lwpolyline(points, format='xy', close=closed, dxfattribs={"layer": itemProps.name})
+
 
 
 # From https://ezdxf.readthedocs.io/en/stable/tutorials/linear_dimension.html
@@ -217,10 +261,13 @@ def dxf_fill_shader(coords,dxf,layer):
     model_space = dxf.modelspace()
     coords_2d = []
     hatch = model_space.add_hatch(color=256,dxfattribs={"layer": layer})
-    for coord in coords:
-        c2d = quantize_vec(vector_utils.get_worldscale_projection(Vector(coord)))
-        if c2d not in coords_2d:
-            coords_2d.append(c2d)
+    grid_coords = snap_to_grid(vector_utils.projection.world_scale(coords))
+    seen = set()
+    for c2d in grid_coords.tolist():
+        c2d = tuple(c2d)
+        if c2d not in seen:
+            seen.add(c2d)
+            coords_2d.append((c2d[0] * DXF_GRID_SIZE, c2d[1] * DXF_GRID_SIZE))
 
     most_x = Vector(coords_2d[0])
     most_y = Vector(coords_2d[0])
@@ -252,10 +299,7 @@ def dxf_hatch_shader(hatch,coords,dxf,material):
     hatch = model_space.add_hatch(color=hatch_col_dict[material.name],dxfattribs={"layer": material.name})
 
 
-    path = []
-    for coord in coords:
-        ssPoint = vector_utils.get_worldscale_projection(Vector(coord))
-        path.append(ssPoint)
+    path = vector_utils.projection.world_scale(coords).tolist()
 
     hatch.paths.add_polyline_path(path,is_closed=True)
 
@@ -263,10 +307,7 @@ def dxf_annotation_shader(annotation,annotationProps,coords,origin,dxf):
     model_space = dxf.modelspace()
     anno_text = model_space.add_mtext("", dxfattribs={"layer": annotationProps.name})
 
-    ssLeaderCoords = []
-    for coord in coords:
-        ssPoint = vector_utils.get_worldscale_projection(coord)
-        ssLeaderCoords.append(ssPoint)
+    ssLeaderCoords = vector_utils.projection.world_scale(coords).tolist()
 
     ssOrigin = vector_utils.get_worldscale_projection(origin)
 
@@ -313,11 +354,8 @@ def dxf_annotation_shader(annotation,annotationProps,coords,origin,dxf):
     # Get Text Rotation
     x_vec = Vector((1,0))
     
-    ssp0 = vector_utils.get_worldscale_projection(annotation.textFields[0]['textcard'][0])
-    ssp1 = vector_utils.get_worldscale_projection(annotation.textFields[0]['textcard'][1])
-    ssp2 = vector_utils.get_worldscale_projection(annotation.textFields[0]['textcard'][2])
-    ssp3 = vector_utils.get_worldscale_projection(annotation.textFields[0]['textcard'][3])
-    card = [Vector(ssp0),Vector(ssp1),Vector(ssp2),Vector(ssp3)]
+    ss_card = vector_utils.projection.world_scale(annotation.textFields[0]['textcard'][:4])
+    card = [Vector(ssp) for ssp in ss_card.tolist()]
     
     xDirVec = card[3] - card[0]
     yDirVec = card[1] - card[0]
@@ -358,10 +396,7 @@ def dxf_text_shader(textField,style,coords,origin,dxf):
     model_space = dxf.modelspace()
     anno_text = model_space.add_mtext("", dxfattribs={"layer": style.name})
 
-    ssLeaderCoords = []
-    for coord in coords:
-        ssPoint = vector_utils.get_worldscale_projection(coord)
-        ssLeaderCoords.append(ssPoint)
+    ssLeaderCoords = vector_utils.projection.world_scale(coords).tolist()
 
     ssOrigin = vector_utils.get_worldscale_projection(textField['textcard'][0])
 
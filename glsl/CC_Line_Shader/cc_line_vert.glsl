@@ -1,6 +1,8 @@
 //uniform mat4 viewProjectionMatrix
 //uniform float offset
-// uniform mat4 objectMatrix
+// in int mat_idx (row of the line's object matrix in member_mats)
+// uniform sampler2D member_mats (one row of 4 matrix columns per merged object)
+// uniform sampler2D instance_mats (one row of 4 matrix columns per instance)
 // uniform mat4 extMatrix
 // uniform vec3 view_dir
 // in vec4 col
@@ -14,6 +16,15 @@
 // out vec2 uv
 
 void main() {
+    mat4 instanceMatrix = mat4(texelFetch(instance_mats, ivec2(0, gl_InstanceID), 0),
+                               texelFetch(instance_mats, ivec2(1, gl_InstanceID), 0),
+                               texelFetch(instance_mats, ivec2(2, gl_InstanceID), 0),
+                               texelFetch(instance_mats, ivec2(3, gl_InstanceID), 0));
+    mat4 memberMatrix = mat4(texelFetch(member_mats, ivec2(0, mat_idx), 0),
+                             texelFetch(member_mats, ivec2(1, mat_idx), 0),
+                             texelFetch(member_mats, ivec2(2, mat_idx), 0),
+                             texelFetch(member_mats, ivec2(3, mat_idx), 0));
+    mat4 objectMatrix = instanceMatrix * memberMatrix;
     vec4 local_dir = objectMatrix *extMatrix* vec4(dir,0.0);
     vec4 local_pos = objectMatrix *extMatrix* vec4(pos, 1.0);
     //vec4 local_view = objectMatrix*vec4(view_dir,0.0);
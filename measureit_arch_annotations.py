@@ -42,7 +42,7 @@ from bpy.props import (
 from mathutils import Vector
 
 from .measureit_arch_baseclass import BaseWithText, draw_textfield_settings
-from .measureit_arch_utils import get_smart_selected
+from .measureit_arch_utils import get_smart_selected, queue_text_update
 
 
 def update_active_annotation(self, context):
@@ -59,6 +59,7 @@ def annotation_update_flag(self, context):
     for textField in self.textFields:
         textField.text_updated = True
         update_custom_props(self, context)
+    queue_text_update(self)
 
 
 def update_custom_props(self, context):
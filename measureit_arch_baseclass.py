@@ -8,7 +8,7 @@ from bpy.props import IntProperty, CollectionProperty, FloatVectorProperty, \
     BoolProperty, StringProperty, FloatProperty, EnumProperty, PointerProperty
 
 from .measureit_arch_units import BU_TO_INCHES
-from .measureit_arch_utils import get_resolution
+from .measureit_arch_utils import get_resolution, queue_text_update, clear_style_registry
 
 def recalc_index(self, context):
     # ensure index's are accurate
@@ -74,6 +74,7 @@ class StyleWrapper(PropertyGroup):
 def update_flag(self, context):
     self.text_updated = True
     self.is_invalid = True
+    queue_text_update(self)
 
 def mark_invalid(self,context):
     self.is_invalid = True
@@ -160,6 +161,8 @@ class BaseProp:
     def set_name(self,value):
         self['previous_name'] = self.name
         self['name'] = value
+        # Style lookups are indexed by name
+        clear_style_registry()
 
     name: StringProperty(
         name='Name',
@@ -963,16 +966,28 @@ class MeasureItARCHSceneProps(PropertyGroup):
         description="Exports SVGs with lineweights specified directly in pts",
         default=False,)
 
+    merge_collinear_lines: BoolProperty(
+        name="Merge Collinear Lines",
+        description="Joins straight runs of exported SVG and DXF linework into single segments",
+        default=True,)
+
     source_scene: PointerProperty(type = bpy.types.Scene)
 
     depth_test_method: EnumProperty(
         items=(
             ('DEPTH_BUFFER', 'Depth Buffer', ''),
+            ('SOFTWARE_BUFFER', 'Software Depth Buffer', 'Renders the depth buffer on the CPU, for machines without a GPU context'),
             ('GEOMETRIC', 'Geometric', '')
         ),
         name="Depth Test Method",
         description="Method for depth testing when rendering vector linework. Depth Buffer is generally faster but less precise",
         default='DEPTH_BUFFER',)
+
+    parallel_depth_test: BoolProperty(
+        name="Parallel Depth Test",
+        description="Samples the depth buffer for large exports in worker processes, on all CPU cores. "
+                    "Experimental: forking Blender can hang if another thread holds a lock at the time",
+        default=False,)
     
     default_alignment_method: EnumProperty(
         items=(
@@ -987,6 +1002,21 @@ class MeasureItARCHSceneProps(PropertyGroup):
         description="When Embeding renders or other files in svg renders, use a relative path",
         default=False,)
 
+    pretty_svgs: BoolProperty(
+        name="Pretty Print SVGs",
+        description="Indents exported SVGs so they're easier to read, at the cost of file size",
+        default=True,)
+
+    compact_svg_numbers: BoolProperty(
+        name="Compact SVG Numbers",
+        description="Rounds numbers in exported SVGs to 3 decimal places and removes trailing zeros",
+        default=False,)
+
+    compress_svgs: BoolProperty(
+        name="Compress SVGs",
+        description="Exports gzip compressed .svgz files",
+        default=False,)
+
 class DeletePropButton(Operator):
     bl_idname = "measureit_arch.deletepropbutton"
     bl_label = "Delete property"
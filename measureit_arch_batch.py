@@ -0,0 +1,277 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: measureit_arch_batch.py
+# Parallel batch rendering of views in background Blender processes
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+
+import bpy
+import ezdxf
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import traceback
+
+from bpy.types import Operator
+from bpy.props import IntProperty, EnumProperty
+from ezdxf.addons import Importer
+
+from .measureit_arch_render import render_main, render_main_svg, render_main_dxf
+from .measureit_arch_utils import get_view, get_view_outpath
+
+
+# DXF views are laid out side by side in the combined model space,
+# matching the spacing used by BatchDXFRender
+DXF_VIEW_SPACING = 50
+
+WORKER_EXPR = (
+    "from {package}.measureit_arch_batch import run_batch_worker\n"
+    "run_batch_worker({render_type!r}, {view_indices!r}, {progress_path!r}, "
+    "{source_dir!r}, {temp_dir!r})\n"
+)
+
+
+class WorkerReporter(object):
+    """ Stands in for an Operator in the render functions, which call report() """
+
+    def report(self, type, message):
+        print("MeasureIt_ARCH: {} {}".format(', '.join(type), message))
+
+
+def make_outpaths_absolute(scene, source_dir):
+    """
+    Workers open a snapshot saved in a temporary folder, so paths relative
+    to the .blend are resolved against the original file's folder instead
+    """
+    for view in scene.ViewGenerator.views:
+        if view.output_path == "//Renders\\":
+            view.output_path = "//Renders"
+        if view.output_path:
+            view.output_path = bpy.path.abspath(view.output_path, start=source_dir)
+    scene.render.filepath = bpy.path.abspath(scene.render.filepath, start=source_dir)
+
+
+def run_batch_worker(render_type, view_indices, progress_path, source_dir, temp_dir):
+    """
+    Entry point of a background worker. Renders each view and appends a
+    line of JSON to the progress file once it's done
+    """
+    context = bpy.context
+    scene = context.scene
+    ViewGen = scene.ViewGenerator
+    reporter = WorkerReporter()
+    make_outpaths_absolute(scene, source_dir)
+
+    with open(progress_path, 'a') as progress:
+        for idx in view_indices:
+            view = ViewGen.views[idx]
+            result = {'index': idx, 'view': view.name}
+            print("MeasureIt_ARCH: Rendering View: {}".format(view.name))
+            try:
+                ViewGen.active_index = idx
+                if render_type == 'SVG':
+                    result['outpath'] = render_main_svg(reporter, context)
+                elif render_type == 'PNG':
+                    result['outpath'] = render_main(reporter, context)
+                else:
+                    dxf_path = os.path.join(temp_dir, 'view_{:04d}.dxf'.format(idx))
+                    result['outpath'] = render_main_dxf(
+                        reporter, context, offset_x=DXF_VIEW_SPACING * idx,
+                        outpath=dxf_path)
+            except Exception as e:
+                traceback.print_exc()
+                result['error'] = str(e)
+
+            progress.write(json.dumps(result) + '\n')
+            progress.flush()
+
+
+def read_progress(progress_paths):
+    results = []
+    for path in progress_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as progress:
+            for line in progress:
+                # Skip a line the worker is still writing
+                if line.endswith('\n'):
+                    results.append(json.loads(line))
+    return results
+
+
+def merge_dxf_views(dxf_paths, outpath):
+    """ Combines the model spaces of the per view DXF files into one file """
+    doc = ezdxf.readfile(dxf_paths[0])
+    for path in dxf_paths[1:]:
+        source = ezdxf.readfile(path)
+        importer = Importer(source, doc)
+        importer.import_modelspace()
+        importer.finalize()
+    doc.saveas(outpath)
+
+
+class BatchParallelRender(Operator):
+    bl_idname = "measureit_arch.batchparallelrender"
+    bl_label = "Parallel Batch Render"
+    bl_description = ("Render all views included in the batch in background "
+                      "Blender processes. The file must be saved first")
+    bl_category = 'MeasureitArch'
+    bl_options = {'REGISTER'}
+
+    render_type: EnumProperty(
+        items=(
+            ('SVG', "SVG", ""),
+            ('DXF', "DXF", "Render every view into a single .dxf model space"),
+            ('PNG', "PNG", "")),
+        name="Format",
+        default='SVG')
+
+    num_workers: IntProperty(
+        name="Workers",
+        description="Number of Blender processes to render views in",
+        min=1, soft_max=16,
+        default=max(1, (os.cpu_count() or 2) // 2))
+
+    _timer = None
+    processes = []
+    progress_paths = []
+    temp_dir = None
+    num_views = 0
+    start_time = 0
+
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = context.scene
+        if not bpy.data.filepath:
+            self.report({'ERROR'}, "Save the file before running a parallel batch render")
+            return {'CANCELLED'}
+
+        views = scene.ViewGenerator.views
+        view_indices = [idx for idx, view in enumerate(views) if view.include_in_batch]
+        if len(view_indices) == 0:
+            self.report({'ERROR'}, "No views are included in the batch")
+            return {'CANCELLED'}
+
+        # Save a snapshot with the same name, so name folders still match
+        self.temp_dir = tempfile.mkdtemp(prefix='measureit_arch_batch_')
+        snapshot = os.path.join(self.temp_dir, bpy.path.basename(bpy.data.filepath))
+        bpy.ops.wm.save_as_mainfile(filepath=snapshot, copy=True)
+        source_dir = os.path.dirname(bpy.data.filepath)
+
+        # Hand out views round robin, so expensive neighbouring views are spread out
+        num_workers = min(self.num_workers, len(view_indices))
+        package = __package__
+        self.processes = []
+        self.progress_paths = []
+        for worker_idx in range(num_workers):
+            progress_path = os.path.join(self.temp_dir, 'worker_{}.jsonl'.format(worker_idx))
+            expr = WORKER_EXPR.format(
+                package=package, render_type=self.render_type,
+                view_indices=view_indices[worker_idx::num_workers],
+                progress_path=progress_path, source_dir=source_dir,
+                temp_dir=self.temp_dir)
+
+            self.processes.append(subprocess.Popen([
+                bpy.app.binary_path, '--background', '--addons', package,
+                snapshot, '--python-expr', expr]))
+            self.progress_paths.append(progress_path)
+
+        self.num_views = len(view_indices)
+        self.start_time = time.time()
+        print("MeasureIt_ARCH: Rendering {} Views in {} Processes".format(
+            self.num_views, num_workers))
+
+        wm = context.window_manager
+        wm.progress_begin(0, self.num_views)
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            for process in self.processes:
+                process.terminate()
+            self.finish(context)
+            self.report({'WARNING'}, "Parallel batch render cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        results = read_progress(self.progress_paths)
+        context.window_manager.progress_update(len(results))
+        context.workspace.status_text_set(
+            "MeasureIt_ARCH: Rendered {} of {} Views".format(len(results), self.num_views))
+
+        if any(process.poll() is None for process in self.processes):
+            return {'PASS_THROUGH'}
+
+        results.sort(key=lambda result: result['index'])
+        errors = [result for result in results if 'error' in result]
+        for result in errors:
+            print("MeasureIt_ARCH: View {} failed: {}".format(result['view'], result['error']))
+
+        # Views without a result were lost with a crashed worker
+        missing = self.num_views - len(results)
+
+        outpath = None
+        rendered = [result['outpath'] for result in results
+                    if result.get('outpath') and 'error' not in result]
+        if self.render_type == 'DXF' and len(rendered) > 0:
+            view = get_view()
+            outpath = get_view_outpath(
+                context.scene, view, "{:04d}.dxf".format(context.scene.frame_current))
+            merge_dxf_views(rendered, outpath)
+
+        self.finish(context)
+        print("MeasureIt_ARCH: Parallel Batch Render Time: {}".format(time.time() - self.start_time))
+
+        if errors or missing:
+            self.report({'ERROR'}, "{} of {} views failed to render, see the console".format(
+                len(errors) + missing, self.num_views))
+        elif outpath:
+            self.report({'INFO'}, "DXF exported to: {}".format(outpath))
+        else:
+            self.report({'INFO'}, "Rendered {} views".format(len(rendered)))
+        return {'FINISHED'}
+
+    def finish(self, context):
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        for process in self.processes:
+            process.wait()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def draw(self, context):
+        layout = self.layout
+        col = layout.column()
+        col.prop(self, "render_type")
+        col.prop(self, "num_workers")
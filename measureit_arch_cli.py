@@ -0,0 +1,136 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: measureit_arch_cli.py
+# Scriptable export of views, usable without a 3D viewport. From a shell:
+#
+#   blender -b drawing.blend --addons MeasureIt_ARCH --python-expr \
+#       "import sys, MeasureIt_ARCH.measureit_arch_cli as cli; sys.exit(cli.main())" \
+#       -- --views "Plan" "Section A" --frames 1 10-12 --format svg dxf
+#
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+
+import argparse
+import bpy
+import sys
+
+from .measureit_arch_batch import WorkerReporter
+from .measureit_arch_render import render_main, render_main_svg, render_main_dxf
+
+EXPORT_FORMATS = ('SVG', 'DXF', 'PNG')
+
+
+def export_views(context=None, views=None, frames=None, formats=('SVG',)):
+    """
+    Exports views to each format and returns the paths written. views is a
+    list of view names, by default the views included in the batch. frames
+    is a list of frame numbers, by default each view's start frame.
+    All view and projection state comes from the view and its camera, so
+    no 3D viewport is needed
+    """
+    if context is None:
+        context = bpy.context
+    scene = context.scene
+    ViewGen = scene.ViewGenerator
+    reporter = WorkerReporter()
+
+    if views is None:
+        view_indices = [idx for idx, view in enumerate(ViewGen.views) if view.include_in_batch]
+    else:
+        names = [view.name for view in ViewGen.views]
+        view_indices = []
+        for name in views:
+            if name not in names:
+                raise ValueError("MeasureIt_ARCH: No view named '{}' in scene '{}'".format(name, scene.name))
+            view_indices.append(names.index(name))
+
+    outpaths = []
+    for idx in view_indices:
+        # Sets the scene camera, resolution and start frame for the view
+        ViewGen.active_index = idx
+        view = ViewGen.views[idx]
+
+        view_frames = frames
+        if view_frames is None:
+            view_frames = [scene.frame_current]
+
+        for frame in view_frames:
+            scene.frame_set(frame)
+            for export_format in formats:
+                print("MeasureIt_ARCH: Exporting View: {} Frame: {} to {}".format(
+                    view.name, frame, export_format))
+                if export_format == 'SVG':
+                    outpath = render_main_svg(reporter, context)
+                elif export_format == 'DXF':
+                    outpath = render_main_dxf(reporter, context)
+                else:
+                    outpath = render_main(reporter, context)
+                if outpath:
+                    outpaths.append(outpath)
+
+    return outpaths
+
+
+def parse_frames(values):
+    """ Parses frame numbers and inclusive ranges like 10-20 """
+    frames = []
+    for value in values:
+        start, sep, end = value.partition('-')
+        if sep and start:
+            frames.extend(range(int(start), int(end) + 1))
+        else:
+            frames.append(int(value))
+    return frames
+
+
+def main(argv=None):
+    """
+    Command line entry point, reads the arguments after '--'. Views are
+    exported from the scene that was active when the file was saved
+    """
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+
+    parser = argparse.ArgumentParser(
+        prog='measureit_arch_cli',
+        description="Export MeasureIt_ARCH views without a 3D viewport")
+    parser.add_argument(
+        '--views', nargs='+', metavar='NAME',
+        help="Views to export, defaults to the views included in the batch")
+    parser.add_argument(
+        '--frames', nargs='+', metavar='FRAME',
+        help="Frames or ranges like 10-20, defaults to each view's start frame")
+    parser.add_argument(
+        '--format', nargs='+', default=['svg'], dest='formats',
+        type=str.upper, choices=EXPORT_FORMATS, help="Formats to export")
+    args = parser.parse_args(argv)
+
+    frames = parse_frames(args.frames) if args.frames else None
+
+    try:
+        outpaths = export_views(views=args.views, frames=frames, formats=args.formats)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    for outpath in outpaths:
+        print("MeasureIt_ARCH: Exported {}".format(outpath))
+    return 0
@@ -36,7 +36,7 @@ from mathutils import Vector
 
 from .measureit_arch_baseclass import BaseDim, recalc_dimWrapper_index, draw_textfield_settings
 from .measureit_arch_utils import get_smart_selected, \
-    get_selected_vertex_history, get_selected_faces
+    get_selected_vertex_history, get_selected_faces, get_style
 from .measureit_arch_units import BU_TO_FEET
 
 
@@ -1595,9 +1595,8 @@ class TranslateDimensionOp(bpy.types.Operator):
                 dimension.tweakOffset = value
             elif dimension.uses_style and styleOffset:
                 dimension.tweakOffset = self.init
-                for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-                    if alignedDimStyle.name == dimension.style:
-                        alignedDimStyle.dimOffset = value
+                alignedDimStyle = get_style(dimension, 'alignedDimensions', scene=context.scene)
+                alignedDimStyle.dimOffset = value
             else:
                 dimension.dimOffset = value
 
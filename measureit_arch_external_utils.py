@@ -30,7 +30,7 @@ from math import fabs
 
 from .measureit_arch_geometry import get_mesh_vertex, get_point, sortPoints, \
     select_normal
-from .measureit_arch_utils import interpolate3d
+from .measureit_arch_utils import interpolate3d, get_style
 
 
 def blenderBIM_get_coords(context, offset_pos=True):
@@ -90,11 +90,7 @@ def blenderBIM_get_coords(context, offset_pos=True):
 
 
 def get_dim_coords(context, myobj, DimGen, dim, mat, offset_pos=True):
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style(dim, 'alignedDimensions', scene=context.scene)
 
     # get points positions from indicies
     aMatrix = dim.dimObjectA.matrix_world
@@ -0,0 +1,174 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: measureit_arch_fonts.py
+# Registry of loaded fonts shared by the raster and SVG text paths
+# Author: Kevan Cress
+# ----------------------------------------------------------
+
+import bpy
+import blf
+import os
+
+from fontTools import ttLib
+
+
+__all__ = (
+    'get_font_path',
+    'get_blf_font_id',
+    'get_font_family',
+    'get_text_width',
+    'get_line_height',
+    'clear_font_cache',
+)
+
+FONT_SPECIFIER_NAME_ID = 4
+FONT_SPECIFIER_FAMILY_ID = 1
+
+# Max cached line widths per font size before the table is reset
+MAX_CACHED_WIDTHS = 4096
+
+# Font entries keyed by absolute path, each holding the file mtime
+# they were loaded at, their BLF id, family name and metric tables
+_font_cache = {}
+
+# Key of Blenders default font in _font_cache, it only caches metrics
+BUILTIN_FONT_KEY = '<builtin>'
+
+
+def get_font_path(font):
+    """ Returns the absolute path of a font datablock, or None for Bfont """
+    if font is None or font.filepath == '<builtin>':
+        return None
+    return bpy.path.abspath(font.filepath)
+
+
+def _get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _get_entry(path):
+    mtime = _get_mtime(path) if path != BUILTIN_FONT_KEY else None
+    entry = _font_cache.get(path)
+    if entry is not None and entry['mtime'] == mtime:
+        return entry
+
+    # The file changed on disk, so drop the stale BLF font
+    if entry is not None and entry['blf_id'] is not None:
+        blf.unload(path)
+
+    entry = {
+        'mtime': mtime,
+        'blf_id': None,
+        'family': None,
+        'widths': {},
+        'line_heights': {},
+    }
+    _font_cache[path] = entry
+    return entry
+
+
+def get_blf_font_id(path):
+    """ Returns the BLF font id for a font file, 0 is Blenders default font """
+    if path is None:
+        return 0
+    entry = _get_entry(path)
+    if entry['blf_id'] is None:
+        entry['blf_id'] = blf.load(path)
+    return entry['blf_id']
+
+
+def get_font_family(path, fallback="Open Sans"):
+    """ Returns the family name from a font file's name table """
+    if path is None:
+        return fallback
+    entry = _get_entry(path)
+    if entry['family'] is None:
+        try:
+            tt = ttLib.TTFont(path, lazy=True)
+            entry['family'] = shortName(tt)[0]
+            tt.close()
+        except Exception as e:
+            # Remember unreadable fonts so they aren't parsed again
+            entry['family'] = ''
+            print(e)
+            print(path)
+    if not entry['family']:
+        return fallback
+    return entry['family']
+
+
+def get_text_width(path, size, text):
+    """
+    Returns the width of a line of text at a BLF size. Whole lines are
+    cached rather than summed from glyphs, so kerning is measured exactly
+    """
+    font_id = get_blf_font_id(path)
+    entry = _get_entry(path if path is not None else BUILTIN_FONT_KEY)
+    widths = entry['widths'].setdefault(size, {})
+    if text not in widths:
+        if len(widths) > MAX_CACHED_WIDTHS:
+            widths.clear()
+        blf.size(font_id, size)
+        widths[text] = blf.dimensions(font_id, text)[0]
+    return widths[text]
+
+
+def get_line_height(path, size):
+    """ Returns the height of a line of text at a BLF size """
+    font_id = get_blf_font_id(path)
+    entry = _get_entry(path if path is not None else BUILTIN_FONT_KEY)
+    if size not in entry['line_heights']:
+        blf.size(font_id, size)
+        entry['line_heights'][size] = blf.dimensions(font_id, 'Tpg')[1]
+    return entry['line_heights'][size]
+
+
+def clear_font_cache():
+    for path, entry in _font_cache.items():
+        if entry['blf_id'] is not None:
+            blf.unload(path)
+    _font_cache.clear()
+
+
+# From https://gist.github.com/pklaus/dce37521579513c574d0
+def shortName(font):
+    """Get the short name from the font's names table"""
+    name = ""
+    family = ""
+
+    for record in font['name'].names:
+        if record.nameID == FONT_SPECIFIER_NAME_ID and not name:
+            if b'\x00' in record.string:
+                name_str = record.string.decode('utf-16-be')
+            else:
+                name_str = record.string.decode('utf-8')
+            name = name_str
+        elif record.nameID == FONT_SPECIFIER_FAMILY_ID and not family:
+            if b'\x00' in record.string:
+                name_str = record.string.decode('utf-16-be')
+            else:
+                name_str = record.string.decode('utf-8')
+            family = name_str
+
+        if name and family: break
+    return name, family
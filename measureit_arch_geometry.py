@@ -45,16 +45,44 @@ from sys import getrecursionlimit, setrecursionlimit
 from . import svg_shaders
 from . import dxf_shaders
 from .measureit_arch_baseclass import TextField, recalc_dimWrapper_index
+from .measureit_arch_fonts import get_font_path, get_blf_font_id, get_text_width, get_line_height
+from . import measureit_arch_text_atlas as text_atlas
 from .measureit_arch_units import BU_TO_INCHES, format_distance, format_angle, \
     format_area
 from .measureit_arch_utils import get_rv3d, get_view, interpolate3d, get_camera_z_dist, get_camera_z, pts_to_px, recursionlimit,\
     OpenGL_Settings, get_sv3d, safe_name, _imp_scales_dict, _metric_scales_dict, _cad_col_dict, get_resolution, get_scale, px_to_m,\
-    load_shader_str, get_projection_matrix, rgb_gamma_correct
+    load_shader_str, get_projection_matrix, rgb_gamma_correct, get_style, queue_text_update
 
 from .vector_utils import get_axis_aligned_bounds
 
 lastMode = {}
 
+# Names of objects with geometry or transform updates since the last redraw,
+# filled by the depsgraph_update_post handler
+dirtyObjects = set()
+# Count of depsgraph updates seen per object, used to version cached mesh data
+objectVersions = {}
+
+# Cached edge adjacency for dynamic line groups, keyed by object name
+meshAdjacencyCache = {}
+
+# Cached vertex coords (and face data when needed) for dimensions and
+# annotations, keyed by object name and whether modifiers are evaluated
+meshArrayCache = {}
+
+# Cached local coords of dimension and annotation anchor points, keyed by
+# object name, vertex index, spline index and whether modifiers are evaluated
+meshVertexCache = {}
+
+# Cached vertex pair to edge face lookup for dimension normals, keyed by
+# object name, and the last normal resolved for each dimension
+edgeNormalCache = {}
+dimNormalCache = {}
+
+# Object space vertices, loop triangles and GPU batch of each mesh drawn in
+# the depth pass, keyed by object and mesh name
+depthGeometryCache = {}
+
 AllLinesBuffer = {}
 
 HiddenLinesBuffer = {}
@@ -78,11 +106,29 @@ bufferUniformKeysList = [
     "gap_sizes",
 ]
 
+# Cached line VBOs, keyed by object, line group and instance.
+# Depsgraph instances of a line group share a single VBO
 AllLinesBatchs = {}
 HiddenLinesBatchs = {}
+# Cached batches merging all lines that share a style
+MergedAllLinesBatchs = {}
+MergedHiddenLinesBatchs = {}
+lineVersions = {}
+lineDrawCount = 0
+LINE_CACHE_MAX_AGE = 64
+# Max instances per instanced draw, or line groups per merged batch,
+# one texture row per object matrix
+LINE_INSTANCE_CHUNK = 4096
+identityInstanceTexture = None
+# Identity matrix flattened by columns
+flatIdentityMatrix = [1.0, 0.0, 0.0, 0.0,
+                      0.0, 1.0, 0.0, 0.0,
+                      0.0, 0.0, 1.0, 0.0,
+                      0.0, 0.0, 0.0, 1.0]
 scene_objlist = []
 
-offscreen_text_buffers = {}
+# Text cards to draw this redraw, grouped by atlas page
+TextCardsBuffer = {}
 
 # define Shaders
 aafrag = load_shader_str("aa_frag.glsl")
@@ -165,7 +211,6 @@ line_vert_out.smooth('VEC2', "uv")
 line_shader_info = gpu.types.GPUShaderCreateInfo()
 line_shader_info.push_constant('MAT4', "viewProjectionMatrix")
 line_shader_info.push_constant('FLOAT', "offset")
-line_shader_info.push_constant('MAT4', "objectMatrix")
 line_shader_info.push_constant('MAT4', "extMatrix")
 line_shader_info.push_constant('VEC4', "overlay_color")
 line_shader_info.push_constant('VEC3', "view_dir")
@@ -180,6 +225,9 @@ line_shader_info.vertex_in(2, 'VEC3', "dir")
 line_shader_info.vertex_in(3, 'INT', "thick_sign")
 line_shader_info.vertex_in(4, 'FLOAT', "weight")
 line_shader_info.vertex_in(5, 'VEC2', "v_uv")
+line_shader_info.vertex_in(6, 'INT', "mat_idx")
+line_shader_info.sampler(0, 'FLOAT_2D', "instance_mats")
+line_shader_info.sampler(1, 'FLOAT_2D', "member_mats")
 
 line_shader_info.vertex_out(line_vert_out)
 line_shader_info.fragment_out(0, 'VEC4', "fragColor")
@@ -213,9 +261,96 @@ def get_dim_tag(self, obj):
     return idx
 
 
+def mark_dirty_objects(depsgraph):
+    for update in depsgraph.updates:
+        if not isinstance(update.id, bpy.types.Object):
+            continue
+        if update.is_updated_geometry or update.is_updated_transform:
+            name = update.id.original.name
+            dirtyObjects.add(name)
+            if update.is_updated_geometry:
+                objectVersions[name] = objectVersions.get(name, 0) + 1
+
+
+def is_obj_dirty(obj):
+    return obj is not None and obj.name in dirtyObjects
+
+
+def clear_dirty_objects():
+    dirtyObjects.clear()
+
+
 def clear_batches():
-    AllLinesBatch = None
-    HiddenLinesBatch = None
+    meshAdjacencyCache.clear()
+    meshArrayCache.clear()
+    meshVertexCache.clear()
+    edgeNormalCache.clear()
+    dimNormalCache.clear()
+    AllLinesBatchs.clear()
+    HiddenLinesBatchs.clear()
+    MergedAllLinesBatchs.clear()
+    MergedHiddenLinesBatchs.clear()
+    lineVersions.clear()
+    depthGeometryCache.clear()
+
+
+def clear_depth_geometry():
+    depthGeometryCache.clear()
+
+
+def get_depth_pass_meshes(context):
+    """
+    Returns a (geometry, matrix) pair for every mesh instance drawn to the
+    depth buffer. geometry holds the object space 'vertices' and loop
+    'triangles' arrays and is shared by every instance of the same mesh.
+    Meshes are only re-tessellated when the depsgraph reports a geometry
+    update, so exports of several views or frames reuse them.
+    """
+    deps = context.view_layer.depsgraph
+    meshes = []
+    used_keys = set()
+    for obj_int in deps.object_instances:
+        obj = obj_int.object
+        parent = obj_int.parent
+
+        ignore = obj.MeasureItArchProps.ignore_in_depth_test
+        if parent != None:
+            ignore = ignore or parent.MeasureItArchProps.ignore_in_depth_test
+
+        if obj.type != 'MESH' or obj.hide_render or obj.display_type == "WIRE" or ignore:
+            continue
+
+        name = obj.original.name
+        key = (name, obj.data.name)
+        version = objectVersions.get(name, 0)
+        cached = depthGeometryCache.get(key)
+        if cached is None or cached["version"] != version:
+            mesh = obj.to_mesh(preserve_all_data_layers=False, depsgraph=deps)
+            mesh.calc_loop_triangles()
+
+            vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', vertices)
+            triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get('vertices', triangles)
+            obj.to_mesh_clear()
+
+            cached = {
+                "version": version,
+                "vertices": vertices.reshape(-1, 3),
+                "triangles": triangles.reshape(-1, 3),
+            }
+            depthGeometryCache[key] = cached
+
+        used_keys.add(key)
+        if len(cached["triangles"]) > 0:
+            meshes.append((cached, obj_int.matrix_world.copy()))
+
+    # Drop meshes that were deleted or renamed
+    for key in list(depthGeometryCache.keys()):
+        if key not in used_keys:
+            del depthGeometryCache[key]
+
+    return meshes
 
 
 def update_text(textobj, props, context, fields=[]):
@@ -246,24 +381,18 @@ def update_text(textobj, props, context, fields=[]):
                     badfonts.append(bpy.data.fonts['Bfont'])
                 except KeyError:
                     pass
+            fontPath = None
             if props.font not in badfonts:
-                vecFont = props.font
-                fontPath = vecFont.filepath
-                fontPath = bpy.path.abspath(fontPath)
-                font_id = blf.load(fontPath)
-            else:
-                font_id = 0
-
-            # Set BLF font Properties
-            blf.color(font_id, rgb[0], rgb[1], rgb[2], rgb[3])
-            blf.size(font_id, size * resolution/72)
+                fontPath = get_font_path(props.font)
+            font_id = get_blf_font_id(fontPath)
+            blf_size = size * resolution/72
 
             text = textField.text
             lines = text.split('\n')
 
 
             # Calculate Optimal Dimensions for Text Texture.
-            line_height =  blf.dimensions(font_id, 'Tpg')[1] *1.2
+            line_height = get_line_height(fontPath, blf_size) *1.2
 
             fheight = 0
             fwidth = 0
@@ -272,7 +401,7 @@ def update_text(textobj, props, context, fields=[]):
                 text = line
                 if props.all_caps:
                     text = line.upper()
-                line_width = blf.dimensions(font_id, text)[0]
+                line_width = get_text_width(fontPath, blf_size, text)
                 if line_width > fwidth:
                     fwidth = line_width
 
@@ -283,13 +412,26 @@ def update_text(textobj, props, context, fields=[]):
             textField.textHeight = height
             textField.textWidth = width
 
+            # Labels with the same text and font settings share a slot in the atlas
+            atlas_key = '{}|{}|{}|{}|{}'.format(
+                fontPath, blf_size, tuple(rgb), props.all_caps, textField.text)
+            textField['atlas_key'] = atlas_key
+
+            # Older files stored the texture as an ID property, drop it
+            if 'texture' in textField:
+                del textField['texture']
+
             # Start Offscreen Draw
-            if width != 0 and height != 0:
-                textOffscreen = gpu.types.GPUOffScreen(width, height)
+            if width != 0 and height != 0 and text_atlas.get_label(atlas_key) is None:
+                label = text_atlas.add_label(atlas_key, width, height)
 
-                with textOffscreen.bind():
+                # Set BLF font Properties
+                blf.color(font_id, rgb[0], rgb[1], rgb[2], rgb[3])
+                blf.size(font_id, blf_size)
+
+                with label.page.offscreen.bind():
                     fb = gpu.state.active_framebuffer_get()
-                    fb.clear(color=(0.0, 0.0, 0.0, 0.0))
+                    gpu.state.viewport_set(label.x, label.y, width, height)
 
                     view_matrix = Matrix([
                         [2 / width, 0, 0, -1],
@@ -312,25 +454,21 @@ def update_text(textobj, props, context, fields=[]):
                         idx += 1
                         y_offset -= line_height * 1.1
 
-                # Write Texture Buffer to ID Property as List
-                texture_buffer =  fb.read_color(0, 0, width, height, 4, 0, 'FLOAT')
-                texture_buffer.dimensions = width*height*4
-                textField['texture'] = []
-                textField['texture'] = texture_buffer
-
-                textField.text_updated = False
-                textField.texture_updated = True
-
-                # ONLY USE FOR DEBUG. SERIOUSLY SLOWS PREFORMANCE
-                if sceneProps.measureit_arch_debug_text:
-                    if not str('test') in bpy.data.images:
-                        bpy.data.images.new(str('test'), width, height)
-                    image = bpy.data.images[str('test')]
-                    image.scale(width, height)
-                    image.pixels = [v for v in texture_buffer]
-                
-                del texture_buffer
-                textOffscreen.free()
+                    # ONLY USE FOR DEBUG. SERIOUSLY SLOWS PREFORMANCE
+                    if sceneProps.measureit_arch_debug_text:
+                        texture_buffer = fb.read_color(label.x, label.y, width, height, 4, 0, 'FLOAT')
+                        texture_buffer.dimensions = width*height*4
+                        if not str('test') in bpy.data.images:
+                            bpy.data.images.new(str('test'), width, height)
+                        image = bpy.data.images[str('test')]
+                        image.scale(width, height)
+                        image.pixels = [v for v in texture_buffer]
+                        del texture_buffer
+
+                    gpu.state.viewport_set(0, 0, label.page.width, label.page.height)
+
+            textField.text_updated = False
+            textField.texture_updated = True
 
     textobj.text_updated = False
 
@@ -546,9 +684,9 @@ def draw_alignedDimension(context, myobj, measureGen, dim, mat=None, svg=None, d
     p2Local = None
 
     try:
-        p1Local = get_mesh_vertex(
+        p1Local = get_cached_mesh_vertex(
             dim.dimObjectA, dim.dimPointA, dimProps.evalMods)
-        p2Local = get_mesh_vertex(
+        p2Local = get_cached_mesh_vertex(
             dim.dimObjectB, dim.dimPointB, dimProps.evalMods)
     except IndexError:
         print('point excepted for ' + dim.name + ' on ' + myobj.name)
@@ -989,6 +1127,7 @@ def draw_boundsDimension(context, myobj, measureGen, dim, mat, svg=None, dxf=Non
                 if dimText.text != distanceText:
                     dimText.text = distanceText
                     dimText.text_updated = True
+                    queue_text_update(dimText)
 
                 placementResults = dim_text_placement(
                     dim, dimProps, origin, dist, distVector, offsetDistance, capSize, textField = dimText)
@@ -1364,6 +1503,7 @@ def draw_angleDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
         if dim.textFields[0].text != angleText:
             dim.textFields[0].text = angleText
             dim.textFields[0].text_updated = True
+            queue_text_update(dim)
 
         dimText = dim.textFields[0]
         origin = midPoint
@@ -1621,12 +1761,14 @@ def draw_arcDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
         if lengthText.text != lengthStr:
             lengthText.text = lengthStr
             lengthText.text_updated = True
+            queue_text_update(lengthText)
 
         if dim.showRadius:
             radStr = 'r ' + format_distance(radius)
             if radiusText.text != radStr:
                 radiusText.text = radStr
                 radiusText.text_updated = True
+                queue_text_update(radiusText)
 
             # make Radius text card
             midPoint = Vector(interpolate3d(zeroVec, radiusLeader, radius / 2))
@@ -1720,44 +1862,30 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
     rawTextRGB = dimProps.color
     textRGB = rgb_gamma_correct(rawTextRGB)
 
-    bm = bmesh.new()
     if myobj.mode != 'EDIT':
         eval_res = sceneProps.eval_mods
-        if (eval_res or dim.evalMods) and check_mods(myobj):  # From Evaluated Deps Graph
-            bm.from_object(
-                myobj, bpy.context.view_layer.depsgraph)
-        else:
-            bm.from_mesh(myobj.data)
+        evaluated = (eval_res or dim.evalMods) and check_mods(myobj)  # From Evaluated Deps Graph
+        meshArrays = get_mesh_arrays(myobj, evaluated, with_faces=True)
     else:
-        bm = bmesh.from_edit_mesh(myobj.data)
-
-    bm.faces.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
-    faces = bm.faces
+        meshArrays = get_edit_mesh_arrays(myobj)
 
     # Get the Filled Coord and Sum the Face Areas
     filledCoords = []
     sumArea = 0
-    verts = bm.verts
+    verts = [Vector(co) for co in meshArrays["coords"]]
     center = Vector((0,0,0))
     area_faces = dim['facebuffer'].to_list()
     for faceIdx in area_faces:
-        face = faces[faceIdx]
-        area = face.calc_area()
-        center += face.calc_center_median_weighted()
-
-        indices = []
-        for vert in face.verts:
-            indices.append(vert.index)
+        indices = get_face_verts(meshArrays, faceIdx).tolist()
+        center += calc_center_median_weighted(meshArrays["coords"][indices])
 
         tris = mesh_utils.ngon_tessellate(myobj.data, indices)
 
         for tri in tris:
             v1, v2, v3 = tri
-            p1 = mat @ verts[indices[v1]].co
-            p2 = mat @ verts[indices[v2]].co
-            p3 = mat @ verts[indices[v3]].co
+            p1 = mat @ verts[indices[v1]]
+            p2 = mat @ verts[indices[v2]]
+            p3 = mat @ verts[indices[v3]]
             filledCoords.append(p1)
             filledCoords.append(p2)
             filledCoords.append(p3)
@@ -1776,13 +1904,13 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
         print("No Peimeter Vert Buffer found in {} on {}. Please re-create area dimension".format(dim.name,myobj.name))
     idx = -1
     for vert_idx in buffer_list:
-        v1 = bm.verts[vert_idx]
-        polyfillCoords.append(mat @ v1.co)
-        perimeterCoords.append(mat @ v1.co)
+        v1 = verts[vert_idx]
+        polyfillCoords.append(mat @ v1)
+        perimeterCoords.append(mat @ v1)
 
         if idx < len(buffer_list):
-            v2 = bm.verts[buffer_list[idx]]
-            perimeterCoords.append(mat @ v2.co)
+            v2 = verts[buffer_list[idx]]
+            perimeterCoords.append(mat @ v2)
 
         idx += 1
 
@@ -1796,10 +1924,9 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
     rotMatrix.rotate(rot)
     rotMatrix.resize_4x4()
 
-    originFace = faces[dim.originFaceIdx]
     #origin = originFace.calc_center_bounds()
     origin = center
-    normal = rotMatrix @ originFace.normal
+    normal = rotMatrix @ Vector(meshArrays["normals"][dim.originFaceIdx])
 
     origin += dim.dimTextPos + normal * 0.01
 
@@ -1857,6 +1984,7 @@ def draw_areaDimension(context, myobj, DimGen, dim, mat, svg=None, dxf=None):
         if dimText.text != distanceText:
             dimText.text = distanceText
             dimText.text_updated = True
+            queue_text_update(dimText)
 
     idx = 0
     # Draw Fill
@@ -1919,7 +2047,9 @@ def get_view_axis(context, dim, dimProps):
     if viewPlane == '99':
         # Get Viewport and CameraLoc or ViewRot
 
-        if context.scene.camera != None and sceneProps.default_alignment_method == 'CAMERA':
+        # Without a 3D viewport (command line exports) the camera is the view
+        use_camera = sceneProps.default_alignment_method == 'CAMERA' or context.area is None
+        if context.scene.camera != None and use_camera:
             cameraRot = context.scene.camera.matrix_world.to_quaternion()
 
             viewVec = -k.copy()
@@ -1928,9 +2058,10 @@ def get_view_axis(context, dim, dimProps):
 
         elif context.scene.camera == None or sceneProps.default_alignment_method == 'VIEW':
             space3D = None
-            for space in context.area.spaces:
-                if space.type == 'VIEW_3D':
-                    space3D = space
+            if context.area is not None:
+                for space in context.area.spaces:
+                    if space.type == 'VIEW_3D':
+                        space3D = space
 
             if space3D is None:
                 return Vector((0, 0, 0))
@@ -1965,25 +2096,19 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
 
     viewAxis = get_view_axis(context, dim, dimProps)
 
+    # Reuse the last normal until the anchors, mesh or view axis change
+    normalKey = None
+    if myobj.type == 'MESH' and not archipack_datablock(myobj):
+        normalKey = (myobj.name, objectVersions.get(myobj.name, 0), dim.dimPointA, dim.dimPointB,
+                     tuple(viewAxis), tuple(normDistVector), dim.dimFlip)
+        cached = dimNormalCache.get(dim.as_pointer())
+        if cached is not None and cached[0] == normalKey:
+            return cached[1].copy()
+
     # Mesh Dimension Behaviour
     if myobj.type == 'MESH':
         # get Adjacent Face normals if possible
-        possibleNormals = []
-
-        # Create a Bmesh Instance from the selected object
-        bm = bmesh.new()
-        bm.from_mesh(myobj.data)
-        bm.edges.ensure_lookup_table()
-
-        # For each edge get its linked faces and vertex indicies
-        for edge in bm.edges:
-            bmEdgeIndices = [edge.verts[0].index, edge.verts[1].index]
-            if dim.dimPointA in bmEdgeIndices and dim.dimPointB in bmEdgeIndices:
-                linked_faces = edge.link_faces
-                for face in linked_faces:
-                    possibleNormals.append(face.normal)
-
-        bm.free()
+        possibleNormals = get_edge_face_normals(myobj, dim.dimPointA, dim.dimPointB)
 
         # Check if Face Normals are available
         if len(possibleNormals) != 2:
@@ -2033,9 +2158,68 @@ def select_normal(myobj, dim, normDistVector, midpoint, dimProps):
     bestNormal.normalize()
     if dim.dimFlip:
         bestNormal *= -1.0
+
+    if normalKey is not None:
+        dimNormalCache[dim.as_pointer()] = (normalKey, bestNormal.copy())
     return bestNormal
 
 
+def get_edge_face_normals(myobj, vertA, vertB):
+    """
+    Returns the normals of the faces linked to the edge joining two vertices,
+    using a vertex pair index cached per mesh version
+    """
+    version = objectVersions.get(myobj.name, 0)
+    index = edgeNormalCache.get(myobj.name)
+    if index is None or index["version"] != version:
+        mesh = myobj.data
+        num_verts = len(mesh.vertices)
+        num_edges = len(mesh.edges)
+        num_faces = len(mesh.polygons)
+
+        edge_verts = np.empty(num_edges * 2, dtype=np.int64)
+        mesh.edges.foreach_get('vertices', edge_verts)
+        edge_verts = edge_verts.reshape(-1, 2)
+        normals = np.empty(num_faces * 3, dtype=np.float32)
+        mesh.polygons.foreach_get('normal', normals)
+        loop_totals = np.empty(num_faces, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
+        loop_edges = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('edge_index', loop_edges)
+
+        # Sorted vertex pair keys, to binary search for an edge
+        pair_keys = edge_verts.min(axis=1) * num_verts + edge_verts.max(axis=1)
+        edge_order = np.argsort(pair_keys, kind='stable')
+
+        # Faces linked to each edge, grouped by edge
+        loop_faces = np.repeat(np.arange(num_faces, dtype=np.int32), loop_totals)
+        loop_order = np.argsort(loop_edges, kind='stable')
+        face_counts = np.bincount(loop_edges, minlength=num_edges)
+
+        index = {
+            "version": version,
+            "num_verts": num_verts,
+            "pair_keys": pair_keys[edge_order],
+            "edge_order": edge_order,
+            "edge_faces": loop_faces[loop_order],
+            "face_starts": np.concatenate(([0], np.cumsum(face_counts)[:-1])),
+            "face_counts": face_counts,
+            "normals": normals.reshape(-1, 3),
+        }
+        edgeNormalCache[myobj.name] = index
+
+    key = min(vertA, vertB) * index["num_verts"] + max(vertA, vertB)
+    first = np.searchsorted(index["pair_keys"], key, side='left')
+    last = np.searchsorted(index["pair_keys"], key, side='right')
+
+    possibleNormals = []
+    for edge in index["edge_order"][first:last]:
+        start = index["face_starts"][edge]
+        for face in index["edge_faces"][start:start + index["face_counts"][edge]]:
+            possibleNormals.append(Vector(index["normals"][face]))
+    return possibleNormals
+
+
 def draw_line_group(context, myobj, lineGen, mat, svg=None, dxf=None, is_instance_draw = False, instance = None):
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
@@ -2094,13 +2278,16 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None, dxf=None, is_instanc
         # Flag for re-evaluation of batches & mesh data
         verts = []
 
+        # Evaluated coords only change when the depsgraph updated this object,
+        # dynamic silhouettes also follow the view
+        obj_dirty = is_obj_dirty(myobj) or lineGroup.dynamic_sil
+
         # Conditions for re calculating Line Co-ordinates
         if mode_change_flag or \
-            myobj.mode == 'WEIGHT_PAINT' or \
+            (myobj.mode == 'WEIGHT_PAINT' and obj_dirty) or \
             sceneProps.is_render_draw or\
             scene.ViewGenerator.view_changed or\
-            evalModsGlobal or\
-            evalMods:
+            ((evalModsGlobal or evalMods) and obj_dirty):
             recoord_flag = True
             lineGroup.is_invalid = True
         else:
@@ -2135,11 +2322,6 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None, dxf=None, is_instanc
 
             # Calculate dynamic lines or curve lines (only for non instances)
             if lineGroup.useDynamicCrease or lineGroup.dynamic_sil and not is_instance_draw:
-                tempCoords = []
-                tempIdxs = []
-                # Create a Bmesh Instance from the selected object
-                bm = bmesh.new()
-                mesh = myobj.data
                 try:
                     camera_z = get_camera_z()
                 except AttributeError:
@@ -2149,99 +2331,15 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None, dxf=None, is_instanc
                 if myobj.mode != 'OBJECT':
                     return
 
-                if myobj.type == 'MESH':
-                    depsgraph = bpy.context.view_layer.depsgraph
-                    eval_obj = myobj.evaluated_get(depsgraph)
-                    temp_mesh = eval_obj.data
-                    bm.from_mesh(temp_mesh)
-                    #bm.from_object(myobj, bpy.context.view_layer.depsgraph)
-
-                if myobj.type == 'CURVE':
-                    depsgraph = bpy.context.view_layer.depsgraph
-                    eval_obj = myobj.evaluated_get(depsgraph)
-                    temp_mesh = bpy.data.meshes.new_from_object(eval_obj, depsgraph = bpy.context.view_layer.depsgraph)
-                    bm.from_mesh(temp_mesh)
-
-                # For each edge get its linked faces and vertex indicies
-                for idx, edge in enumerate(bm.edges):
-                    linked_faces = edge.link_faces
-                    pointA = edge.verts[0].co
-                    pointB = edge.verts[1].co
-
-                    #Check Filter Vertex Group
-                    invalid_group = True
-                    if lineGroup.filterGroup != '':
-                        try:
-                            eval_obj.vertex_groups[lineGroup.filterGroup]
-                            invalid_group = False
-                        except KeyError:
-                            print('Invalid group {} on {} cleared'.format(lineGroup.filterGroup,myobj.name))
-                            lineGroup.filterGroup = ''  
-                            invalid_group = True
-
-
-                    if not invalid_group:
-                        #print('has filter group')
-                        eval_obj = myobj.evaluated_get(bpy.context.view_layer.depsgraph)
-                        vertex_group = eval_obj.vertex_groups[lineGroup.filterGroup]
-                        group_idx = vertex_group.index
-                        v1_groups = eval_obj.data.vertices[edge.verts[0].index].groups
-                        v2_groups = eval_obj.data.vertices[edge.verts[1].index].groups
-                        id1 = []
-                        id2 = []
-                        for item in v1_groups:
-                            id1.append(item.group)
-                            #print('v1 in group: {} looking for group: {}'.format(item.group,group_idx))
-                        for item in v2_groups:
-                            id2.append(item.group)
-                            #print('v2 in group: {} looking for group: {}'.format(item.group,group_idx))
-                        if lineGroup.invertGroupFilter - (group_idx not in id1 or group_idx not in id2):
-                            #print('skipping line segment')
-                            continue
-
-                    if len(linked_faces) == 2:
-                        normalA = Vector(
-                            linked_faces[0].normal).normalized()
-                        normalB = Vector(
-                            linked_faces[1].normal).normalized()
-                        dotProd = (normalA.dot(normalB))
-
-                        #Check angle of adjacent faces
-                        if lineGroup.useDynamicCrease:
-                            if dotProd >= -1 and dotProd <= 1:
-                                creaseAngle = math.acos(dotProd)
-                                if creaseAngle > lineGroup.creaseAngle:
-                                    tempCoords.append(pointA)
-                                    tempCoords.append(pointB)
-                                    tempIdxs.append(edge.verts[0].index)
-                                    tempIdxs.append(edge.verts[1].index)
-
-                        #Check dynamic silhouette
-                        if lineGroup.dynamic_sil:
-                            normalA.rotate(rot)
-                            normalB.rotate(rot)
-                            a_dot = camera_z.dot(normalA)
-                            b_dot = camera_z.dot(normalB)
-                            sign_a = np.sign(a_dot)
-                            sign_b = np.sign(b_dot)
-                            if sign_a != sign_b:
-                                tempCoords.append(pointA)
-                                if not lineGroup.chain:
-                                    tempCoords.append(pointB)
-
-                    # Any edge with greater or less
-                    # than 2 linked faces is non manifold
-                    else:
-                        tempCoords.append(pointA)
-                        if not lineGroup.chain or idx == (len(bm.edges)-1):
-                            tempCoords.append(pointB)
+                adjacency = get_mesh_adjacency(myobj)
+                tempCoords, tempIdxs = get_dynamic_line_coords(
+                    myobj, lineGroup, adjacency, camera_z, rot)
 
-                lineGroup['coordBuffer'] = tempCoords.copy()
-                lineGroup['lineBuffer'] = tempIdxs.copy()
+                lineGroup['coordBuffer'] = tempCoords
+                lineGroup['lineBuffer'] = tempIdxs
                 if len(tempCoords) == 0:
                     lineGroup['coordBuffer'] = []
                     return
-                bm.free()
 
         # Get Coords from Buffer
         coords = []
@@ -2326,6 +2424,145 @@ def draw_line_group(context, myobj, lineGen, mat, svg=None, dxf=None, is_instanc
 
         lineGroup.is_invalid = False
 
+def get_mesh_adjacency(myobj):
+    """
+    Returns the evaluated mesh's vertex coords, edge vertices, face normals
+    and the two faces of each manifold edge as NumPy arrays. Cached per
+    object until the depsgraph reports a geometry update
+    """
+    version = objectVersions.get(myobj.name, 0)
+    cached = meshAdjacencyCache.get(myobj.name)
+    if cached is not None and cached["version"] == version:
+        return cached
+
+    depsgraph = bpy.context.view_layer.depsgraph
+    eval_obj = myobj.evaluated_get(depsgraph)
+    temp_mesh = None
+    if myobj.type == 'CURVE':
+        temp_mesh = bpy.data.meshes.new_from_object(eval_obj, depsgraph = depsgraph)
+        mesh = temp_mesh
+    else:
+        mesh = eval_obj.data
+
+    num_verts = len(mesh.vertices)
+    num_edges = len(mesh.edges)
+    num_faces = len(mesh.polygons)
+    num_loops = len(mesh.loops)
+
+    coords = np.empty(num_verts * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    edge_verts = np.empty(num_edges * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edge_verts)
+    normals = np.empty(num_faces * 3, dtype=np.float32)
+    mesh.polygons.foreach_get('normal', normals)
+    loop_totals = np.empty(num_faces, dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    loop_edges = np.empty(num_loops, dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loop_edges)
+
+    # Vertex group membership, used by the line group filter
+    vertex_groups = {}
+    for vg in eval_obj.vertex_groups:
+        vertex_groups[vg.name] = np.zeros(num_verts, dtype=bool)
+    if len(vertex_groups) != 0:
+        group_names = [vg.name for vg in eval_obj.vertex_groups]
+        for vert in mesh.vertices:
+            for group in vert.groups:
+                if group.group < len(group_names):
+                    vertex_groups[group_names[group.group]][vert.index] = True
+
+    if temp_mesh is not None:
+        bpy.data.meshes.remove(temp_mesh)
+
+    # Sort face corners by edge to find the faces linked to each edge
+    loop_faces = np.repeat(np.arange(num_faces, dtype=np.int32), loop_totals)
+    order = np.argsort(loop_edges, kind='stable')
+    sorted_faces = loop_faces[order]
+    face_counts = np.bincount(loop_edges, minlength=num_edges)
+    starts = np.concatenate(([0], np.cumsum(face_counts)[:-1]))
+
+    manifold = face_counts == 2
+    edge_faces = np.zeros((num_edges, 2), dtype=np.int32)
+    edge_faces[manifold, 0] = sorted_faces[starts[manifold]]
+    edge_faces[manifold, 1] = sorted_faces[starts[manifold] + 1]
+
+    cached = {
+        "version": version,
+        "coords": coords.reshape(-1, 3),
+        "edge_verts": edge_verts.reshape(-1, 2),
+        "normals": normals.reshape(-1, 3),
+        "edge_faces": edge_faces,
+        "manifold": manifold,
+        "vertex_groups": vertex_groups,
+    }
+    meshAdjacencyCache[myobj.name] = cached
+    return cached
+
+
+def get_dynamic_line_coords(myobj, lineGroup, adjacency, camera_z, rot):
+    """
+    Returns the crease, silhouette and non manifold edge coords for a
+    dynamic line group, and the vertex indices of its crease edges
+    """
+    edge_verts = adjacency["edge_verts"]
+    edge_faces = adjacency["edge_faces"]
+    manifold = adjacency["manifold"]
+    normals = adjacency["normals"]
+    num_edges = len(edge_verts)
+
+    # Wire meshes have no faces to look up
+    if len(normals) == 0:
+        normals = np.zeros((1, 3), dtype=np.float32)
+
+    # Check Filter Vertex Group
+    keep = np.ones(num_edges, dtype=bool)
+    if lineGroup.filterGroup != '':
+        if lineGroup.filterGroup in adjacency["vertex_groups"]:
+            in_group = adjacency["vertex_groups"][lineGroup.filterGroup]
+            both_in_group = in_group[edge_verts[:, 0]] & in_group[edge_verts[:, 1]]
+            keep = both_in_group != lineGroup.invertGroupFilter
+        else:
+            print('Invalid group {} on {} cleared'.format(lineGroup.filterGroup,myobj.name))
+            lineGroup.filterGroup = ''
+
+    normalA = normals[edge_faces[:, 0]]
+    normalB = normals[edge_faces[:, 1]]
+
+    # Each edge can emit a crease pair, a silhouette pair and a
+    # non manifold pair, in that order
+    emit = np.zeros((num_edges, 6), dtype=bool)
+
+    crease = np.zeros(num_edges, dtype=bool)
+    if lineGroup.useDynamicCrease:
+        dotProd = np.einsum('ij,ij->i', normalA, normalB)
+        in_range = (dotProd >= -1) & (dotProd <= 1)
+        creaseAngle = np.arccos(np.clip(dotProd, -1, 1))
+        crease = keep & manifold & in_range & (creaseAngle > lineGroup.creaseAngle)
+        emit[:, 0] = crease
+        emit[:, 1] = crease
+
+    # Check dynamic silhouette
+    if lineGroup.dynamic_sil:
+        rotMat = np.array(rot.to_matrix(), dtype=np.float32)
+        view = np.array(camera_z, dtype=np.float32) @ rotMat
+        sil = keep & manifold & (np.sign(normalA @ view) != np.sign(normalB @ view))
+        emit[:, 2] = sil
+        emit[:, 3] = sil & (not lineGroup.chain)
+
+    # Any edge with greater or less
+    # than 2 linked faces is non manifold
+    non_manifold = keep & ~manifold
+    emit[:, 4] = non_manifold
+    emit[:, 5] = non_manifold
+    if lineGroup.chain and num_edges != 0:
+        emit[:-1, 5] = False
+
+    points = adjacency["coords"][edge_verts]
+    points = points[:, [0, 1, 0, 1, 0, 1]]
+
+    return points[emit].tolist(), edge_verts[crease].ravel().tolist()
+
+
 def get_vertex_group_weights(myobj, vert_list, group_name, filter = False):
     weights = []
     obj_eval = myobj.evaluated_get(bpy.context.view_layer.depsgraph)
@@ -2389,29 +2626,6 @@ def get_color(rawRGB, cad_col_idx = 256):
 
     return rgb
 
-def get_style(item, type_str):
-    scene = bpy.context.scene
-    sceneProps = scene.MeasureItArchProps
-
-    source_scene = sceneProps.source_scene
-    itemProps = item
-    if source_scene == None:
-        source_scene = scene
-    style_source = eval("source_scene.StyleGenerator.{}".format(type_str))
-    if item.uses_style:
-        for style_item in style_source:
-            if style_item.name == item.style:
-                itemProps = style_item
-                return itemProps
-        # if we got out of the loop, the style wasn't found
-        # Check previous names to updata property
-        for style_item in style_source:
-            if style_item.previous_name == item.style:
-                item.style = style_item.name
-                itemProps = style_item
-
-    return itemProps
-
 def draw_annotation(context, myobj, annotationGen, mat, svg=None, dxf=None, instance = None):
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
@@ -2431,8 +2645,9 @@ def draw_annotation(context, myobj, annotationGen, mat, svg=None, dxf=None, inst
         # Get Points
         deleteFlag = False
         try:
-            p1local = get_mesh_vertex(
-                myobj, annotation.annotationAnchor, annotationProps.evalMods, spline_idx=annotation.annotationAnchorSpline)
+            p1local = get_cached_mesh_vertex(
+                myobj, annotation.annotationAnchor,
+                annotationProps.evalMods, spline_idx=annotation.annotationAnchorSpline)
             p1 = get_point(p1local, mat)
             annotation['p1anchorCoord'] = p1
         except IndexError:
@@ -3148,6 +3363,8 @@ def set_text(textField, obj, style=None, item=None):
 
         if old_text == textField.text:
             textField.text_updated = False
+        else:
+            queue_text_update(textField)
 
     if style != None and style.all_caps and (style.text_updated or bpy.context.scene.MeasureItArchProps.is_render_draw):
         textField.text = textField.text.upper()
@@ -3292,44 +3509,56 @@ def draw_text_3D(context, textobj, textprops, myobj):
         draw_lines(1.0, (0.0, 1.0, 0.0, 1.0), coords)
 
 
-    # Gets Texture from Object
-    width = textobj.textWidth
-    height = textobj.textHeight
-    dim = width * height * 4
+    # Gets the label from the text atlas
+    if textobj.text == "":
+        return
 
-    #if key in offscreen_text_buffers:
-    if 'texture' in textobj and textobj.text != "":
+    label = None
+    if 'atlas_key' in textobj:
+        label = text_atlas.get_label(textobj['atlas_key'])
 
-        try:
-            dims = width * height * 4
-            raw_props = textobj['texture']
-            buffer = gpu.types.Buffer('FLOAT',dims,raw_props)
-            tex = gpu.types.GPUTexture((width,height),layers=0, is_cubemap= False, format='RGBA8',data=buffer)
-            textobj.texture_updated = False
-
-            # Draw Shader
-            textShader.bind()
-            textShader.uniform_sampler("image", tex)
-            textShader.uniform_float("viewProjectionMatrix", get_projection_matrix())
-
-            # Batch Geometry
+    # Not rendered yet, or evicted from the atlas, so redraw it next update
+    if label is None:
+        textobj.text_updated = True
+        queue_text_update(textobj)
+        return
+
+    textobj.texture_updated = False
+    atlasUVs = [label.uv(uv[0], uv[1]) for uv in uvs]
+
+    if label.page not in TextCardsBuffer:
+        TextCardsBuffer[label.page] = {"pos": [], "uv": []}
+    pageBuffer = TextCardsBuffer[label.page]
+    for idx in (0, 1, 2, 0, 2, 3):
+        pageBuffer["pos"].append(card[idx])
+        pageBuffer["uv"].append(atlasUVs[idx])
+
+
+def draw_all_text():
+    """ Draws this redraw's text cards, one batch per atlas page """
+    global TextCardsBuffer
+
+    if len(TextCardsBuffer) != 0:
+        textShader.bind()
+        textShader.uniform_float("viewProjectionMatrix", get_projection_matrix())
+        gpu.state.blend_set('ALPHA_PREMULT')
+        gpu.state.depth_test_set('LESS_EQUAL')
+
+        for page, pageBuffer in TextCardsBuffer.items():
+            textShader.uniform_sampler("image", page.offscreen.texture_color)
             batch = batch_for_shader(
-                textShader, 'TRI_FAN',
+                textShader, 'TRIS',
                 {
-                    "pos": card,
-                    "uv": uvs,
+                    "pos": pageBuffer["pos"],
+                    "uv": pageBuffer["uv"],
                 },
             )
-            gpu.state.blend_set('ALPHA_PREMULT')
-            gpu.state.depth_test_set('LESS_EQUAL')
-
             batch.draw(textShader)
-            del tex
-        except AttributeError:
-            pass
 
-    gpu.shader.unbind()
- 
+        gpu.shader.unbind()
+
+    TextCardsBuffer = {}
+    text_atlas.touch_frame()
 
 
 def generate_end_caps(context, item, capType, capSize, pos, userOffsetVector, midpoint, posflag, flipCaps):
@@ -3697,6 +3926,80 @@ def get_arc_data(pointa, pointb, pointc, pointd):
     return angle, rclength
 
 
+def get_mesh_arrays(myobj, evaluated, with_faces=False):
+    """
+    Returns the vertex coords of a mesh object as a NumPy array, and its
+    face loops and normals if with_faces is set. Arrays are read once with
+    foreach_get and cached until the depsgraph reports a geometry update
+    """
+    key = (myobj.name, evaluated)
+    version = objectVersions.get(myobj.name, 0)
+    cached = meshArrayCache.get(key)
+    if cached is None or cached["version"] != version:
+        cached = {"version": version}
+        meshArrayCache[key] = cached
+
+    if "coords" in cached and (not with_faces or "normals" in cached):
+        return cached
+
+    mesh = myobj.data
+    if evaluated:
+        mesh = myobj.evaluated_get(bpy.context.view_layer.depsgraph).data
+
+    if "coords" not in cached:
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', coords)
+        cached["coords"] = coords.reshape(-1, 3)
+
+    if with_faces:
+        num_faces = len(mesh.polygons)
+        loop_starts = np.empty(num_faces, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        loop_totals = np.empty(num_faces, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
+        normals = np.empty(num_faces * 3, dtype=np.float32)
+        mesh.polygons.foreach_get('normal', normals)
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+
+        cached["loop_starts"] = loop_starts
+        cached["loop_totals"] = loop_totals
+        cached["loop_verts"] = loop_verts
+        cached["normals"] = normals.reshape(-1, 3)
+
+    return cached
+
+
+def get_edit_mesh_arrays(myobj):
+    """ Reads an edit mesh into the same layout as get_mesh_arrays() """
+    bm = bmesh.from_edit_mesh(myobj.data)
+    bm.verts.index_update()
+    loop_totals = np.array([len(face.verts) for face in bm.faces], dtype=np.int32)
+    return {
+        "coords": np.array([vert.co[:] for vert in bm.verts], dtype=np.float32).reshape(-1, 3),
+        "loop_starts": np.concatenate(([0], np.cumsum(loop_totals)[:-1])).astype(np.int32),
+        "loop_totals": loop_totals,
+        "loop_verts": np.array([vert.index for face in bm.faces for vert in face.verts], dtype=np.int32),
+        "normals": np.array([face.normal[:] for face in bm.faces], dtype=np.float32).reshape(-1, 3),
+    }
+
+
+def get_face_verts(meshArrays, faceIdx):
+    start = meshArrays["loop_starts"][faceIdx]
+    return meshArrays["loop_verts"][start:start + meshArrays["loop_totals"][faceIdx]]
+
+
+def calc_center_median_weighted(points):
+    """ Matches BMFace.calc_center_median_weighted(), weighting verts by edge length """
+    edge_lengths = np.linalg.norm(np.roll(points, -1, axis=0) - points, axis=1)
+    weights = edge_lengths + np.roll(edge_lengths, 1)
+    total = weights.sum()
+    center = (points * weights[:, None]).sum(axis=0)
+    if total != 0:
+        center /= total
+    return Vector(center)
+
+
 def get_mesh_vertices(myobj):
     """ Get vertex data """
     sceneProps = bpy.context.scene.MeasureItArchProps
@@ -3709,11 +4012,9 @@ def get_mesh_vertices(myobj):
                 verts = bm.verts
             else:
                 eval_res = sceneProps.eval_mods
-                if eval_res or check_mods(myobj):
-                    mesh = bpy.data.meshes.new_from_object(myobj, depsgraph =  bpy.context.evaluated_depsgraph_get())
-                    verts = mesh.vertices
-                else:
-                    verts = myobj.data.vertices
+                evaluated = eval_res or check_mods(myobj)
+                coords = get_mesh_arrays(myobj, evaluated)["coords"]
+                return [Vector(co) for co in coords]
 
             # We're going through every Vertex in the object here
             # probably excessive, should figure out a better way to
@@ -3756,6 +4057,23 @@ def get_archipack_loc(context, myobj, idx):
     return None
 
 
+def get_cached_mesh_vertex(myobj, idx, evalMods, spline_idx=-1):
+    """
+    Gets a mesh vertex like get_mesh_vertex(), reusing the local coord
+    until the depsgraph reports a geometry update to myobj
+    """
+    sceneProps = bpy.context.scene.MeasureItArchProps
+    key = (myobj.name, idx, spline_idx, bool(evalMods or sceneProps.eval_mods))
+    version = objectVersions.get(myobj.name, 0)
+    cached = meshVertexCache.get(key)
+    if not sceneProps.is_render_draw and cached is not None and cached[0] == version:
+        return cached[1].copy()
+
+    coord = Vector(get_mesh_vertex(myobj, idx, evalMods, spline_idx=spline_idx))
+    meshVertexCache[key] = (version, coord)
+    return coord.copy()
+
+
 def get_mesh_vertex(myobj, idx, evalMods, spline_idx=-1):
     context = bpy.context
     coord = get_archipack_loc(context, myobj, idx)
@@ -3772,7 +4090,6 @@ def get_mesh_vertex(myobj, idx, evalMods, spline_idx=-1):
 
     if myobj.type == 'MESH':
         # Get Vertices
-        bm = bmesh.new()
         verts = myobj.data.vertices
         if myobj.mode == 'EDIT':  # From Edit Mesh
             bm = bmesh.from_edit_mesh(myobj.data)
@@ -3781,10 +4098,10 @@ def get_mesh_vertex(myobj, idx, evalMods, spline_idx=-1):
         else:
             eval_res = sceneProps.eval_mods
             if (eval_res or evalMods) and check_mods(myobj):  # From Evaluated Deps Graph
-                bm.from_object(
-                    myobj, bpy.context.view_layer.depsgraph)
-                bm.verts.ensure_lookup_table()
-                verts = bm.verts
+                coords = get_mesh_arrays(myobj, True)["coords"]
+                if idx < len(coords):
+                    return Vector(coords[idx])
+                raise IndexError
         # Get Co-ordinate for Index in Vertices
         if idx < len(verts):
             coord = verts[idx].co
@@ -3928,64 +4245,56 @@ def draw_lines(lineWeight, rgb, coords, offset=-0.001, pointPass=False, dashed =
     if len(coords) % 2 != 0:
         print('ERROR: Odd Number of Coords, injecting padding to preserve other lines')
         coords.append(Vector((0,0,0)))
-    
-    if obj == None:
-        objMat = Matrix.Identity(4)
-        invalid = True # Just Always Rebatch basic lines
-        bufferKey = 'General Buffer {}'.format(len(buffer.keys()))
-    else:
-        objMat = obj.matrix_world
-        inst_str = ''
-        if instance != None:
-            inst_str = instance.parent
-        bufferKey = obj.name + inst_str + name
-        #if mat != Matrix.Identity:
-        #    objMat = mat
-        
 
-    # expand line
-    expanded_coords = []
-    coord_dirs = []
-    coord_signs = []
-    coord_uvs = []
-    arc_lengths = []
     if type(lineWeight) == list:
         lineWeight = lineWeight[0]
-    for i in range(0,len(coords),2):
-        p1 = Vector(coords[i]) 
-        p2 = Vector(coords[i+1])
-        dir = p1 - p2
-
-        wp1 = p1 @ objMat
-        wp2 = p2 @ objMat
-        arc_length = (wp1 - wp2).length     
-
-        expanded_coords.extend([p1,p1,p2,p2,p2,p1])
-        coord_dirs.extend([dir]*6)
-        coord_signs.extend([1,-1,1,-1,1,-1])
-        uv1 = Vector((0,0))
-        uv2 = Vector((0,1))
-        uv3 = Vector((arc_length,0))
-        uv4 = Vector((arc_length,1))
-        coord_uvs.extend([uv1,uv2,uv3,uv4,uv3,uv2])
 
+    is_instance = False
     if obj == None:
         objMat = Matrix.Identity(4)
         invalid = True # Just Always Rebatch basic lines
         bufferKey = 'General Buffer {}'.format(len(buffer.keys()))
     else:
         objMat = obj.matrix_world
-        #if mat != Matrix.Identity:
-        #    objMat = mat
-        inst_str = ''
+        inst_key = None
         if instance != None:
-            inst_str =  str(instance.matrix_world)
             objMat = instance.matrix_world
-        bufferKey = obj.name + inst_str + name
+            if instance.is_instance:
+                is_instance = True
+                inst_key = (instance.parent, instance.persistent_id)
+        bufferKey = (obj.name, name, inst_key)
 
-    # Set up object key if it doesn't Exist
-    if not bufferKey in buffer:
-        buffer[bufferKey] = {"VBOs":{}}
+    # Get the cached VBOs, these persist between redraws
+    batchCache = AllLinesBatchs
+    if hidden:
+        batchCache = HiddenLinesBatchs
+
+    # Invalidating a line group bumps its version, so every instance
+    # sharing the line group rebuilds on its next draw
+    versionKey = (bufferKey[0], name, hidden) if obj != None else bufferKey
+    if invalid:
+        lineVersions[versionKey] = lineVersions.get(versionKey, 0) + 1
+
+    # The arc length uv's only depend on the object's scale, not its rotation
+    # or location, so they're keyed by the rounded metric M3^T M3 of its matrix
+    mat3 = np.array(objMat, dtype=np.float64)[:3, :3]
+    metric = np.round(mat3.T @ mat3, 5) + 0.0
+    metricKey = metric.tobytes()
+    state = hash((lineVersions.get(versionKey, 0), len(coords), lineWeight,
+                  np.asarray(rgb, dtype=np.float32).tobytes(), metricKey))
+
+    # Instances share one VBO per line group and scale, their matrices
+    # are uploaded separately and drawn in a single instanced call
+    vboKey = bufferKey
+    if is_instance:
+        vboKey = (obj.name, name, metricKey)
+
+    if vboKey not in batchCache or batchCache[vboKey]["state"] != state:
+        batchCache[vboKey] = {
+            "state": state,
+            "VBOs": expand_line_vbos(coords, rgb, lineWeight, metric),
+        }
+    batchCache[vboKey]["last_draw"] = lineDrawCount
 
     # Flatten Matrix by Columns
     flat_mat = [objMat[0][0],objMat[1][0],objMat[2][0],objMat[3][0],
@@ -3993,49 +4302,191 @@ def draw_lines(lineWeight, rgb, coords, offset=-0.001, pointPass=False, dashed =
                 objMat[0][2],objMat[1][2],objMat[2][2],objMat[3][2],
                 objMat[0][3],objMat[1][3],objMat[2][3],objMat[3][3]]
 
-
-    # Set up uniforms
-    buffer[bufferKey]["invalid"] = invalid
+    # Set up uniforms, these are all that change on an idle redraw
+    buffer[bufferKey] = {}
     buffer[bufferKey]["dash_sizes"] = dash_sizes
     buffer[bufferKey]["gap_sizes"] = gap_sizes
     buffer[bufferKey]["overlay_color"] = overlay_color
     buffer[bufferKey]["offset"] = offset
     buffer[bufferKey]["dashed"] = dashed
     buffer[bufferKey]["objMat"] = flat_mat
+    buffer[bufferKey]["vboKey"] = vboKey
+    buffer[bufferKey]["is_instance"] = is_instance
+
+
+# Per segment vertex layout of the two triangles making up a line quad
+quadEndIdxs = np.array([0, 0, 1, 1, 1, 0])
+quadSigns = np.array([1, -1, 1, -1, 1, -1], dtype=np.int32)
+quadUVs = np.array([(0, 0), (0, 1), (1, 0), (1, 1), (1, 0), (0, 1)], dtype=np.float32)
+
+def expand_line_vbos(coords, rgb, lineWeight, metric):
+    """
+    Expands line segments into the triangle VBOs used by allLinesShader.
+    metric is M3^T M3 of the object matrix, giving each segment's world length
+    """
+    coords = np.array([(c[0], c[1], c[2]) for c in coords], dtype=np.float32).reshape(-1, 2, 3)
+    num_segs = len(coords)
+    num_coords = num_segs * 6
 
-    # Set up keys if they don't Exist
-    vboBuffer = buffer[bufferKey]["VBOs"]
+    dirs = coords[:, 0] - coords[:, 1]
 
-    for key in bufferVBOKeysList:
-        vboBuffer[key] = []
+    # Arc length of each segment after the object transform, for dashes
+    arc_lengths = np.sqrt(np.einsum('ij,jk,ik->i', dirs, metric.astype(np.float32), dirs))
 
-    if invalid or instance!=None:
-        # Set Up VBO properties
-        #print('rebuilding vbos')
-        num_coords = len(expanded_coords)
-        vboBuffer['coords'].extend(expanded_coords)
-        vboBuffer['coord_dirs'].extend(coord_dirs)
-        vboBuffer['coord_signs'].extend(coord_signs)
-        vboBuffer['coord_uvs'].extend(coord_uvs)
-        # Check for list of rgb values
-        if type(rgb) == list: buffer['colors'].extend(rgb)
-        else: vboBuffer['colors'].extend([rgb]*num_coords)
-        # Check for list of weight values
-        if type(lineWeight) == list: vboBuffer['weights'].extend(lineWeight)
-        else:vboBuffer['weights'].extend([lineWeight]*num_coords)
+    uvs = np.tile(quadUVs, (num_segs, 1))
+    uvs[:, 0] *= np.repeat(arc_lengths, 6)
 
+    # Check for list of rgb values
+    colors = np.asarray(rgb, dtype=np.float32)
+    if type(rgb) != list:
+        colors = np.tile(colors, (num_coords, 1))
 
+    vboBuffer = {}
+    vboBuffer['coords'] = coords[:, quadEndIdxs].reshape(-1, 3)
+    vboBuffer['coord_dirs'] = np.repeat(dirs, 6, axis=0)
+    vboBuffer['coord_signs'] = np.tile(quadSigns, num_segs)
+    vboBuffer['coord_uvs'] = uvs
+    vboBuffer['colors'] = colors
+    vboBuffer['weights'] = np.full(num_coords, lineWeight, dtype=np.float32)
 
+    return vboBuffer
 
 
 def clear_line_buffers():
+    """
+    Clears the per redraw list of lines to draw. Cached VBOs and batches
+    are kept, and only dropped once they haven't been drawn for a while
+    """
     global AllLinesBuffer
     global HiddenLinesBuffer
+    global lineDrawCount
 
     AllLinesBuffer = {}
     HiddenLinesBuffer = {}
 
-    pass
+    lineDrawCount += 1
+    for batchCache in [AllLinesBatchs, HiddenLinesBatchs, MergedAllLinesBatchs, MergedHiddenLinesBatchs]:
+        stale = [key for key, cached in batchCache.items()
+                 if lineDrawCount - cached["last_draw"] > LINE_CACHE_MAX_AGE]
+        for key in stale:
+            del batchCache[key]
+
+
+def get_merged_line_batchs(buffer, batchCache, mergedCache):
+    """
+    Groups this redraw's lines by their shader state and returns one batch
+    per group as (uniforms, batch, member texture, instance texture,
+    instance count) tuples. Each line's vertices hold the index of its
+    member's object matrix in the member texture, so lines from any object
+    can share a batch. Instances of a line group share their source VBO and
+    are drawn instanced, with their matrices in the instance texture.
+    Merged batches are cached until a member or its VBOs change, moving a
+    member only re-uploads its matrix.
+    """
+    groups = {}
+    for key, lineBuffer in buffer.items():
+        # Keep lines that are rebuilt every redraw out of the cached groups
+        groupKey = (type(key) == str, lineBuffer["offset"], lineBuffer["dashed"],
+                    tuple(lineBuffer["dash_sizes"]), tuple(lineBuffer["gap_sizes"]),
+                    tuple(lineBuffer["overlay_color"]),
+                    lineBuffer["vboKey"] if lineBuffer["is_instance"] else None)
+        if groupKey not in groups:
+            groups[groupKey] = []
+        groups[groupKey].append(key)
+
+    batchs = []
+    for groupKey, keys in groups.items():
+        if groupKey[-1] is not None:
+            batchs.extend(get_instanced_line_batchs(buffer, batchCache, mergedCache, groupKey, keys))
+            continue
+
+        # Split large groups so each chunk's matrices fit in one texture
+        for i in range(0, len(keys), LINE_INSTANCE_CHUNK):
+            batchs.append(get_member_line_batch(
+                buffer, batchCache, mergedCache, groupKey + (i,), keys[i:i + LINE_INSTANCE_CHUNK]))
+    return batchs
+
+
+def get_member_line_batch(buffer, batchCache, mergedCache, chunkKey, keys):
+    signature = tuple((key, batchCache[key]["state"]) for key in keys)
+    if chunkKey not in mergedCache or mergedCache[chunkKey]["signature"] != signature:
+        mergedCache[chunkKey] = {
+            "signature": signature,
+            "batch": merge_line_batch([batchCache[key]["VBOs"] for key in keys]),
+            "matrices": None,
+        }
+    merged = mergedCache[chunkKey]
+    merged["last_draw"] = lineDrawCount
+
+    # Only re-upload the member matrices when a member moves
+    matrices = np.array([buffer[key]["objMat"] for key in keys], dtype=np.float32)
+    if merged["matrices"] is None or not np.array_equal(merged["matrices"], matrices):
+        merged["matrices"] = matrices
+        merged["texture"] = instance_matrix_texture(matrices)
+
+    return (buffer[keys[0]], merged["batch"], merged["texture"], get_identity_instance_texture(), 1)
+
+
+def get_instanced_line_batchs(buffer, batchCache, mergedCache, groupKey, keys):
+    vboKey = groupKey[-1]
+    cached = batchCache[vboKey]
+    if groupKey not in mergedCache or mergedCache[groupKey]["state"] != cached["state"]:
+        mergedCache[groupKey] = {
+            "state": cached["state"],
+            "batch": merge_line_batch([cached["VBOs"]]),
+            "matrices": None,
+        }
+    instanced = mergedCache[groupKey]
+    instanced["last_draw"] = lineDrawCount
+
+    # Only re-upload the instance matrices when an instance moves
+    matrices = np.array([buffer[key]["objMat"] for key in keys], dtype=np.float32)
+    if instanced["matrices"] is None or not np.array_equal(instanced["matrices"], matrices):
+        instanced["matrices"] = matrices
+        instanced["textures"] = [
+            instance_matrix_texture(matrices[i:i + LINE_INSTANCE_CHUNK])
+            for i in range(0, len(matrices), LINE_INSTANCE_CHUNK)]
+
+    return [(buffer[keys[0]], instanced["batch"], get_identity_instance_texture(), texture, len(chunk))
+            for texture, chunk in zip(instanced["textures"],
+                [keys[i:i + LINE_INSTANCE_CHUNK] for i in range(0, len(keys), LINE_INSTANCE_CHUNK)])]
+
+
+def instance_matrix_texture(matrices):
+    """ Packs flattened object matrices into a texture, one matrix per row """
+    data = gpu.types.Buffer('FLOAT', len(matrices) * 16, matrices.ravel().tolist())
+    return gpu.types.GPUTexture((4, len(matrices)), format='RGBA32F', data=data)
+
+
+def get_identity_instance_texture():
+    global identityInstanceTexture
+    if identityInstanceTexture is None:
+        identityInstanceTexture = instance_matrix_texture(
+            np.array([flatIdentityMatrix], dtype=np.float32))
+    return identityInstanceTexture
+
+
+def merge_line_batch(vbos):
+    counts = [len(vboBuffer["coords"]) for vboBuffer in vbos]
+
+    # Each vertex indexes its member's row in the member matrix texture
+    matIdxs = np.repeat(np.arange(len(vbos), dtype=np.int32), counts)
+
+    def merged(vboKey):
+        return np.concatenate([vboBuffer[vboKey] for vboBuffer in vbos])
+
+    return batch_for_shader(
+        allLinesShader,
+        'TRIS',
+        {"pos": merged("coords"),
+        "weight": merged("weights"),
+        "col": merged("colors"),
+        "dir": merged("coord_dirs"),
+        "thick_sign": merged("coord_signs"),
+        "v_uv": merged("coord_uvs"),
+        "mat_idx": matIdxs,
+        })
+
 
 def draw_all_lines(ext_mat = None):
     context = bpy.context
@@ -4044,8 +4495,6 @@ def draw_all_lines(ext_mat = None):
     if sceneProps.is_vector_draw:
         return
 
-    viewport = get_viewport()
-    view = get_view()
     scale = get_scale()
 
     if ext_mat == None:
@@ -4059,101 +4508,53 @@ def draw_all_lines(ext_mat = None):
 
     global AllLinesBuffer
     global HiddenLinesBuffer
-    global AllLinesBatchs
-    global HiddenLinesBatchs
+
+    if sceneProps.is_render_draw:
+        view_dir = get_camera_z()
+    else:
+        view_rot = bpy.context.region_data.view_rotation
+        view_dir =  Vector((0,0,1))
+        view_dir.rotate(view_rot)
 
     # Set Up Constant Uniforms
     allLinesShader.bind()
-
+    allLinesShader.uniform_float("viewProjectionMatrix", get_projection_matrix())
+    allLinesShader.uniform_float("extMatrix",flat_ext_mat)
+    allLinesShader.uniform_float("view_dir",view_dir)
+    allLinesShader.uniform_float("view_scale", scale)
 
     with OpenGL_Settings(None):
         # DRAW HIDDEN LINES
-        for key in HiddenLinesBuffer.keys():
-            hiddenbuffer = HiddenLinesBuffer[key]
-            hiddenvboBuffer = hiddenbuffer["VBOs"]
+        for hiddenbuffer, HiddenLinesBatch, memberMats, instanceMats, numInstances in get_merged_line_batchs(
+                HiddenLinesBuffer, HiddenLinesBatchs, MergedHiddenLinesBatchs):
 
-            # Set up Per line Uniforms
-            if sceneProps.is_render_draw:
-                view_dir = get_camera_z()
-            else:
-                view_rot = bpy.context.region_data.view_rotation
-                view_dir =  Vector((0,0,1))
-                view_dir.rotate(view_rot)
-            
+            # Set up Per Style Uniforms
             allLinesShader.uniform_float("offset", hiddenbuffer["offset"])
-            allLinesShader.uniform_float("objectMatrix", hiddenbuffer["objMat"])
-            allLinesShader.uniform_float("viewProjectionMatrix", get_projection_matrix())
-            allLinesShader.uniform_float("extMatrix",flat_ext_mat)
-            allLinesShader.uniform_float("view_dir",view_dir)
             allLinesShader.uniform_float("dashed", hiddenbuffer["dashed"])
             allLinesShader.uniform_float("gap_sizes", hiddenbuffer["gap_sizes"])
             allLinesShader.uniform_float("dash_sizes", hiddenbuffer["dash_sizes"])
             allLinesShader.uniform_float("overlay_color", hiddenbuffer["overlay_color"])
-            allLinesShader.uniform_float("view_scale", scale)
-
-            # Batch VBO
-            if hiddenbuffer['invalid'] or key not in HiddenLinesBatchs:
-                HiddenLinesBatch = batch_for_shader(
-                    allLinesShader,
-                    'TRIS',
-                    {"pos": hiddenvboBuffer["coords"],
-                    "weight":hiddenvboBuffer["weights"],
-                    "col": hiddenvboBuffer["colors"],
-                    "dir":hiddenvboBuffer["coord_dirs"],
-                    "thick_sign":hiddenvboBuffer["coord_signs"],
-                    "v_uv": hiddenvboBuffer["coord_uvs"],
-                    #"rounded": hiddenvboBuffer["rounded"],
-                    })      
-                HiddenLinesBatchs[key] = HiddenLinesBatch
-            else:
-                HiddenLinesBatch = HiddenLinesBatchs[key]
+            allLinesShader.uniform_sampler("member_mats", memberMats)
+            allLinesShader.uniform_sampler("instance_mats", instanceMats)
 
             gpu.state.depth_test_set('GREATER')
             gpu.state.depth_mask_set(False)
             allLinesShader.uniform_float("depth_pass", False)
-            HiddenLinesBatch.program_set(allLinesShader)
-            HiddenLinesBatch.draw()
+            HiddenLinesBatch.draw_instanced(allLinesShader, instance_count=numInstances)
 
 
         # DRAW REGULAR LINES
-        for key in AllLinesBuffer.keys():
-            buffer = AllLinesBuffer[key]
-            vboBuffer = buffer["VBOs"]
+        for buffer, AllLinesBatch, memberMats, instanceMats, numInstances in get_merged_line_batchs(
+                AllLinesBuffer, AllLinesBatchs, MergedAllLinesBatchs):
 
-            # Set up Per line Uniforms
-            if sceneProps.is_render_draw:
-                view_dir = get_camera_z()
-            else:
-                view_rot = bpy.context.region_data.view_rotation
-                view_dir =  Vector((0,0,1))
-                view_dir.rotate(view_rot)
+            # Set up Per Style Uniforms
             allLinesShader.uniform_float("offset", buffer["offset"])
-            allLinesShader.uniform_float("objectMatrix", buffer["objMat"])
-            allLinesShader.uniform_float("viewProjectionMatrix", get_projection_matrix())
-            allLinesShader.uniform_float("extMatrix",flat_ext_mat)
-            allLinesShader.uniform_float("view_dir",view_dir)
             allLinesShader.uniform_float("dashed", buffer["dashed"])
             allLinesShader.uniform_float("gap_sizes", buffer["gap_sizes"])
             allLinesShader.uniform_float("dash_sizes", buffer["dash_sizes"])
             allLinesShader.uniform_float("overlay_color", buffer["overlay_color"])
-            allLinesShader.uniform_float("view_scale", scale)
-
-            # Batch VBO
-            if buffer['invalid'] or key not in AllLinesBatchs:
-                AllLinesBatch = batch_for_shader(
-                    allLinesShader,
-                    'TRIS',
-                    {"pos": vboBuffer["coords"],
-                    "weight":vboBuffer["weights"],
-                    "col": vboBuffer["colors"],
-                    "dir":vboBuffer["coord_dirs"],
-                    "thick_sign":vboBuffer["coord_signs"],
-                    "v_uv": vboBuffer["coord_uvs"],
-                    })
-                #print('re-batching {}. Buffer Invalid: {}, Key Not Found {}'.format(key, buffer['invalid'],key not in AllLinesBatchs))
-                AllLinesBatchs[key] = AllLinesBatch
-            else:
-                AllLinesBatch = AllLinesBatchs[key]
+            allLinesShader.uniform_sampler("member_mats", memberMats)
+            allLinesShader.uniform_sampler("instance_mats", instanceMats)
 
             # Set Depth Test
             gpu.state.depth_test_set('LESS_EQUAL')
@@ -4161,14 +4562,12 @@ def draw_all_lines(ext_mat = None):
             # Draw To depth Mask
             gpu.state.depth_mask_set(True)
             allLinesShader.uniform_float("depth_pass", True)
-            AllLinesBatch.program_set(allLinesShader)
-            AllLinesBatch.draw()
+            AllLinesBatch.draw_instanced(allLinesShader, instance_count=numInstances)
 
             # Draw AA
             gpu.state.depth_mask_set(False)
             allLinesShader.uniform_float("depth_pass", False)
-            AllLinesBatch.program_set(allLinesShader)
-            AllLinesBatch.draw()
+            AllLinesBatch.draw_instanced(allLinesShader, instance_count=numInstances)
 
         gpu.shader.unbind()
     pass
@@ -4323,6 +4722,7 @@ class Inst_Sort(object):
     matrix_world = None
     is_instance = False
     parent = ''
+    persistent_id = ()
     bound_box = None
 
     def __init__(self, obj):
@@ -4336,7 +4736,8 @@ class Inst_Sort(object):
             self.object = obj.object.name
             self.bound_box = obj.object.bound_box
             self.matrix_world = obj.matrix_world.copy()
-            
+            self.persistent_id = tuple(obj.persistent_id)
+
             if obj.parent != None:
                 self.parent = obj.parent.name
 
@@ -4408,6 +4809,10 @@ def draw3d_loop(context, objlist=None, svg=None, dxf = None, extMat=None, multMa
     
     num_instances = len(objlist)
     for idx,obj_int in enumerate(objlist , start=1):
+        # Write out the previous object's elements
+        if svg is not None:
+            svg.flush()
+
         myobj = bpy.data.objects[obj_int.object]
 
         if not check_obj_vis(myobj,custom_call): continue
@@ -4479,6 +4884,7 @@ def draw3d_loop(context, objlist=None, svg=None, dxf = None, extMat=None, multMa
                 draw_areaDimension(context, myobj, DimGen, areaDim, mat, svg=svg, dxf=dxf)
 
     draw_all_lines(ext_mat=extMat)
+    draw_all_text()
     objlist = None
     if sceneProps.is_render_draw:
         endTime = time.time()
@@ -4502,6 +4908,7 @@ def setup_dim_text(myobj,dim,dimProps,dist,origin,distVector,offsetDistance, is_
         if dimText.text != distanceText:
             dimText.text = distanceText
             dimText.text_updated = True
+            queue_text_update(dimText)
 
     idx = 0
     flipCaps = None
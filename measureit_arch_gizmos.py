@@ -30,6 +30,8 @@ from bpy.types import GizmoGroup
 from mathutils import Vector, Matrix, Quaternion
 from math import radians
 
+from .measureit_arch_utils import get_style
+
 
 class mArchGizmoGroup(GizmoGroup):
     bl_idname = "OBJECT_GG_mArch"
@@ -83,11 +85,7 @@ class mArchGizmoGroup(GizmoGroup):
 
 def createDimOffsetGiz(group, dim, objIndex, idx, dimStr):
     context = bpy.context
-    dimProps = dim
-    if dim.uses_style:
-        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-            if alignedDimStyle.name == dim.style:
-                dimProps = alignedDimStyle
+    dimProps = get_style(dim, 'alignedDimensions', scene=context.scene)
 
     # Set Matrix
     k = Vector((0, 0, -1))
@@ -30,19 +30,41 @@ from bpy.types import Panel, Operator, SpaceView3D
 from bpy.app.handlers import persistent
 from mathutils import Vector, Matrix
 
-from .measureit_arch_geometry import clear_batches, update_text, draw3d_loop, preview_dual, check_obj_vis
-from .measureit_arch_utils import get_view, get_rv3d, get_scale
+from .measureit_arch_geometry import clear_batches, update_text, draw3d_loop, preview_dual, check_obj_vis, \
+    mark_dirty_objects, clear_dirty_objects, clear_depth_geometry
+from .measureit_arch_utils import get_view, get_rv3d, get_scale, get_style, clear_style_registry, \
+    get_text_update_queue, clear_text_update_queue
+from .measureit_arch_text_atlas import clear_text_atlas
 from .gitcommit import prev_commit,date
 
+DIMENSION_TYPES = ('alignedDimensions', 'angleDimensions', 'axisDimensions',
+                   'boundsDimensions', 'arcDimensions', 'areaDimensions')
+
 
 @persistent
 def load_handler(dummy):
     """ Handler called when a Blender file is loaded """
     ShowHideViewportButton.handle_remove(None, bpy.context)
+    clear_batches()
+    clear_style_registry()
+    clear_text_atlas()
     for scene in bpy.data.scenes:
         scene.MeasureItArchProps.text_updated = True
 
 
+@persistent
+def depsgraph_handler(scene, depsgraph):
+    """ Handler called after a depsgraph update or frame change, records the updated objects """
+    mark_dirty_objects(depsgraph)
+
+
+@persistent
+def undo_handler(dummy):
+    """ Handler called after undo and redo, which reallocate all ID data """
+    clear_style_registry()
+    clear_depth_geometry()
+
+
 @persistent
 def save_handler(dummy):
     """ Handler called when a Blender file is saved """
@@ -301,12 +323,17 @@ class SCENE_PT_MARCH_Settings(Panel):
         col.prop(sceneProps, 'preview_resolution')
         col.prop(sceneProps, 'render_resolution')
         col.prop(sceneProps, 'depth_test_method')
+        col.prop(sceneProps, 'parallel_depth_test')
         col.prop(sceneProps, 'default_alignment_method')
         col.prop(sceneProps, 'keep_freestyle_svg', text="Keep Freestyle SVG")
         col.prop(sceneProps, 'show_dxf_props', text="Show DXF Options")
         col.prop(sceneProps, 'use_cad_col')
         col.prop(sceneProps, 'illustrator_style_svgs')
+        col.prop(sceneProps, 'merge_collinear_lines')
         col.prop(sceneProps, 'relative_svg_paths')
+        col.prop(sceneProps, 'pretty_svgs')
+        col.prop(sceneProps, 'compact_svg_numbers')
+        col.prop(sceneProps, 'compress_svgs')
 
         col = layout.column(align=True, heading='Debug')
         col.prop(sceneProps, "measureit_arch_debug_text")
@@ -433,6 +460,7 @@ def draw_main(context):
 
     sceneProps = scene.MeasureItArchProps
     sceneProps.text_updated = False
+    clear_text_update_queue()
 
 
 def text_update_loop(context, objlist):
@@ -441,187 +469,77 @@ def text_update_loop(context, objlist):
     if sceneProps.skip_text:
         return
 
+    # Only objects queued by property updates or changed measurements need
+    # their text redrawn, unless a scene wide setting or style changed
+    update_all, queue = get_text_update_queue()
+    update_all = (update_all or sceneProps.text_updated or
+                  sceneProps.is_render_draw or sceneProps.is_vector_draw)
+    if not update_all and not queue:
+        return
+
     if sceneProps.is_render_draw:
         startTime = time.time()
-    scene = bpy.context.scene
-    sceneProps = scene.MeasureItArchProps
-    for myobj in objlist:
-        if check_obj_vis(myobj,False):
-            if 'DimensionGenerator' in myobj:
-                DimGen = myobj.DimensionGenerator
-                for alignedDim in DimGen.alignedDimensions:
-
-                    alignedDimProps = alignedDim
-                    if alignedDim.uses_style:
-                        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if alignedDimStyle.name == alignedDim.style:
-                                alignedDimProps = alignedDimStyle
-
-                    update_text(textobj=alignedDim,
-                                props=alignedDimProps, context=context)
-
-                for angleDim in DimGen.angleDimensions:
-                    dimProps = angleDim
-                    if angleDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == angleDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=angleDim,
-                                props=dimProps, context=context)
-
-                for axisDim in DimGen.axisDimensions:
-                    dimProps = axisDim
-                    if axisDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == axisDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=axisDim,
-                                props=dimProps, context=context)
-
-                for boundsDim in DimGen.boundsDimensions:
-                    dimProps = boundsDim
-                    if boundsDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == boundsDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=boundsDim,
-                                props=dimProps, context=context)
-
-                for arcDim in DimGen.arcDimensions:
-                    dimProps = arcDim
-                    if arcDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == arcDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=arcDim, props=dimProps, context=context)
-
-                for areaDim in DimGen.areaDimensions:
-                    dimProps = areaDim
-                    if areaDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == areaDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=areaDim,
-                                props=dimProps, context=context)
-
-            if 'AnnotationGenerator' in myobj:
-                annotationGen = myobj.AnnotationGenerator
-                for annotation in annotationGen.annotations:
-                    annotationProps = annotation
-                    if annotation.uses_style:
-                        for annotationStyle in context.scene.StyleGenerator.annotations:
-                            if annotationStyle.name == annotation.style:
-                                annotationProps = annotationStyle
-
-                    fields = []
-                    notesFlag = False
-                    for textField in annotation.textFields:
-                        fields.append(textField)
-                        if textField.autoFillText and textField.textSource == 'NOTES':
-                            notesFlag = True
-
-                    if notesFlag:
-                        view = get_view()
-                        for textField in view.textFields:
-                            fields.append(textField)
-
-                    update_text(textobj=annotation, props=annotationProps, context=context, fields=fields)
-
-            if 'TableGenerator' in myobj:
-                tableGen = myobj.TableGenerator
-                for table in tableGen.tables:
-                    fields = []
-                    for row in table.rows:
-                        fields.extend(row.textFields)
-                    update_text(textobj=table, props=table, context=context, fields=fields)
-                # Draw Instanced Objects
-
 
+    for myobj in objlist:
+        if update_all:
+            if check_obj_vis(myobj,False):
+                update_object_text(context, myobj)
+        elif myobj.name in queue:
+            # Hidden objects are updated too, the queue is drained after
+            # this draw and their text would be stale once they're shown
+            update_object_text(context, myobj)
+
+    # Draw Instanced Objects
     deps = bpy.context.view_layer.depsgraph
     for obj_int in deps.object_instances:
         if obj_int.is_instance:
             myobj = obj_int.object
-
-            annotationGen = myobj.AnnotationGenerator
-            for annotation in annotationGen.annotations:
-                annotationProps = annotation
-                if annotation.uses_style:
-                    for annotationStyle in context.scene.StyleGenerator.annotations:
-                        if annotationStyle.name == annotation.style:
-                            annotationProps = annotationStyle
-
-                fields = []
-                notesFlag = False
-                for textField in annotation.textFields:
-                    fields.append(textField)
-                    if textField.autoFillText and textField.textSource == 'NOTES':
-                        notesFlag = True
-
-                if notesFlag:
-                    view = get_view()
-                    for textField in view.textFields:
-                        fields.append(textField)
-
-                update_text(
-                    textobj=annotation, props=annotationProps,
-                    context=context, fields=fields)
-
-
-            if sceneProps.instance_dims:
-
-                DimGen = myobj.DimensionGenerator
-                for alignedDim in DimGen.alignedDimensions:
-
-                    alignedDimProps = alignedDim
-                    if alignedDim.uses_style:
-                        for alignedDimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if alignedDimStyle.name == alignedDim.style:
-                                alignedDimProps = alignedDimStyle
-
-                    update_text(textobj=alignedDim,
-                                props=alignedDimProps, context=context)
-
-                for angleDim in DimGen.angleDimensions:
-                    dimProps = angleDim
-                    if angleDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == angleDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=angleDim,
-                                props=dimProps, context=context)
-
-                for axisDim in DimGen.axisDimensions:
-                    dimProps = axisDim
-                    if axisDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == axisDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=axisDim,
-                                props=dimProps, context=context)
-
-                for boundsDim in DimGen.boundsDimensions:
-                    dimProps = boundsDim
-                    if boundsDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == boundsDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=boundsDim,
-                                props=dimProps, context=context)
-
-                for arcDim in DimGen.arcDimensions:
-                    dimProps = arcDim
-                    if arcDim.uses_style:
-                        for dimStyle in context.scene.StyleGenerator.alignedDimensions:
-                            if dimStyle.name == arcDim.style:
-                                dimProps = dimStyle
-                    update_text(textobj=arcDim, props=dimProps,
-                                context=context)
+            if not update_all and myobj.name not in queue:
+                continue
+            update_object_text(context, myobj, dims=sceneProps.instance_dims,
+                               tables=False)
 
     if sceneProps.is_render_draw:
         endTime = time.time()
         print("Text Update Loop Time: " + str(endTime - startTime))
 
 
+def update_object_text(context, myobj, dims=True, tables=True):
+    """ Updates the text of every dimension, annotation and table on an object """
+    if dims and 'DimensionGenerator' in myobj:
+        DimGen = myobj.DimensionGenerator
+        for dimType in DIMENSION_TYPES:
+            for dim in getattr(DimGen, dimType):
+                dimProps = get_style(dim, 'alignedDimensions', scene=context.scene)
+                update_text(textobj=dim, props=dimProps, context=context)
+
+    if 'AnnotationGenerator' in myobj:
+        annotationGen = myobj.AnnotationGenerator
+        for annotation in annotationGen.annotations:
+            annotationProps = get_style(annotation, 'annotations', scene=context.scene)
+
+            fields = []
+            notesFlag = False
+            for textField in annotation.textFields:
+                fields.append(textField)
+                if textField.autoFillText and textField.textSource == 'NOTES':
+                    notesFlag = True
+
+            if notesFlag:
+                view = get_view()
+                for textField in view.textFields:
+                    fields.append(textField)
+
+            update_text(textobj=annotation, props=annotationProps, context=context, fields=fields)
+
+    if tables and 'TableGenerator' in myobj:
+        tableGen = myobj.TableGenerator
+        for table in tableGen.tables:
+            fields = []
+            for row in table.rows:
+                fields.extend(row.textFields)
+            update_text(textobj=table, props=table, context=context, fields=fields)
+
 
 def draw_main_3d(context):
 
@@ -644,6 +562,7 @@ def draw_main_3d(context):
         draw_titleblock(context)
 
     scene.ViewGenerator.view_changed = False
+    clear_dirty_objects()
 
     StyleGen = context.scene.StyleGenerator
     dimStyles = StyleGen.alignedDimensions
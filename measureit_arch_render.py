@@ -28,19 +28,21 @@ import bpy
 import gpu
 import os
 from .measureit_arch_baseclass import recalc_index
-import svgwrite
 import xml.etree.ElementTree as ET
 import time
 import ezdxf
+import numpy as np
 
 from addon_utils import check, paths
 from bpy.types import Panel, Operator
 from sys import exc_info
 from datetime import datetime
+from mathutils import Vector
 
 from . import svg_shaders
 from . import vector_utils
-from .measureit_arch_geometry import draw3d_loop, batch_for_shader
+from .svg_writer import StreamingDrawing
+from .measureit_arch_geometry import draw3d_loop, batch_for_shader, get_depth_pass_meshes
 from .measureit_arch_main import draw_main, draw_titleblock, text_update_loop,draw_viewport
 from .measureit_arch_utils import get_resolution, get_view, local_attrs, get_loaded_addons, OpenGL_Settings, Set_Render, load_shader_str, get_projection_matrix, get_view_outpath
 from .measureit_arch_units import BU_TO_INCHES
@@ -407,53 +409,101 @@ def save_image(self, filepath, image):
         self.report({'ERROR'}, "MeasureIt_ARCH: Unable to save render image")
 
 
-def draw_scene(self, context, projection_matrix):
+def draw_scene(self, context, projection_matrix, meshes=None):
     """ Draw Scene Geometry for Depth Buffer """
+    if meshes is None:
+        meshes = get_depth_pass_meshes(context)
 
     with OpenGL_Settings(None):
-        # Get List of Mesh Objects
-        deps = bpy.context.view_layer.depsgraph
-        num_instances = len(deps.object_instances)
+        view_projection = get_projection_matrix()
+        num_instances = len(meshes)
         idx = 0
 
-
-        for obj_int in deps.object_instances:
+        depthOnlyshader.bind()
+        for geometry, matrix in meshes:
             idx += 1
-            vertices = []
-            indices = []
-            obj = obj_int.object
-            parent = obj_int.parent
             print("Rendering Object: " + str(idx) + " of: " +
-                  str(num_instances) + " Name: " + obj.name + " To Depth Buffer")
-            
+                  str(num_instances) + " To Depth Buffer")
+
+            # Batches are built once per mesh, instances only change the matrix
+            batch = geometry.get("batch")
+            if batch is None:
+                batch = batch_for_shader(depthOnlyshader, 'TRIS', {
+                                        "pos": geometry["vertices"]}, indices=geometry["triangles"])
+                geometry["batch"] = batch
+
+            depthOnlyshader.uniform_float("viewProjectionMatrix", view_projection @ matrix)
+            batch.draw(depthOnlyshader)
+        gpu.shader.unbind()
+
+
+def render_depth_pass(self, context, width, height):
+    """
+    Renders the scene depth used by the vector depth test. Draws on the GPU
+    unless the Software Depth Buffer method is chosen or there is no GPU
+    context, as in some background renders.
+    """
+    scene = context.scene
+    sceneProps = scene.MeasureItArchProps
+    render_start_time = time.time()
 
-            ignore = obj.MeasureItArchProps.ignore_in_depth_test
-            if parent != None:
-                ignore = obj.MeasureItArchProps.ignore_in_depth_test or parent.MeasureItArchProps.ignore_in_depth_test
+    # Remove depth buffers saved to the .blend by older versions
+    if 'depthbuffer' in sceneProps:
+        del sceneProps['depthbuffer']
 
-            if obj.type == 'MESH' and not(obj.hide_render or obj.display_type == "WIRE" or ignore):
-                mat = obj_int.matrix_world
-                #obj_eval = obj.evaluated_get(deps)
-                mesh = obj.to_mesh(
-                    preserve_all_data_layers=False, depsgraph=bpy.context.view_layer.depsgraph)
-                mesh.calc_loop_triangles()
-                tris = mesh.loop_triangles
+    offscreen = None
+    if sceneProps.depth_test_method != 'SOFTWARE_BUFFER':
+        try:
+            offscreen = gpu.types.GPUOffScreen(width, height)
+        except Exception as e:
+            print("No GPU context for the depth pass ({}), "
+                  "using the Software Depth Buffer".format(e))
+
+    meshes = get_depth_pass_meshes(context)
+    if offscreen is None:
+        depth_buffer = vector_utils.render_software_depthbuffer(context, width, height, meshes)
+        vector_utils.store_depthbuffer(depth_buffer, width, height)
+    else:
+        clipdepth = scene.camera.data.clip_end
+        view_matrix_3d = scene.camera.matrix_world.inverted()
+        with offscreen.bind():
+            deps = context.evaluated_depsgraph_get()
+            projection_matrix = scene.camera.calc_matrix_camera(deps, x=width, y=height)
+            with OpenGL_Settings(None):
+                # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
+                fb = gpu.state.active_framebuffer_get()
+                fb.clear(color=(0.0, 0.0, 0.0, 0.0), depth = clipdepth)
 
+                gpu.matrix.reset()
+                gpu.matrix.load_matrix(view_matrix_3d)
+                gpu.matrix.load_projection_matrix(projection_matrix)
 
-                vertices = [mat @ vert.co for vert in mesh.vertices]
-                indices = [[tri.vertices[0],tri.vertices[1],tri.vertices[2]] for tri in tris]
+                print("Drawing Scene")
+                draw_scene(self, context, projection_matrix, meshes)
 
-                obj.to_mesh_clear()
+                # Read Depth Buffer
+                depth_buffer = fb.read_depth(0, 0, width, height)
+                depth_buffer.dimensions = width * height
+                vector_utils.store_depthbuffer(depth_buffer, width, height)
+                del depth_buffer
+        offscreen.free()
 
-            depthOnlyshader.bind()
-            depthOnlyshader.uniform_float("viewProjectionMatrix", get_projection_matrix())
-            batch = batch_for_shader(depthOnlyshader, 'TRIS', {
-                                    "pos": vertices}, indices=indices)
-            batch.program_set(depthOnlyshader)
-            batch.draw()
-            gpu.shader.unbind()
-            del vertices
-            del indices
+    render_end_time = time.time()
+    print("Rendering Scene To Depth Buffer took: " + str(render_end_time - render_start_time))
+    print("")
+
+    if sceneProps.debug_depth_pass:
+        print("Reading Buffer to Image")
+        image_name = "measureit_arch_depth"
+        if image_name not in bpy.data.images:
+            bpy.data.images.new(image_name, width, height)
+
+        image = bpy.data.images[image_name]
+        image.scale(width, height)
+        pixel_array = np.ones((width * height, 4), dtype=np.float32)
+        pixel_array[:, :3] = vector_utils.depthbuffer[:, None]
+        image.pixels.foreach_set(pixel_array.ravel())
+        del pixel_array
 
 
 def render_main_svg(self, context):
@@ -465,7 +515,6 @@ def render_main_svg(self, context):
     with Set_Render(sceneProps, is_vector = True):
         vector_utils.clear_db()
 
-        clipdepth = context.scene.camera.data.clip_end
         objlist = context.view_layer.objects
 
         # Get resolution
@@ -473,75 +522,19 @@ def render_main_svg(self, context):
         width = int(scene.render.resolution_x * render_scale)
         height = int(scene.render.resolution_y * render_scale)
 
-        view_matrix_3d = scene.camera.matrix_world.inverted()
-
         # Render Depth Buffer
-
         if view.vector_depthtest:
-            render_start_time = time.time()
-            offscreen = gpu.types.GPUOffScreen(width, height)
-            with offscreen.bind():
-                # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
-                deps = context.evaluated_depsgraph_get()
-                projection_matrix = scene.camera.calc_matrix_camera(deps, x=width, y=height)
-                with OpenGL_Settings(None):
-                    # Clear Frame Buffer
-                    fb = gpu.state.active_framebuffer_get()
-                    fb.clear(color=(0.0, 0.0, 0.0, 0.0), depth = clipdepth)
-
-                    gpu.matrix.reset()
-                    gpu.matrix.load_matrix(view_matrix_3d)
-                    gpu.matrix.load_projection_matrix(projection_matrix)
-
-                    draw_scene(self, context, projection_matrix)
+            render_depth_pass(self, context, width, height)
 
-                    # Read Depth Buffer
-                    depth_buffer = fb.read_depth(0, 0, width, height)
-                    depth_buffer.dimensions = width * height
-
-                    buffer_start_time = time.time()
-                    if 'depthbuffer' in sceneProps:
-                        del sceneProps['depthbuffer']
-                    sceneProps['depthbuffer'] = depth_buffer
-
-                    render_end_time = time.time()
-                    del depth_buffer
-                    print("Reading Depth Buffer to SceneProps took: " + str(render_end_time - buffer_start_time))
-                    print("Rendering Scene To Depth Buffer took: " + str(render_end_time - render_start_time))
-                    print("")
-
-                    if sceneProps.debug_depth_pass:
-                        print("Reading Buffer to Image")
-                        scene = context.scene
-
-                        depth_buffer = fb.read_depth(0, 0, width, height)
-
-                        image_name = "measureit_arch_depth"
-                        if image_name not in bpy.data.images:
-                            bpy.data.images.new(image_name, width, height)
-
-                        image = bpy.data.images[image_name]
-                        image.scale(width, height)
-                        pixel_array = []
-                        depth_buffer.dimensions = width * height
-                        for v in depth_buffer:
-                            pixel_array.append(v)
-                            pixel_array.append(v)
-                            pixel_array.append(v)
-                            pixel_array.append(1)
-                        image.pixels = pixel_array
-                        del pixel_array
-                        del depth_buffer
-
-            offscreen.free()
         vector_utils.set_globals()
 
 
 
         # Setup Output Path
         view = get_view()
+        extension = 'svgz' if sceneProps.compress_svgs else 'svg'
         outpath = get_view_outpath(
-            scene, view, "{:04d}.svg".format(scene.frame_current))
+            scene, view, "{:04d}.{}".format(scene.frame_current, extension))
 
         res = get_resolution()
 
@@ -553,9 +546,12 @@ def render_main_svg(self, context):
             paperWidth = width / res
             paperHeight = height / res
 
-        # Setup basic svg
-        svg = svgwrite.Drawing(
+        # Setup basic svg, elements are written to disk as each object is drawn
+        svg = StreamingDrawing(
             outpath,
+            pretty=sceneProps.pretty_svgs,
+            compact=sceneProps.compact_svg_numbers,
+            compress=sceneProps.compress_svgs,
             debug=False,
             size=('{}in'.format(paperWidth), '{}in'.format(paperHeight)),
             viewBox=('0 0 {} {}'.format(width, height)),
@@ -618,6 +614,8 @@ def render_main_svg(self, context):
                 svg_root = ET.parse(svg_image_path).getroot()
                 for elem in svg_root:
                     svg.add(SVGWriteElement(elem))
+                svg.flush()
+                del svg_root
 
                 if (os.path.exists(svg_image_path) and
                     not sceneProps.keep_freestyle_svg):
@@ -646,6 +644,8 @@ def render_main_svg(self, context):
             svg_root = ET.parse(gp_image_path).getroot()
             for elem in svg_root:
                 svg.add(SVGWriteElement(elem))
+            svg.flush()
+            del svg_root
 
             if os.path.exists(gp_image_path):
                 os.remove(gp_image_path)
@@ -670,11 +670,11 @@ def render_main_svg(self, context):
             svgColor = svg_shaders.get_svg_color((1,0,0))
             lines = svg.g(id='edgemap', stroke=svgColor,fill = 'none',
                     stroke_width="1", stroke_linecap='butt')
-            for edge in vector_utils.edgemap:
-
-                svg_shaders.draw_single_line(edge.start_coord, edge.end_coord,svg=svg,lines=lines,depth_test=False)
+            edgemap = vector_utils.edgemap
+            for start, end in zip(edgemap.starts, edgemap.ends):
+                svg_shaders.draw_single_line(Vector(start), Vector(end),svg=svg,lines=lines,depth_test=False)
             svg.add(lines)
-        svg.save(pretty=True)
+        svg.save()
 
         # restore default value
         sceneProps.is_render_draw = False
@@ -690,18 +690,16 @@ def render_main_svg(self, context):
 
 
 
-def render_main_dxf(self, context):
+def render_main_dxf(self, context, offset_x=0, outpath=None):
     print('rendering dxf')
     startTime = time.time()
     scene = context.scene
     sceneProps = scene.MeasureItArchProps
     view = get_view()
 
-    with Set_Render(sceneProps, is_dxf = True):
+    with Set_Render(sceneProps, is_dxf = True, offset_x = offset_x):
         vector_utils.clear_db()
 
-
-        clipdepth = context.scene.camera.data.clip_end
         objlist = context.view_layer.objects
 
         # Get resolution
@@ -710,43 +708,17 @@ def render_main_dxf(self, context):
         height = int(scene.render.resolution_y * render_scale)
 
 
-        view_matrix_3d = scene.camera.matrix_world.inverted()
         # Render Depth Buffer
-
         if view.vector_depthtest:
-            print("Rendering Depth Buffer")
-            offscreen = gpu.types.GPUOffScreen(width, height)
-            with offscreen.bind():
-                # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
-                deps = context.evaluated_depsgraph_get()
-                projection_matrix = scene.camera.calc_matrix_camera(deps, x=width, y=height)
-                with OpenGL_Settings(None):
-
-                    # Clear Frame Buffer
-                    fb = gpu.state.active_framebuffer_get()
-                    fb.clear(color=(0.0, 0.0, 0.0, 0.0), depth = clipdepth)
-
-                    gpu.matrix.reset()
-                    gpu.matrix.load_matrix(view_matrix_3d)
-                    gpu.matrix.load_projection_matrix(projection_matrix)
-
-                    print("Drawing Scene")
-                    draw_scene(self, context, projection_matrix)
-
-                    print("Reading to Buffer")
-                    depth_buffer = fb.read_depth(0, 0, width, height)
-                    depth_buffer.dimensions = width * height
-
-                    if 'depthbuffer' in sceneProps:
-                        del sceneProps['depthbuffer']
-                    sceneProps['depthbuffer'] = depth_buffer
+            render_depth_pass(self, context, width, height)
 
         vector_utils.set_globals()
 
         # Setup Output Path
         view = get_view()
-        outpath = get_view_outpath(
-            scene, view, "{:04d}.dxf".format(scene.frame_current))
+        if outpath is None:
+            outpath = get_view_outpath(
+                scene, view, "{:04d}.dxf".format(scene.frame_current))
         res = get_resolution()
 
         if view and view.res_type == 'PAPER':
@@ -0,0 +1,174 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: measureit_arch_text_atlas.py
+# Runtime GPU atlas of rendered text labels, never saved to the .blend
+# Author: Kevan Cress
+# ----------------------------------------------------------
+
+import gpu
+
+
+__all__ = (
+    'get_label',
+    'add_label',
+    'touch_frame',
+    'clear_text_atlas',
+)
+
+ATLAS_PAGE_SIZE = 2048
+MAX_ATLAS_PAGES = 8
+
+# Pixels left empty around each label so filtering doesn't bleed
+LABEL_PADDING = 2
+
+# Atlas pages, and the labels packed in them keyed by their render settings
+_pages = []
+_labels = {}
+_frame = 0
+
+
+class AtlasPage(object):
+    """ A GPUOffScreen packed with labels in rows of similar height """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.offscreen = gpu.types.GPUOffScreen(width, height)
+        self.last_used = _frame
+        self.keys = []
+
+        # Rows are [y, height, next free x]
+        self.rows = []
+        self.next_row_y = 0
+
+        with self.offscreen.bind():
+            fb = gpu.state.active_framebuffer_get()
+            fb.clear(color=(0.0, 0.0, 0.0, 0.0))
+
+    def allocate(self, width, height):
+        width += LABEL_PADDING
+        height += LABEL_PADDING
+        for row in self.rows:
+            if height <= row[1] and row[2] + width <= self.width:
+                x = row[2]
+                row[2] += width
+                return (x, row[0])
+
+        if self.next_row_y + height > self.height or width > self.width:
+            return None
+
+        row = [self.next_row_y, height, width]
+        self.rows.append(row)
+        self.next_row_y += height
+        return (0, row[0])
+
+    def free(self):
+        self.offscreen.free()
+
+
+class AtlasLabel(object):
+    """ A label's page and pixel region in the atlas """
+
+    def __init__(self, page, x, y, width, height):
+        self.page = page
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def uv(self, u, v):
+        """ Maps a uv on the label to a uv on its atlas page """
+        return ((self.x + u * self.width) / self.page.width,
+                (self.y + v * self.height) / self.page.height)
+
+
+def touch_frame():
+    """
+    Advances the frame counter used to find least recently used pages, and
+    trims the atlas back to MAX_ATLAS_PAGES with pages unused this frame
+    """
+    global _frame
+    _trim_pages(_frame)
+    _frame += 1
+
+
+def get_label(key):
+    """ Returns the AtlasLabel for a key, or None if it isn't in the atlas """
+    label = _labels.get(key)
+    if label is not None:
+        label.page.last_used = _frame
+    return label
+
+
+def add_label(key, width, height):
+    """
+    Reserves a region for a new label. The caller draws the label into
+    label.page.offscreen at (label.x, label.y). When every page is full
+    the least recently used page is evicted, and its labels are redrawn
+    the next time they're requested. Pages used in the current frame are
+    never evicted, the atlas grows past MAX_ATLAS_PAGES instead until the
+    next touch_frame().
+    """
+    if key in _labels:
+        return _labels[key]
+
+    page, pos = None, None
+    for candidate in _pages:
+        pos = candidate.allocate(width, height)
+        if pos is not None:
+            page = candidate
+            break
+
+    if page is None:
+        if len(_pages) >= MAX_ATLAS_PAGES:
+            _trim_pages(_frame, MAX_ATLAS_PAGES - 1)
+
+        # Labels larger than a page get a page of their own
+        page = AtlasPage(max(ATLAS_PAGE_SIZE, width + LABEL_PADDING),
+                         max(ATLAS_PAGE_SIZE, height + LABEL_PADDING))
+        _pages.append(page)
+        pos = page.allocate(width, height)
+
+    label = AtlasLabel(page, pos[0], pos[1], width, height)
+    page.keys.append(key)
+    page.last_used = _frame
+    _labels[key] = label
+    return label
+
+
+def _trim_pages(frame, max_pages=MAX_ATLAS_PAGES):
+    """ Evicts least recently used pages not used in frame, down to max_pages """
+    stale = sorted((p for p in _pages if p.last_used < frame), key=lambda p: p.last_used)
+    for page in stale[:max(0, len(_pages) - max_pages)]:
+        _evict_page(page)
+
+
+def _evict_page(page):
+    for key in page.keys:
+        del _labels[key]
+    _pages.remove(page)
+    page.free()
+
+
+def clear_text_atlas():
+    for page in _pages:
+        page.free()
+    _pages.clear()
+    _labels.clear()
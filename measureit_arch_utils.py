@@ -215,6 +215,119 @@ def get_projection_matrix():
 
     return modelViewProjectionMatrix
 
+# Style lookup tables keyed by (scene name, style type), each mapping
+# style names and previous names to the style's index in its collection.
+# Indices are kept rather than the styles, as references to collection
+# items are left dangling when Blender reallocates the collection
+_style_registry = {}
+
+
+def _build_style_index(styles):
+    by_name = {}
+    by_previous_name = {}
+    for idx, style in enumerate(styles):
+        by_name.setdefault(style.name, idx)
+        by_previous_name[style.previous_name] = idx
+    return {
+        'count': len(styles),
+        'by_name': by_name,
+        'by_previous_name': by_previous_name,
+    }
+
+
+def _resolve_style(styles, idx, name):
+    """ Returns styles[idx] if it's still the style named name """
+    if idx is None or idx >= len(styles):
+        return None
+    style = styles[idx]
+    if style.name != name:
+        return None
+    return style
+
+
+def get_style(item, type_str, scene=None):
+    """
+    Returns the style an item uses, or the item itself if it has no style.
+    Styles are looked up by name in a registry of collection indices, which
+    is rebuilt when the collection changes size, when the style at a cached
+    index no longer has that name, or when a style is renamed
+    """
+    if not item.uses_style:
+        return item
+
+    if scene is None:
+        scene = bpy.context.scene.MeasureItArchProps.source_scene
+        if scene is None:
+            scene = bpy.context.scene
+
+    styles = getattr(scene.StyleGenerator, type_str)
+    key = (scene.name, type_str)
+    index = _style_registry.get(key)
+    if index is None or index['count'] != len(styles):
+        index = _build_style_index(styles)
+        _style_registry[key] = index
+
+    idx = index['by_name'].get(item.style)
+    style = _resolve_style(styles, idx, item.style)
+    if style is None and idx is not None:
+        # Styles were moved, rebuild and look again
+        index = _build_style_index(styles)
+        _style_registry[key] = index
+        style = _resolve_style(styles, index['by_name'].get(item.style), item.style)
+
+    if style is not None:
+        return style
+
+    # The style wasn't found, check previous names to update the property.
+    # Names that were never a style are left as they are, without a rebuild
+    idx = index['by_previous_name'].get(item.style)
+    if idx is not None and idx < len(styles) and styles[idx].previous_name == item.style:
+        style = styles[idx]
+        item.style = style.name
+        return style
+
+    return item
+
+
+def clear_style_registry():
+    """
+    Drops cached styles, needed whenever Blender reallocates ID data or a
+    style is renamed
+    """
+    _style_registry.clear()
+
+
+# Names of objects with text waiting to be redrawn, and whether every
+# object needs a text update (scene owned text or styles changed)
+_text_update_queue = set()
+_text_update_all = True
+
+
+def queue_text_update(item):
+    """
+    Queues the object owning a dimension, annotation, table or text field
+    for the next text update. Items owned by a scene (styles, view notes)
+    can be used by any object, so they queue a full update
+    """
+    global _text_update_all
+    owner = item.id_data
+    if isinstance(owner, bpy.types.Object):
+        _text_update_queue.add(owner.name)
+    else:
+        _text_update_all = True
+
+
+def get_text_update_queue():
+    """ Returns (update all, queued object names) """
+    return _text_update_all, _text_update_queue
+
+
+def clear_text_update_queue():
+    global _text_update_all
+    _text_update_all = False
+    _text_update_queue.clear()
+
+
 def get_view():
     scene = bpy.context.scene
     ViewGen = scene.ViewGenerator
@@ -357,6 +470,9 @@ def get_loaded_addons():
     return addon_list
 
 def get_rv3d():
+    # No area when exporting from the command line
+    if bpy.context.area is None:
+        return None
     spaces = bpy.context.area.spaces
     rv3d = None
     for space in spaces:
@@ -365,6 +481,8 @@ def get_rv3d():
     return rv3d
 
 def get_sv3d():
+    if bpy.context.area is None:
+        return None
     spaces = bpy.context.area.spaces
     sv3d = None
     for space in spaces:
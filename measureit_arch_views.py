@@ -1,5 +1,4 @@
 import bpy
-import gpu
 import os
 import copy
 import webbrowser
@@ -21,11 +20,11 @@ from bpy.app.handlers import persistent
 from mathutils import Vector, Matrix
 
 from . import vector_utils
-from .measureit_arch_render import render_main, render_main_svg, recalc_index, get_view_outpath, draw_scene
+from .measureit_arch_render import render_main, render_main_svg, recalc_index, get_view_outpath, render_depth_pass
 from .measureit_arch_baseclass import TextField, draw_textfield_settings
 from .measureit_arch_geometry import draw3d_loop
 from .measureit_arch_viewports import Viewport
-from . measureit_arch_utils import get_loaded_addons, get_resolution, get_view, _imp_scales_dict, _metric_scales_dict,OpenGL_Settings, Set_Render
+from . measureit_arch_utils import get_loaded_addons, get_resolution, get_view, _imp_scales_dict, _metric_scales_dict, Set_Render
 from .measureit_arch_units import BU_TO_INCHES
 
 
@@ -775,7 +774,6 @@ class BatchDXFRender(Operator):
                         
                         ###### DXF RENDER  CODE
                         vector_utils.clear_db()
-                        clipdepth = context.scene.camera.data.clip_end
                         objlist = context.view_layer.objects
 
                         # Get resolution
@@ -783,33 +781,8 @@ class BatchDXFRender(Operator):
                         width = int(scene.render.resolution_x * render_scale)
                         height = int(scene.render.resolution_y * render_scale)
 
-                        view_matrix_3d = scene.camera.matrix_world.inverted()
-
                         if view.vector_depthtest:
-                            print("Rendering Depth Buffer")
-                            offscreen = gpu.types.GPUOffScreen(width, height)
-                            with offscreen.bind():
-                                # Clear Depth Buffer, set Clear Depth to Cameras Clip Distance
-                                deps = context.evaluated_depsgraph_get()
-                                projection_matrix = scene.camera.calc_matrix_camera(deps, x=width, y=height)
-                                with OpenGL_Settings(None):
-                                    fb = gpu.state.active_framebuffer_get()
-                                    fb.clear(color=(0.0, 0.0, 0.0, 0.0), depth = clipdepth)
-
-                                    gpu.matrix.reset()
-                                    gpu.matrix.load_matrix(view_matrix_3d)
-                                    gpu.matrix.load_projection_matrix(projection_matrix)
-
-                                    print("Drawing Scene")
-                                    draw_scene(self, context, projection_matrix)
-
-                                    print("Reading to Buffer")
-                                    depth_buffer = fb.read_depth(0, 0, width, height)
-                                    depth_buffer.dimensions = width * height
-
-                                    if 'depthbuffer' in sceneProps:
-                                        del sceneProps['depthbuffer']
-                                    sceneProps['depthbuffer'] = depth_buffer
+                            render_depth_pass(self, context, width, height)
 
                         vector_utils.set_globals()
 
@@ -1188,6 +1161,9 @@ class SCENE_MT_Views_menu(bpy.types.Menu):
         layout.operator('measureit_arch.batchdxfrender',
             text = "Batch Render DXF", icon = "DOCUMENTS")
 
+        layout.operator('measureit_arch.batchparallelrender',
+            text = "Parallel Batch Render", icon = "DOCUMENTS")
+
 class OpenInBrowser(Operator):
     bl_idname = "measureit_arch.openinbrowser"
     bl_label = "Open"
@@ -29,17 +29,24 @@ import bmesh
 import time
 import bpy_extras.object_utils as object_utils
 import math
+import numpy as np
 import svgwrite
 
-from fontTools import ttLib
-
 from math import fabs, sqrt
 from mathutils import Vector, Matrix
 from sys import getrecursionlimit, setrecursionlimit
 from . import vector_utils
+from .measureit_arch_fonts import get_font_path, get_font_family
 
 from .measureit_arch_utils import get_view, interpolate3d, get_camera_z_dist, recursionlimit, get_resolution, get_scale, pts_to_px, rgb_gamma_correct
 
+# Decimal places kept for line coordinates in px, so segments that meet
+# share exactly the same endpoints and can be joined into paths
+SVG_LINE_PRECISION = 3
+
+# Sine of the largest bend treated as straight when merging collinear lines
+SVG_COLLINEAR_TOLERANCE = 1e-4
+
 
 def svg_line_shader(item, itemProps, coords, thickness, color, svg, parent=None, mat=Matrix.Identity(4)):
     weight_scale_fac = 1.3333333333333333 * get_resolution()/96
@@ -88,29 +95,89 @@ def svg_line_shader(item, itemProps, coords, thickness, color, svg, parent=None,
     if dashed:
         lines = dashed_lines
 
-    for x in range(0, len(coords) - 1, 2):
-        draw_single_line(coords[x],coords[x+1],mat,itemProps,svg,lines,dashed_lines,cap,draw_hidden)
+    # Sort the visible parts of each line by style, then join them into paths
+    visible_segs = []
+    hidden_segs = []
+    drawn = set()
+    line_points = []
+    line_vis = []
+    for line_segs in vector_utils.depth_test_lines(coords, mat, itemProps):
+        for line in line_segs:
+            vis = line[0]
+            if vis == -1:
+                continue
+
+            if vis or draw_hidden:
+                line_points.append(line[1])
+                line_points.append(line[2])
+                line_vis.append(bool(vis))
+
+    # Project every line end point at once
+    ss_lines = np.round(vector_utils.projection.pixels(line_points, mat), SVG_LINE_PRECISION)
+    for (p1ss, p2ss), vis in zip(ss_lines.reshape(-1, 2, 2).tolist(), line_vis):
+        p1ss = tuple(p1ss)
+        p2ss = tuple(p2ss)
+        key = (min(p1ss, p2ss), max(p1ss, p2ss), vis)
+        if p1ss == p2ss or key in drawn:
+            continue
+        drawn.add(key)
+
+        if vis:
+            visible_segs.append((p1ss, p2ss))
+        else:
+            hidden_segs.append((p1ss, p2ss))
+
+    draw_line_paths(visible_segs, lines, svg)
+    draw_line_paths(hidden_segs, dashed_lines, svg)
 
 
-def draw_single_line(p1,p2,mat=Matrix.Identity(4),itemProps=None,svg=None,lines=None,dashed_lines=None,cap=None,draw_hidden=False,depth_test=True):
-    if depth_test:
+def draw_line_paths(segs, group, svg):
+    """ Adds segments to a group as a single path, connected segments are joined """
+    if len(segs) == 0:
+        return
+
+    merge = bpy.context.scene.MeasureItArchProps.merge_collinear_lines
+    chains = vector_utils.chain_segments(
+        segs, merge_collinear=merge, tolerance=SVG_COLLINEAR_TOLERANCE)
+
+    commands = []
+    for chain in chains:
+        commands.append('M{},{}'.format(*chain[0]))
+        if len(chain) > 3 and chain[0] == chain[-1]:
+            commands.extend('L{},{}'.format(*point) for point in chain[1:-1])
+            commands.append('Z')
+        else:
+            commands.extend('L{},{}'.format(*point) for point in chain[1:])
+
+    group.add(svg.path(d=' '.join(commands)))
+
+
+def draw_single_line(p1,p2,mat=Matrix.Identity(4),itemProps=None,svg=None,lines=None,dashed_lines=None,cap=None,draw_hidden=False,depth_test=True,line_segs=None):
+    if line_segs is not None:
+        pass
+    elif depth_test:
         line_segs = vector_utils.depth_test(p1, p2, mat, itemProps)
     else: line_segs = [[1,p1,p2]]
+
+    line_points = []
+    line_vis = []
     for line in line_segs:
         vis = line[0]
-        p1 = line[1]
-        p2 = line[2]
         if vis == -1:
             continue
 
         if vis or draw_hidden:
-            p1ss = vector_utils.get_render_location(mat @ Vector(p1))
-            p2ss = vector_utils.get_render_location(mat @ Vector(p2))
-            line_draw = svg.line(start=tuple(p1ss), end=tuple(p2ss))
-            if vis:
-                lines.add(line_draw)
-            elif not vis and draw_hidden:
-                dashed_lines.add(line_draw)
+            line_points.append(line[1])
+            line_points.append(line[2])
+            line_vis.append(vis)
+
+    ss_lines = vector_utils.projection.pixels(line_points, mat).reshape(-1, 2, 2).tolist()
+    for (p1ss, p2ss), vis in zip(ss_lines, line_vis):
+        line_draw = svg.line(start=tuple(p1ss), end=tuple(p2ss))
+        if vis:
+            lines.add(line_draw)
+        else:
+            dashed_lines.add(line_draw)
 
 def svg_fill_from_curve_shader(curve,svg,parent=None,mat =Matrix.Identity):    
     weight_scale_fac = 1.3333333333333333 * get_resolution()/96
@@ -144,35 +211,32 @@ def svg_fill_from_curve_shader(curve,svg,parent=None,mat =Matrix.Identity):
             if spline.material_index != i:
                 continue
             path_strings = []
-            hidden_path_strings = []
-            curve_segs = []
-            for j in range(len(spline.bezier_points)-1):
-                p1 = spline.bezier_points[j].co
-                p2 = spline.bezier_points[j+1].co
-                h1 = spline.bezier_points[j].handle_right
-                h2 = spline.bezier_points[j+1].handle_left
-                ss_p1 = vector_utils.get_render_location(mat@p1)
-                ss_p2 = vector_utils.get_render_location(mat@p2)
-
-                last_handle = h1
-                current_handle = h2
-                ss_last = vector_utils.get_render_location(mat@last_handle)
-                ss_current = vector_utils.get_render_location(mat@current_handle)
+
+            # Project the points and handles of the whole spline at once
+            bezier_points = spline.bezier_points
+            ss_points = {}
+            for attr in ('co', 'handle_left', 'handle_right'):
+                values = np.empty(len(bezier_points) * 3, dtype=np.float64)
+                bezier_points.foreach_get(attr, values)
+                ss_points[attr] = vector_utils.projection.pixels(values, mat).tolist()
+            ss_co = ss_points['co']
+            ss_left = ss_points['handle_left']
+            ss_right = ss_points['handle_right']
+
+            for j in range(len(bezier_points)-1):
+                ss_p1 = ss_co[j]
+                ss_p2 = ss_co[j+1]
+                ss_last = ss_right[j]
+                ss_current = ss_left[j+1]
 
                 if j == 0:
                     path_strings.append('M {} {}'.format(ss_p1[0],ss_p1[1]))
                 path_strings.append('C {} {} {} {} {} {}'.format(ss_last[0], ss_last[1], ss_current[0], ss_current[1], ss_p2[0],ss_p2[1]))
 
             if spline.use_cyclic_u or spline.use_cyclic_v:
-                p1 = spline.bezier_points[-1].co
-                p2 = spline.bezier_points[0].co
-                h1 = spline.bezier_points[-1].handle_right
-                h2 = spline.bezier_points[0].handle_left
-                ss_p2 = vector_utils.get_render_location(mat@p2)
-                last_handle = h1
-                current_handle = h2
-                ss_last = vector_utils.get_render_location(mat@last_handle)
-                ss_current = vector_utils.get_render_location(mat@current_handle)
+                ss_p2 = ss_co[0]
+                ss_last = ss_right[-1]
+                ss_current = ss_left[0]
                 path_strings.append('C {} {} {} {} {} {}'.format(ss_last[0], ss_last[1], ss_current[0], ss_current[1], ss_p2[0],ss_p2[1]))
 
             path_string = ' '.join(path_strings)
@@ -251,25 +315,13 @@ def svg_path_from_curve_shader(curve, item, color, svg, parent=None, mat = Matri
             last_vis = not curve_segs[i][0]
         except IndexError:
             return
+
+        # Project the points and handles of every curve chunk at once
+        chunk_points = [point for seg in curve_segs for point in seg[1][:4]]
+        ss_chunks = vector_utils.projection.pixels(chunk_points, obj_mat).reshape(-1, 4, 2).tolist()
         for i in range(len(curve_segs)):
             visibility = curve_segs[i][0]
-
-
-            curve_chunk = curve_segs[i][1]
-            p1 = curve_chunk[0]
-            p2 = curve_chunk[1]
-            h1 = curve_chunk[2]
-            h2 = curve_chunk[3]
-
-
-            ss_p1 = vector_utils.get_render_location(obj_mat@p1)
-            ss_p2 = vector_utils.get_render_location(obj_mat@p2)
-
-
-            last_handle = h1
-            current_handle = h2
-            ss_last = vector_utils.get_render_location(obj_mat@last_handle)
-            ss_current = vector_utils.get_render_location(obj_mat@current_handle)
+            ss_p1, ss_p2, ss_last, ss_current = ss_chunks[i]
             if visibility:
                 if visibility != last_vis:
                     path_strings.append('M {} {}'.format(ss_p1[0],ss_p1[1]))
@@ -302,8 +354,7 @@ def svg_fill_shader(item, coords, color, svg, parent=None):
     fills = svg.g(id=idName, fill=svgColor)
     parent.add(fills)
 
-    for coord in coords:
-        coords_2d.append(vector_utils.get_render_location(coord))
+    coords_2d = vector_utils.projection.pixels(coords).tolist()
 
     for x in range(0, len(coords_2d) - 1, 3):
         tri = svg.polygon(
@@ -320,7 +371,7 @@ def svg_circle_shader(item, point, rad, color, svg, parent=None):
     fills = svg.g(id=idName, fill=svgColor)
     parent.add(fills)
 
-    point_2d = vector_utils.get_render_location(point)
+    point_2d = vector_utils.projection.pixels([point])[0].tolist()
 
     circle = svg.circle(center=point_2d,r=rad*2)
     fills.add(circle)
@@ -368,8 +419,7 @@ def svg_poly_fill_shader(item, coords, color, svg, parent=None, line_color=(0, 0
     else:
         svg.add(solidfill)
 
-    for coord in coords:
-        coords_2d.append(vector_utils.get_render_location(mat @ Vector(coord)))
+    coords_2d = vector_utils.projection.pixels(coords, mat).tolist()
 
     if False:
         coords_2d = polygon_occlusion(coords_2d)
@@ -404,10 +454,7 @@ def svg_text_shader(item, style, text, mid, textCard, color, svg, parent=None):
         return
 
     svgColor = svgwrite.rgb(color[0] * 100, color[1] * 100, color[2] * 100, '%')
-    ssp0 = vector_utils.get_render_location(textCard[0])
-    ssp1 = vector_utils.get_render_location(textCard[1])
-    ssp2 = vector_utils.get_render_location(textCard[2])
-    ssp3 = vector_utils.get_render_location(textCard[3])
+    ssp0, ssp1, ssp2, ssp3 = vector_utils.projection.pixels(textCard[:4]).tolist()
 
     card = [Vector(ssp0),Vector(ssp1),Vector(ssp2),Vector(ssp3)]
 
@@ -471,15 +518,7 @@ def svg_text_shader(item, style, text, mid, textCard, color, svg, parent=None):
     # Try to get font
     font_family = "Open Sans"
     if style.font != None:
-        font_file = style.font.filepath
-        font_file = bpy.path.abspath(font_file)
-        try:
-            tt = ttLib.TTFont(font_file, verbose=1)
-            font_family = shortName(tt)[0]
-        except Exception as e:
-            font_family = style.font.name
-            print(e)
-            print(font_file)
+        font_family = get_font_family(get_font_path(style.font), fallback=style.font.name)
 
     print(font_family)
 
@@ -577,31 +616,5 @@ def polygon_subtract(source, cut):
 
 
 
-# From https://gist.github.com/pklaus/dce37521579513c574d0
-FONT_SPECIFIER_NAME_ID = 4
-FONT_SPECIFIER_FAMILY_ID = 1
-def shortName(font):
-    """Get the short name from the font's names table"""
-    name = ""
-    family = ""
-
-    for record in font['name'].names:
-        if record.nameID == FONT_SPECIFIER_NAME_ID and not name:
-            if b'\x00' in record.string:
-                name_str = record.string.decode('utf-16-be')
-            else:
-                name_str = record.string.decode('utf-8')
-            name = name_str
-        elif record.nameID == FONT_SPECIFIER_FAMILY_ID and not family:
-            if b'\x00' in record.string:
-                name_str = record.string.decode('utf-16-be')
-            else:
-                name_str = record.string.decode('utf-8')
-            family = name_str
-
-        if name and family: break
-    return name, family
-
-
 def get_svg_color(color):
     return svgwrite.rgb(color[0] * 100, color[1] * 100, color[2] * 100, '%')
@@ -0,0 +1,131 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+# ----------------------------------------------------------
+#
+# Streaming SVG Drawing, writes finished elements to disk as they're drawn
+# instead of holding the whole document in memory until it's saved.
+# Author: Kevan Cress
+#
+# ----------------------------------------------------------
+
+import gzip
+import io
+import re
+import shutil
+import svgwrite
+import tempfile
+import xml.etree.ElementTree as ET
+
+
+# Attributes holding geometry, the only ones compact_numbers() rewrites.
+# Colours, links like url(#Hatch 1.50) and names are left as they are
+GEOMETRY_ATTRIBUTES = {
+    'd', 'points', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'dx', 'dy',
+    'width', 'height', 'r', 'rx', 'ry', 'transform', 'stroke-width',
+    'stroke-dasharray', 'viewBox', 'font-size',
+}
+
+# Decimal or exponent numbers that stand alone, or follow a single path
+# command letter. Digits after a '#' or inside a word, like the hex colour
+# #12e456, aren't numbers
+_number_re = re.compile(
+    r'(?:(?<![\w#.-])|(?<=[^\w#.-][A-Za-z])|(?<=^[A-Za-z]))'
+    r'-?(?:\d+\.\d+(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+)(?![\d.])')
+
+
+def format_number(value, precision):
+    """ Formats a float with at most precision decimals and no trailing zeros """
+    text = '{:.{}f}'.format(value, precision).rstrip('0').rstrip('.')
+    if text in ('', '-0'):
+        return '0'
+    return text
+
+
+def compact_numbers(xml, precision):
+    """ Shortens the numbers in the geometry attributes of an element tree """
+    def shorten(match):
+        return format_number(float(match.group()), precision)
+
+    for elem in xml.iter():
+        for key, value in elem.attrib.items():
+            if key in GEOMETRY_ATTRIBUTES:
+                elem.set(key, _number_re.sub(shorten, value))
+
+
+class StreamingDrawing(svgwrite.Drawing):
+    """
+    A svgwrite Drawing whose top level elements are written to a temporary
+    file by flush(), so only the elements of the object being drawn are in
+    memory. save() writes the root element and <defs> first, so patterns
+    added while drawing still end up at the top of the file, then copies
+    the streamed body after them.
+    """
+
+    def __init__(self, filename, pretty=True, indent=2, compact=False,
+                 precision=3, compress=False, **extra):
+        super(StreamingDrawing, self).__init__(filename, **extra)
+        self.pretty = pretty
+        self.indent = indent
+        self.compact = compact
+        self.precision = precision
+        self.compress = compress
+        self._body = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+
+    def flush(self):
+        """ Writes every top level element except <defs> and drops them """
+        for element in self.elements:
+            if element is not self.defs:
+                self._body.write(self._element_string(element, level=1))
+        self.elements = [self.defs]
+
+    def _element_string(self, element, level):
+        xml = element.get_xml()
+        if self.compact:
+            compact_numbers(xml, self.precision)
+
+        if not self.pretty:
+            return ET.tostring(xml, encoding='unicode')
+
+        space = ' ' * self.indent
+        ET.indent(xml, space=space, level=level)
+        return space * level + ET.tostring(xml, encoding='unicode') + '\n'
+
+    def save(self):
+        """ Writes the header and <defs>, followed by the streamed body """
+        self.flush()
+
+        # The root element with only <defs> in it, opened but not closed
+        root = self._element_string(self, level=0).rstrip()
+        header = root[:-len('</svg>')]
+
+        if self.compress:
+            fileobj = gzip.open(self.filename, mode='wt', encoding='utf-8')
+        else:
+            fileobj = io.open(self.filename, mode='w', encoding='utf-8')
+
+        with fileobj:
+            fileobj.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+            fileobj.write(header)
+            self._body.seek(0)
+            shutil.copyfileobj(self._body, fileobj)
+            fileobj.write('</svg>\n')
+
+        self._body.close()
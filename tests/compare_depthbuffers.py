@@ -0,0 +1,142 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: compare_depthbuffers.py
+# Compares the Software Depth Buffer with the GPU depth pass on reference
+# scenes, in a Blender with a GPU context and the add-on installed:
+#
+#   blender -b --factory-startup --addons MeasureIt_ARCH \
+#       --python tests/compare_depthbuffers.py -- --package MeasureIt_ARCH
+#
+# Exits with 1 if any scene differs by more than the tolerance.
+# ----------------------------------------------------------
+
+import argparse
+import importlib
+import math
+import sys
+
+import bpy
+import gpu
+import numpy as np
+
+WIDTH = 320
+HEIGHT = 240
+
+# Relative linear depth difference allowed per pixel, and the fraction of
+# pixels allowed past it, as triangle edges can rasterize a pixel apart
+DEPTH_TOLERANCE = 1e-3
+MAX_EDGE_FRACTION = 0.01
+
+
+def build_reference_scene(scene, camera_type):
+    """ A floor running behind the camera, with boxes and a sphere on it """
+    for obj in list(scene.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+
+    bpy.ops.mesh.primitive_plane_add(size=40, location=(0, 0, 0))
+    bpy.ops.mesh.primitive_cube_add(size=2, location=(0, 4, 1))
+    bpy.ops.mesh.primitive_cube_add(size=1.5, location=(-3, 7, 0.75),
+                                    rotation=(0, 0, math.radians(30)))
+    bpy.ops.mesh.primitive_uv_sphere_add(radius=1.2, location=(3, 6, 1.2))
+
+    camera_data = bpy.data.cameras.new("Reference Camera")
+    camera_data.type = camera_type
+    camera_data.clip_start = 0.1
+    camera_data.clip_end = 100
+    camera_data.ortho_scale = 14
+    camera = bpy.data.objects.new("Reference Camera", camera_data)
+    scene.collection.objects.link(camera)
+    camera.location = (0, -6, 3)
+    camera.rotation_euler = (math.radians(70), 0, 0)
+    scene.camera = camera
+
+    scene.render.resolution_x = WIDTH
+    scene.render.resolution_y = HEIGHT
+    scene.render.resolution_percentage = 100
+    bpy.context.view_layer.update()
+
+
+def depth_pass(render, vector_utils, context, method):
+    sceneProps = context.scene.MeasureItArchProps
+    sceneProps.depth_test_method = method
+    render.render_depth_pass(None, context, WIDTH, HEIGHT)
+    return vector_utils.depthbuffer.copy()
+
+
+def linear_depth(vector_utils, buffer, camera):
+    vector_utils.near_clip = camera.clip_start
+    vector_utils.far_clip = camera.clip_end
+    vector_utils.camera_type = camera.type
+    return vector_utils.true_z_buffer(buffer.astype(np.float64))
+
+
+def compare(package):
+    render = importlib.import_module(package + '.measureit_arch_render')
+    vector_utils = importlib.import_module(package + '.vector_utils')
+    geometry = importlib.import_module(package + '.measureit_arch_geometry')
+
+    # render_depth_pass() quietly uses the software buffer without a GPU
+    try:
+        gpu.types.GPUOffScreen(4, 4).free()
+    except Exception as e:
+        print("MeasureIt_ARCH: No GPU context to compare against ({})".format(e))
+        return 1
+
+    context = bpy.context
+    scene = context.scene
+    sceneProps = scene.MeasureItArchProps
+    sceneProps.is_render_draw = True
+
+    failed = False
+    try:
+        for camera_type in ('PERSP', 'ORTHO'):
+            build_reference_scene(scene, camera_type)
+            geometry.clear_depth_geometry()
+
+            gpu_depth = depth_pass(render, vector_utils, context, 'DEPTH_BUFFER')
+            software_depth = depth_pass(render, vector_utils, context, 'SOFTWARE_BUFFER')
+
+            camera = scene.camera.data
+            gpu_linear = linear_depth(vector_utils, gpu_depth, camera)
+            software_linear = linear_depth(vector_utils, software_depth, camera)
+            error = np.abs(gpu_linear - software_linear) / np.maximum(gpu_linear, camera.clip_start)
+
+            over = np.count_nonzero(error > DEPTH_TOLERANCE) / error.size
+            print("MeasureIt_ARCH: {} camera, median error {:.2e}, {:.3%} of pixels over {}".format(
+                camera_type, np.median(error), over, DEPTH_TOLERANCE))
+            if over > MAX_EDGE_FRACTION:
+                failed = True
+    finally:
+        sceneProps.is_render_draw = False
+
+    return 1 if failed else 0
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(prog='compare_depthbuffers')
+    parser.add_argument('--package', default='MeasureIt_ARCH',
+                        help="Module name the add-on is installed as")
+    args = parser.parse_args(argv)
+    sys.exit(compare(args.package))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: test_software_depthbuffer.py
+# Checks the software depth buffer against analytic depths, runs without
+# Blender by standing in for the bpy and mathutils modules:
+#
+#   python -m unittest discover tests
+#
+# compare_depthbuffers.py compares it with the GPU depth pass in Blender.
+# ----------------------------------------------------------
+
+import importlib.util
+import os
+import sys
+import types
+import unittest
+
+import numpy as np
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_vector_utils():
+    """ Loads vector_utils.py by path, with stand ins for Blender's modules """
+    for name in ('bpy', 'mathutils'):
+        if name not in sys.modules:
+            sys.modules[name] = types.ModuleType(name)
+    mathutils = sys.modules['mathutils']
+    # Only used by the vector export code, not by the rasterizer
+    if not hasattr(mathutils, 'Vector'):
+        mathutils.Vector = type('Vector', (tuple,), {})
+    if not hasattr(mathutils, 'Matrix'):
+        mathutils.Matrix = type('Matrix', (tuple,), {'Identity': staticmethod(np.eye)})
+
+    package = types.ModuleType('measureit_arch_test')
+    package.__path__ = []
+    utils = types.ModuleType('measureit_arch_test.measureit_arch_utils')
+    utils.get_view = utils.get_camera_z = None
+    sys.modules['measureit_arch_test'] = package
+    sys.modules['measureit_arch_test.measureit_arch_utils'] = utils
+
+    spec = importlib.util.spec_from_file_location(
+        'measureit_arch_test.vector_utils', os.path.join(ADDON_DIR, 'vector_utils.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+vector_utils = load_vector_utils()
+
+WIDTH = 160
+HEIGHT = 120
+NEAR = 0.1
+FAR = 100.0
+FOV = np.radians(60)
+
+
+def perspective_matrix():
+    t = 1 / np.tan(FOV / 2)
+    return np.array([
+        [t * HEIGHT / WIDTH, 0, 0, 0],
+        [0, t, 0, 0],
+        [0, 0, (FAR + NEAR) / (NEAR - FAR), 2 * FAR * NEAR / (NEAR - FAR)],
+        [0, 0, -1, 0]])
+
+
+def orthographic_matrix(scale=10.0):
+    return np.array([
+        [2 / scale, 0, 0, 0],
+        [0, 2 / scale * WIDTH / HEIGHT, 0, 0],
+        [0, 0, -2 / (FAR - NEAR), -(FAR + NEAR) / (FAR - NEAR)],
+        [0, 0, 0, 1]])
+
+
+def quad(corners):
+    return (np.array(corners, dtype=np.float64),
+            np.array([[0, 1, 2], [0, 2, 3]]), np.eye(4))
+
+
+# A wall 5 units in front of the camera, which looks down -Z, covering the
+# whole frame, and a floor 1 unit below the camera running behind it
+WALL = quad([[-50, -50, -5], [50, -50, -5], [50, 50, -5], [-50, 50, -5]])
+FLOOR = quad([[-10, -1, 10], [10, -1, 10], [10, -1, -10], [-10, -1, -10]])
+
+
+def linear_depth(buffer):
+    z_ndc = 2.0 * buffer.astype(np.float64) - 1.0
+    depth = 2.0 * NEAR * FAR / (FAR + NEAR - z_ndc * (FAR - NEAR))
+    return depth.reshape(HEIGHT, WIDTH)
+
+
+class SoftwareDepthBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_pixels = vector_utils.RASTER_CHUNK_PIXELS
+
+    def tearDown(self):
+        vector_utils.RASTER_CHUNK_PIXELS = self.chunk_pixels
+
+    def test_layout_and_clear_value(self):
+        buffer = vector_utils.rasterize_depthbuffer([], perspective_matrix(), WIDTH, HEIGHT)
+        self.assertEqual(buffer.dtype, np.float32)
+        self.assertEqual(buffer.shape, (WIDTH * HEIGHT,))
+        self.assertTrue(np.all(buffer == 1.0))
+
+    def test_empty_mesh(self):
+        empty = (np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64), np.eye(4))
+        buffer = vector_utils.rasterize_depthbuffer([empty], perspective_matrix(), 4, 4)
+        self.assertTrue(np.all(buffer == 1.0))
+
+    def test_perspective_wall(self):
+        buffer = vector_utils.rasterize_depthbuffer([WALL], perspective_matrix(), WIDTH, HEIGHT)
+        np.testing.assert_allclose(linear_depth(buffer), 5.0, rtol=1e-4)
+
+    def test_floor_behind_camera(self):
+        # The floor crosses the near plane, so it's clipped rather than dropped
+        buffer = vector_utils.rasterize_depthbuffer(
+            [WALL, FLOOR], perspective_matrix(), WIDTH, HEIGHT)
+        depth = linear_depth(buffer)
+
+        # Rows are stored bottom up, the top row only sees the wall
+        self.assertAlmostEqual(depth[HEIGHT - 1, WIDTH // 2], 5.0, places=3)
+
+        # A ray through a bottom row pixel center hits the floor at y = -1
+        t = 1 / np.tan(FOV / 2)
+        for row in range(0, 10):
+            ndc_y = (row + 0.5) / HEIGHT * 2 - 1
+            expected = min(t / -ndc_y, 5.0)
+            self.assertAlmostEqual(depth[row, WIDTH // 2], expected, places=3)
+
+    def test_orthographic_wall(self):
+        buffer = vector_utils.rasterize_depthbuffer([WALL], orthographic_matrix(), WIDTH, HEIGHT)
+        np.testing.assert_allclose(buffer, (5.0 - NEAR) / (FAR - NEAR), atol=1e-6)
+
+    def test_nearest_depth_wins(self):
+        near_quad = quad([[-1, -1, -3], [1, -1, -3], [1, 1, -3], [-1, 1, -3]])
+        for meshes in ([WALL, near_quad], [near_quad, WALL]):
+            depth = linear_depth(vector_utils.rasterize_depthbuffer(
+                meshes, perspective_matrix(), WIDTH, HEIGHT))
+            self.assertAlmostEqual(depth[HEIGHT // 2, WIDTH // 2], 3.0, places=3)
+            self.assertAlmostEqual(depth[0, 0], 5.0, places=3)
+
+    def test_chunk_size_doesnt_change_result(self):
+        meshes = [WALL, FLOOR]
+        expected = vector_utils.rasterize_depthbuffer(meshes, perspective_matrix(), WIDTH, HEIGHT)
+        vector_utils.RASTER_CHUNK_PIXELS = 97
+        buffer = vector_utils.rasterize_depthbuffer(meshes, perspective_matrix(), WIDTH, HEIGHT)
+        np.testing.assert_array_equal(buffer, expected)
+
+    def test_render_software_depthbuffer(self):
+        # Object matrices move the wall, as depth pass instances do
+        matrix = np.eye(4)
+        matrix[2, 3] = -1.0
+        geometry = {"vertices": WALL[0].astype(np.float32), "triangles": WALL[1]}
+
+        camera = types.SimpleNamespace(
+            calc_matrix_camera=lambda deps, x, y: perspective_matrix(),
+            matrix_world=types.SimpleNamespace(inverted=lambda: np.eye(4)))
+        context = types.SimpleNamespace(
+            scene=types.SimpleNamespace(camera=camera),
+            evaluated_depsgraph_get=lambda: None)
+
+        buffer = vector_utils.render_software_depthbuffer(
+            context, WIDTH, HEIGHT, [(geometry, matrix)])
+        np.testing.assert_allclose(linear_depth(buffer), 6.0, rtol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# ----------------------------------------------------------
+# File: test_svg_writer.py
+# Checks compact SVG number output, runs without Blender:
+#
+#   python -m unittest discover tests
+#
+# ----------------------------------------------------------
+
+import importlib.util
+import os
+import site
+import unittest
+import xml.etree.ElementTree as ET
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+site.addsitedir(os.path.join(ADDON_DIR, "libs"))
+
+# Loaded by path, the add-on package itself can't be imported without bpy
+_spec = importlib.util.spec_from_file_location(
+    "svg_writer", os.path.join(ADDON_DIR, "svg_writer.py"))
+svg_writer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(svg_writer)
+
+
+def compact(attrib, precision=3):
+    elem = ET.Element('path', attrib)
+    svg_writer.compact_numbers(elem, precision)
+    return elem.attrib
+
+
+class CompactNumbersTest(unittest.TestCase):
+
+    def test_geometry_is_rounded(self):
+        attrib = compact({
+            'd': 'M1.234567 -2.500000 L3e-05,4.0000001 Z',
+            'stroke-width': '0.333333',
+            'transform': 'rotate(45.000001 1.5 -0.0001)',
+        })
+        self.assertEqual(attrib['d'], 'M1.235 -2.5 L0,4 Z')
+        self.assertEqual(attrib['stroke-width'], '0.333')
+        self.assertEqual(attrib['transform'], 'rotate(45 1.5 0)')
+
+    def test_hex_colours_are_unchanged(self):
+        attrib = compact({'stroke': '#12e456', 'fill': '#0e1f00'})
+        self.assertEqual(attrib['stroke'], '#12e456')
+        self.assertEqual(attrib['fill'], '#0e1f00')
+
+    def test_links_are_unchanged(self):
+        attrib = compact({'fill': 'url(#Hatch 1.50)', 'id': 'Hatch 1.50'})
+        self.assertEqual(attrib['fill'], 'url(#Hatch 1.50)')
+        self.assertEqual(attrib['id'], 'Hatch 1.50')
+
+    def test_numbers_inside_words_are_unchanged(self):
+        attrib = compact({'d': 'M1.5 2.5', 'transform': 'translate(1.5 2.5) abc12e3def'})
+        self.assertEqual(attrib['transform'], 'translate(1.5 2.5) abc12e3def')
+
+    def test_streamed_drawing_keeps_colours(self):
+        drawing = svg_writer.StreamingDrawing(
+            os.devnull, compact=True, pretty=False)
+        try:
+            drawing.add(drawing.line(start=(0.1234567, 0), end=(1, 2.0000001),
+                                     stroke='#12e456', fill='url(#Hatch 1.50)'))
+            text = drawing._element_string(drawing.elements[-1], level=1)
+        finally:
+            drawing._body.close()
+        self.assertIn('stroke="#12e456"', text)
+        self.assertIn('fill="url(#Hatch 1.50)"', text)
+        self.assertIn('x1="0.123"', text)
+        self.assertIn('y2="2"', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,83 +26,71 @@
 # ----------------------------------------------------------
 
 import bpy
-import bmesh
+import atexit
+import multiprocessing
+import os
+import sys
 import time
-import bpy_extras.object_utils as object_utils
 import math
 import numpy as np
 
-from math import fabs, sqrt
+from math import sqrt
 from mathutils import Vector, Matrix
-from .measureit_arch_utils import get_view, interpolate3d, get_camera_z_dist
-from multiprocessing import Pool
+from .measureit_arch_utils import get_view, get_camera_z
+from multiprocessing import resource_tracker, shared_memory
 
 depthbuffer = None
-facemap = []
-edgemap = []
+true_depthbuffer = None
+# Min and max mip levels of true_depthbuffer, built by set_globals()
+depth_pyramid = None
+facemap = None
+edgemap = None
 near_clip = None
 far_clip = None
 camera_type = None
 width = None
 height = None
 
-# Gets the Pixel Co-ordinate of a point in 3D Spcae
-def get_render_location(mypoint, svg_flip_y = True):
-    global width
-    global height
-    scene = bpy.context.scene
+# CameraProjection of the export camera, built once per export by set_globals()
+projection = None
 
-    v1 = Vector(mypoint)
+# Scale from Blender units for CameraProjection.world_scale()
+WORLD_SCALE_UNITS = {'M': 1.0, 'CM': 100.0, 'MM': 1000.0}
 
-    co_2d = object_utils.world_to_camera_view(scene, scene.camera, v1)
-    # Get pixel coords
+# Depth difference below which a line counts as in front of the depth buffer
+DEPTH_EPSILON = 0.0001
 
-    return [(co_2d.x * width), height - (co_2d.y * height)]
+# classify_segments_hiz() result for segments that need per pixel sampling
+HIZ_UNKNOWN = -2
 
-# Gets 2d worldscale projection using normalized device co-ordinates... loss of precision but handles perspective
-def get_worldscale_projection_ndc(mypoint):
-    view = get_view()
-    scene = bpy.context.scene
-    v1 = Vector(mypoint)
-    ndc =  object_utils.world_to_camera_view(scene, scene.camera, v1)
+# Fewest depth buffer samples in an export pass worth starting the sampling
+# pool for, the fewest in one line group worth sending to it, and the
+# number of chunks each worker gets so uneven chunks still balance out
+POOL_MIN_SAMPLES = 200000
+POOL_MIN_GROUP_SAMPLES = 20000
+POOL_CHUNKS_PER_WORKER = 4
+
+# Process pool for sample_segments(), and the shared memory copy of
+# true_depthbuffer its workers read. set_globals() marks the copy stale
+# and resets the count of samples taken in the pass
+use_sampling_pool = False
+_pass_samples = 0
+_sampling_pool = None
+_shared_depth = None
+_shared_depth_stale = True
 
-    camera_scale = view.model_scale / view.paper_scale
-    world_width = view.width * camera_scale
-    world_height = view.height * camera_scale
+# Backing storage for the depth buffer, kept between exports so it can be
+# refilled in place when the resolution doesn't change
+_depthbuffer_storage = None
 
-    return [(ndc.x * world_width), (ndc.y * world_height)]
+# Gets the Pixel Co-ordinate of a point in 3D Spcae
+def get_render_location(mypoint, svg_flip_y = True):
+    return projection.pixels([mypoint])[0].tolist()
 
-# Gets 2d worldscale projection using camera matrix. falls back to ndc if camera is using perspective projection
+# Gets 2d worldscale projection using camera matrix
 # Because dxf's allways seem to import in mm, we'll use this as the default scale factor
 def get_worldscale_projection(mypoint, units = 'M', is_2d=True):
-    scene = bpy.context.scene
-    sceneProps = scene.MeasureItArchProps
-    camera = scene.camera
-
-    # Fall back to ndc for perspective
-    if camera.data.type == 'PERSPECTIVE':
-        return get_worldscale_projection_ndc(mypoint)
-
-    v1 = Vector(mypoint)
-    camera_matrix = camera.matrix_world
-    camera_rot = camera_matrix.to_quaternion()
-    camera_basis = Matrix.Identity(3)
-    camera_basis.rotate(camera_rot)
-
-    proj_point = (v1 - camera.location) @ camera_basis
-
-    if units == 'MM':
-        proj_point *= 1000
-    elif units == 'CM':
-        proj_point *= 100
-    elif units == 'M':
-        pass
-
-    if is_2d:
-
-        return proj_point.xy + Vector((sceneProps.offset_x_2d,sceneProps.offset_y_2d))
-
-    return proj_point
+    return Vector(projection.world_scale([mypoint], units, is_2d)[0])
 
 # uses de Casteljau's algoritim to subdivide a curve at t, and returns the two new curves
 # identicle to the origintal but split at t
@@ -128,16 +116,14 @@ def polygon_occlusion(coords):
     polygon = coords
     global facemap
     #Generate Face Map if none exists
-    if len(facemap) == 0:
+    if facemap is None:
         start_time = time.time()
         generate_facemap()
         end_time = time.time()
         print("Facemap Generation took: " + str(end_time - start_time))
 
-    for face in facemap:
-        cut_coords = []
-        for edge in face.edges:
-            cut_coords.append(edge.start_coord)
+    for idx in range(len(facemap)):
+        cut_coords = facemap.face_coords(idx)
         polygon = polygon_subtract(polygon,cut_coords)
 
     return coords
@@ -146,23 +132,236 @@ def polygon_occlusion(coords):
 # Clear the depth buffer and facemap
 def clear_db():
     global depthbuffer
+    global true_depthbuffer
+    global depth_pyramid
     global facemap
     global edgemap
-    del depthbuffer
     depthbuffer = None
-    facemap = []
-    edgemap = []
+    true_depthbuffer = None
+    depth_pyramid = None
+    facemap = None
+    edgemap = None
+
+def store_depthbuffer(buffer, width, height):
+    """
+    Copies a depth buffer read from the GPU into a float32 NumPy array.
+    The array lives in this module (not in an ID property) and its storage
+    is reused between exports of the same resolution.
+    """
+    global depthbuffer
+    global _depthbuffer_storage
+    start_time = time.time()
+
+    size = width * height
+    try:
+        values = np.asarray(buffer, dtype=np.float32).reshape(-1)
+    except (TypeError, ValueError):
+        values = np.asarray(buffer.to_list(), dtype=np.float32).reshape(-1)
+
+    if _depthbuffer_storage is None or _depthbuffer_storage.size != size:
+        _depthbuffer_storage = np.empty(size, dtype=np.float32)
+    np.copyto(_depthbuffer_storage, values[:size])
+    depthbuffer = _depthbuffer_storage
+
+    end_time = time.time()
+    print("Reading Depthbuffer to array took: " + str(end_time - start_time))
+
+
+def render_software_depthbuffer(context, width, height, meshes):
+    """
+    Renders the depth pass on the CPU, for when there is no GPU context.
+    meshes are the (geometry, matrix) pairs from get_depth_pass_meshes(),
+    drawn with the same camera projection as the GPU depth pass.
+    """
+    scene = context.scene
+    start_time = time.time()
+
+    deps = context.evaluated_depsgraph_get()
+    projection_matrix = scene.camera.calc_matrix_camera(deps, x=width, y=height)
+    view_projection = np.array(
+        projection_matrix @ scene.camera.matrix_world.inverted(), dtype=np.float64)
+
+    buffer = rasterize_depthbuffer(
+        ((geometry["vertices"], geometry["triangles"], np.array(matrix, dtype=np.float64))
+         for geometry, matrix in meshes),
+        view_projection, width, height)
+
+    end_time = time.time()
+    print("Software Depth Buffer took: " + str(end_time - start_time))
+    return buffer
+
+
+# Most candidate pixels rasterize_depthbuffer() tests in one NumPy pass
+RASTER_CHUNK_PIXELS = 1 << 21
+
+def rasterize_depthbuffer(meshes, view_projection, width, height):
+    """
+    Software z-buffer of (vertices, triangles, matrix) meshes. Returns a
+    float32 array of window space depths with the same layout as
+    GPUFrameBuffer.read_depth(): width * height values, rows from the
+    bottom of the image up, cleared to 1.0 where nothing was drawn.
+    """
+    buffer = np.ones(width * height, dtype=np.float32)
+
+    for vertices, triangles, matrix in meshes:
+        if len(triangles) == 0:
+            continue
+
+        co = np.empty((len(vertices), 4), dtype=np.float64)
+        co[:, :3] = vertices
+        co[:, 3] = 1.0
+        clip = co @ (view_projection @ matrix).T
+        tris = clip_near_plane(clip[triangles])
+        if len(tris) == 0:
+            continue
+
+        # Perspective divide to pixel co-ordinates and [0,1] depth
+        ndc = tris[..., :3] / tris[..., 3:4]
+        screen = np.empty_like(ndc)
+        screen[..., 0] = (ndc[..., 0] * 0.5 + 0.5) * width
+        screen[..., 1] = (ndc[..., 1] * 0.5 + 0.5) * height
+        screen[..., 2] = ndc[..., 2] * 0.5 + 0.5
+
+        rasterize_triangles(buffer, screen, width, height)
+
+    return buffer
+
+
+def clip_near_plane(tris):
+    """
+    Clips a (T,3,4) array of clip space triangles against the near plane.
+    Triangles crossing it become one or two triangles, so geometry passing
+    behind the camera still occludes what's in front of it.
+    """
+    # Trivially reject triangles wholly outside one of the other planes
+    x, y, z, w = tris[..., 0], tris[..., 1], tris[..., 2], tris[..., 3]
+    outside = (np.all(x > w, axis=1) | np.all(x < -w, axis=1) |
+               np.all(y > w, axis=1) | np.all(y < -w, axis=1) |
+               np.all(z > w, axis=1))
+    tris = tris[~outside]
+
+    dist = tris[..., 2] + tris[..., 3]
+    inside = dist >= 0.0
+    num_inside = inside.sum(axis=1)
+    result = [tris[num_inside == 3]]
+
+    def lerp(a, b, da, db):
+        t = (da / (da - db))[:, None]
+        return a + (b - a) * t
+
+    def rotated(mask, first):
+        # Rotates each triangle's vertices so the vertex at first comes first
+        order = (first[mask][:, None] + np.arange(3)) % 3
+        sel_tris = np.take_along_axis(tris[mask], order[..., None], axis=1)
+        sel_dist = np.take_along_axis(dist[mask], order, axis=1)
+        return sel_tris, sel_dist
+
+    # One vertex in front, the triangle shrinks towards it
+    one = num_inside == 1
+    if np.any(one):
+        t, d = rotated(one, np.argmax(inside, axis=1))
+        b = lerp(t[:, 0], t[:, 1], d[:, 0], d[:, 1])
+        c = lerp(t[:, 0], t[:, 2], d[:, 0], d[:, 2])
+        result.append(np.stack((t[:, 0], b, c), axis=1))
+
+    # Two vertices in front, the clipped triangle is a quad
+    two = num_inside == 2
+    if np.any(two):
+        t, d = rotated(two, np.argmin(inside, axis=1))
+        b = lerp(t[:, 1], t[:, 0], d[:, 1], d[:, 0])
+        c = lerp(t[:, 2], t[:, 0], d[:, 2], d[:, 0])
+        result.append(np.stack((t[:, 1], t[:, 2], c), axis=1))
+        result.append(np.stack((t[:, 1], c, b), axis=1))
+
+    return np.concatenate(result)
+
+
+def rasterize_triangles(buffer, screen, width, height):
+    """
+    Writes the nearest depth of a (T,3,3) array of screen space triangles
+    (pixel x, pixel y, depth) into buffer. A pixel is covered when its
+    center is inside the triangle, as in GPU rasterization.
+    """
+    ax, ay, az = screen[:, 0, 0], screen[:, 0, 1], screen[:, 0, 2]
+    e1 = screen[:, 1] - screen[:, 0]
+    e2 = screen[:, 2] - screen[:, 0]
+    area = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+
+    # Pixel bounds of each triangle, clamped to the image
+    x0 = np.maximum(np.ceil(screen[..., 0].min(axis=1) - 0.5), 0).astype(np.int64)
+    x1 = np.minimum(np.floor(screen[..., 0].max(axis=1) - 0.5), width - 1).astype(np.int64)
+    y0 = np.maximum(np.ceil(screen[..., 1].min(axis=1) - 0.5), 0).astype(np.int64)
+    y1 = np.minimum(np.floor(screen[..., 1].max(axis=1) - 0.5), height - 1).astype(np.int64)
+
+    keep = np.flatnonzero((x1 >= x0) & (y1 >= y0) & (np.abs(area) > 1e-12))
+    if len(keep) == 0:
+        return
+
+    # Split triangles into bands of rows, so no band has more pixels than
+    # a chunk and big triangles don't need huge temporary arrays
+    box_w = x1[keep] - x0[keep] + 1
+    box_h = y1[keep] - y0[keep] + 1
+    band_rows = np.maximum(RASTER_CHUNK_PIXELS // box_w, 1)
+    num_bands = -(-box_h // band_rows)
+
+    band_tri = np.repeat(keep, num_bands)
+    band_idx = np.arange(len(band_tri)) - np.repeat(np.cumsum(num_bands) - num_bands, num_bands)
+    band_w = np.repeat(box_w, num_bands)
+    band_y0 = y0[band_tri] + band_idx * np.repeat(band_rows, num_bands)
+    band_h = np.minimum(np.repeat(band_rows, num_bands), y1[band_tri] - band_y0 + 1)
+    band_pixels = band_w * band_h
+    pixel_ends = np.cumsum(band_pixels)
+
+    start = 0
+    while start < len(band_tri):
+        chunk_start = pixel_ends[start] - band_pixels[start]
+        end = np.searchsorted(pixel_ends, chunk_start + RASTER_CHUNK_PIXELS, side='right')
+        end = max(end, start + 1)
+        bands = slice(start, end)
+        start = end
+
+        counts = band_pixels[bands]
+        tri = np.repeat(band_tri[bands], counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        w = np.repeat(band_w[bands], counts)
+        px = x0[tri] + local % w
+        py = np.repeat(band_y0[bands], counts) + local // w
+
+        # Barycentric weights of the pixel centers
+        dx = px + 0.5 - ax[tri]
+        dy = py + 0.5 - ay[tri]
+        l1 = (dx * e2[tri, 1] - dy * e2[tri, 0]) / area[tri]
+        l2 = (dy * e1[tri, 0] - dx * e1[tri, 1]) / area[tri]
+        depth = az[tri] + l1 * e1[tri, 2] + l2 * e2[tri, 2]
+
+        covered = ((l1 >= 0.0) & (l2 >= 0.0) & (l1 + l2 <= 1.0) &
+                   (depth >= 0.0) & (depth <= 1.0))
+        idx = (py * width + px)[covered]
+        depth = depth[covered]
+
+        # Keep the nearest depth for each pixel covered more than once
+        order = np.lexsort((depth, idx))
+        idx = idx[order]
+        depth = depth[order]
+        first = np.ones(len(idx), dtype=bool)
+        first[1:] = idx[1:] != idx[:-1]
+        idx = idx[first]
+        buffer[idx] = np.minimum(buffer[idx], depth[first])
 
 def set_globals():
     sceneProps = bpy.context.scene.MeasureItArchProps
     view = get_view()
-    global depthbuffer
+    global true_depthbuffer
+    global depth_pyramid
     global near_clip
     global far_clip
     global camera_type
     global width
     global height
-    start_time = time.time()
+    global projection
+    global use_sampling_pool
+    global _shared_depth_stale
+    global _pass_samples
 
     scene = bpy.context.scene
     camera = bpy.context.scene.camera.data
@@ -173,18 +372,158 @@ def set_globals():
     width = int(scene.render.resolution_x * render_scale)
     height = int(scene.render.resolution_y * render_scale)
 
-    if 'depthbuffer' in sceneProps and depthbuffer is None and view.vector_depthtest:
-        #depthbuffer = np.asarray(sceneProps['depthbuffer'], dtype=np.float32) # I feel like this should be faster but its not
-        depthbuffer = sceneProps['depthbuffer'].to_list()
-        sceneProps['depthbuffer'] = []
-        end_time = time.time()
-        print("Reading Depthbuffer to list took: " + str(end_time - start_time))
+    projection = CameraProjection(scene, width, height)
+
+    # Linearize the whole depth buffer once, instead of once per sample
+    if depthbuffer is not None and view.vector_depthtest:
+        true_depthbuffer = true_z_buffer(depthbuffer)
+        depth_pyramid = build_depth_pyramid(true_depthbuffer, width, height)
+    _shared_depth_stale = True
+    _pass_samples = 0
+    use_sampling_pool = sceneProps.parallel_depth_test
 
     if view.vector_depthtest and sceneProps.depth_test_method == 'GEOMETRIC':
         generate_edgemap()
         generate_facemap()
 
 
+def build_depth_pyramid(depths, width, height):
+    """
+    Builds the min and max mip levels of a linear depth buffer. Level 0 is
+    the (height, width) buffer, every following level halves both sides so
+    each texel holds the nearest and farthest depth of the texels under it.
+    Returns a list of (min, max) array pairs, down to a single texel.
+    """
+    level_min = np.asarray(depths).reshape(height, width)
+    level_max = level_min
+    levels = [(level_min, level_max)]
+    while level_min.shape[0] > 1 or level_min.shape[1] > 1:
+        level_min = reduce_depth_level(level_min, np.minimum)
+        level_max = reduce_depth_level(level_max, np.maximum)
+        levels.append((level_min, level_max))
+    return levels
+
+
+def reduce_depth_level(level, op):
+    # Odd sides repeat their last row or column, which keeps bounds conservative
+    if level.shape[0] % 2:
+        level = np.concatenate((level, level[-1:]), axis=0)
+    if level.shape[1] % 2:
+        level = np.concatenate((level, level[:, -1:]), axis=1)
+    return op.reduce((level[0::2, 0::2], level[1::2, 0::2],
+                      level[0::2, 1::2], level[1::2, 1::2]))
+
+
+class CameraProjection(object):
+    """
+    Projects (N,3) arrays of world space points with the export camera,
+    replacing one call to world_to_camera_view() per point. The camera
+    matrices are read once, and only NumPy arrays are kept, so the
+    projection can be sent to depth sampling workers.
+
+    Every method takes points as anything np.asarray() accepts, like a
+    list of Vectors, and an optional matrix to transform them first.
+    """
+
+    def __init__(self, scene, width, height):
+        camera = scene.camera
+        sceneProps = scene.MeasureItArchProps
+        self.width = width
+        self.height = height
+        self.camera_type = camera.data.type
+
+        matrix = camera.matrix_world
+        self.inv_matrix = np.array(matrix.normalized().inverted(), dtype=np.float64)
+        self.view_frame = np.array(
+            [v[:] for v in camera.data.view_frame(scene=scene)[:3]], dtype=np.float64)
+
+        # Camera position and axes used for world scale 2D projection
+        self.location = np.array(camera.location, dtype=np.float64)
+        self.basis = np.array(matrix.to_quaternion().to_matrix(), dtype=np.float64)
+        self.offset_2d = np.array((sceneProps.offset_x_2d, sceneProps.offset_y_2d), dtype=np.float64)
+
+        # Camera position and view direction used for clip distance culling
+        self.origin = np.array(matrix.to_translation(), dtype=np.float64)
+        self.view_dir = np.array(get_camera_z(), dtype=np.float64)
+
+    @staticmethod
+    def as_points(points, matrix=None):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if matrix is not None:
+            matrix = np.asarray(matrix, dtype=np.float64)
+            points = points @ matrix[:3, :3].T + matrix[:3, 3]
+        return points
+
+    def camera_view(self, points, matrix=None):
+        """
+        Vectorized bpy_extras.object_utils.world_to_camera_view(). Returns
+        an (N,3) array of normalized x, y and camera depth.
+        """
+        points = self.as_points(points, matrix)
+        co_local = points @ self.inv_matrix[:3, :3].T + self.inv_matrix[:3, 3]
+        z = -co_local[:, 2]
+
+        frame = self.view_frame
+        if self.camera_type != 'ORTHO':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                min_x = -frame[2][0] * z / frame[2][2]
+                max_x = -frame[1][0] * z / frame[1][2]
+                min_y = -frame[1][1] * z / frame[1][2]
+                max_y = -frame[0][1] * z / frame[0][2]
+                x = (co_local[:, 0] - min_x) / (max_x - min_x)
+                y = (co_local[:, 1] - min_y) / (max_y - min_y)
+            behind = z == 0.0
+            x[behind] = 0.5
+            y[behind] = 0.5
+        else:
+            min_x, max_x = frame[2][0], frame[1][0]
+            min_y, max_y = frame[1][1], frame[0][1]
+            x = (co_local[:, 0] - min_x) / (max_x - min_x)
+            y = (co_local[:, 1] - min_y) / (max_y - min_y)
+
+        return np.stack((x, y, z), axis=1)
+
+    def ndc(self, points, matrix=None):
+        """ (N,2) normalized camera co-ordinates, 0 to 1 across the frame """
+        return self.camera_view(points, matrix)[:, :2]
+
+    def screen(self, points, matrix=None):
+        """ (N,2) pixel co-ordinates with y up, as read from the depth buffer """
+        return self.ndc(points, matrix) * (self.width, self.height)
+
+    def pixels(self, points, matrix=None):
+        """ (N,2) pixel co-ordinates with y down, as drawn in SVGs """
+        ss = self.screen(points, matrix)
+        ss[:, 1] = self.height - ss[:, 1]
+        return ss
+
+    def world_scale(self, points, units='M', is_2d=True, matrix=None):
+        """
+        Points in the camera's axes at world scale, in units of 'M', 'CM'
+        or 'MM'. 2D points are (N,2) and moved by the scene's 2D offset.
+        """
+        points = self.as_points(points, matrix)
+        proj_points = (points - self.location) @ self.basis
+        proj_points *= WORLD_SCALE_UNITS.get(units, 1.0)
+
+        if is_2d:
+            return proj_points[:, :2] + self.offset_2d
+        return proj_points
+
+    def camera_z_dist(self, points, matrix=None):
+        """ (N,) distance of each point along the camera's view direction """
+        points = self.as_points(points, matrix)
+        return (points - self.origin) @ self.view_dir
+
+
+def world_to_camera_view_batch(points):
+    """
+    Vectorized bpy_extras.object_utils.world_to_camera_view() for an (N,3)
+    array of world space points, using the camera cached by set_globals().
+    Returns an (N,3) array of normalized x, y and camera depth.
+    """
+    return projection.camera_view(points)
+
 
 # --------------------------------------------------------------------
 # Get position in final render image
@@ -193,79 +532,6 @@ def set_globals():
 # --------------------------------------------------------------------
 
 
-class MapEdge(object):
-    start_coord: Vector = Vector((0,0,0))
-    end_coord: Vector = Vector((0,1,0))
-
-    ss_start_coord : Vector = Vector((0,0,0))
-    ss_end_coord : Vector = Vector((0,0,0))
-
-    maxX:float = 0
-    minX:float = 0
-    maxY:float = 0
-    minY:float = 0
-
-    def __init__(self, start, end):
-        self.start_coord =start
-        self.end_coord = end
-        self.ss_start_coord = get_ss_point(start)
-        self.ss_end_coord = get_ss_point(end)   
-        self.maxX, self.minX, self.maxY, self.minY = ss_line_min_max(self.ss_start_coord,self.ss_end_coord)
-    
-
-def ss_line_min_max(start_coord, end_coord):
-    maxX = 0
-    minX = 0
-    maxY = 0
-    minY = 0
-
-    if start_coord.x > end_coord.x:
-        maxX = start_coord.x
-        minX = end_coord.x
-    else:
-        maxX = end_coord.x
-        minX = start_coord.x
-    
-    if start_coord.y > end_coord.y:
-        maxY = start_coord.y
-        minY = end_coord.y
-    else:
-        maxY = end_coord.y
-        minY = start_coord.y
-
-    return [maxX,minX,maxY,minY]
-
-class MapPolygon(object):
-    edges = []
-    depth = None
-    center = Vector((0,0,0))
-    normal = Vector((0,0,1))
-    minX = 0
-    maxX = 0
-    minY = 0
-    maxY = 0
-
-    def __init__(self, edge_array, depth, center, normal,minX,maxX,minY,maxY):
-        self.edges = edge_array
-        self.depth = depth
-        self.center = center
-        self.normal = normal
-        self.minX = minX
-        self.maxX = maxX
-        self.minY = minY
-        self.maxY = maxY
-
-class IntersectPoint(object):
-    point: Vector = Vector((0,0))
-    factor = 0.0
-
-    def __init__(self, point, factor) -> None:
-        self.point = point
-        self.factor = factor
-
-    def __lt__(self,other):
-        return self.factor < other.factor
-
 class LineSegment(object):
     visible = 1 # 1 visible 0 hidden -1 culled
     start = Vector((0,0,0))
@@ -276,9 +542,177 @@ class LineSegment(object):
         self.end = end
         self.visible = visible
 
+class SpatialGrid(object):
+    """
+    Uniform screen space grid over a set of axis aligned bounds.
+
+    bounds is an (N,4) array of [minX, maxX, minY, maxY] rows. Each item is
+    binned into every cell its bounds touch, so a query only has to look at
+    the items in the cells under the query bounds. Items that would cover
+    more than max_item_cells cells are kept in a separate list that every
+    query checks directly.
+    """
+
+    def __init__(self, bounds, cell_size=None, max_item_cells=256):
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        num_items = len(self.bounds)
+
+        if num_items == 0:
+            self.origin = np.zeros(2)
+            self.cell_size = 1.0
+            self.shape = (1, 1)
+            self.cell_starts = np.zeros(2, dtype=np.int64)
+            self.cell_items = np.zeros(0, dtype=np.int64)
+            self.large_items = np.zeros(0, dtype=np.int64)
+            return
+
+        min_x = self.bounds[:, 0].min()
+        max_x = self.bounds[:, 1].max()
+        min_y = self.bounds[:, 2].min()
+        max_y = self.bounds[:, 3].max()
+        extent = max(max_x - min_x, max_y - min_y, 1.0)
+
+        # Aim for roughly one item per cell
+        if cell_size is None:
+            cell_size = max(extent / math.sqrt(num_items), 1.0)
+        self.cell_size = cell_size
+        self.origin = np.array((min_x, min_y))
+        nx = int((max_x - min_x) // cell_size) + 1
+        ny = int((max_y - min_y) // cell_size) + 1
+        self.shape = (nx, ny)
+
+        x0, x1, y0, y1 = self._cell_range(self.bounds)
+        cells_x = x1 - x0 + 1
+        cells_y = y1 - y0 + 1
+        num_cells = cells_x * cells_y
+
+        large = num_cells > max_item_cells
+        self.large_items = np.nonzero(large)[0]
+
+        # Expand every small item into one entry per covered cell
+        small = np.nonzero(~large)[0]
+        counts = num_cells[small]
+        item_ids = np.repeat(small, counts)
+        local_idx = np.arange(len(item_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        span_x = cells_x[item_ids]
+        cell_x = x0[item_ids] + local_idx % span_x
+        cell_y = y0[item_ids] + local_idx // span_x
+        cell_ids = cell_y * nx + cell_x
+
+        # Store as a compressed row list, sorted by cell
+        order = np.argsort(cell_ids, kind='stable')
+        self.cell_items = item_ids[order]
+        self.cell_starts = np.searchsorted(cell_ids[order], np.arange(nx * ny + 1))
+
+    def _cell_range(self, bounds):
+        nx, ny = self.shape
+        cells = np.floor((bounds - np.repeat(self.origin, 2)) / self.cell_size).astype(np.int64)
+        x0 = np.clip(cells[..., 0], 0, nx - 1)
+        x1 = np.clip(cells[..., 1], 0, nx - 1)
+        y0 = np.clip(cells[..., 2], 0, ny - 1)
+        y1 = np.clip(cells[..., 3], 0, ny - 1)
+        return x0, x1, y0, y1
+
+    def query(self, minX, maxX, minY, maxY):
+        """
+        Returns the indices of all items whose bounds overlap the query bounds
+        (same strict test as bounds_overlap()), in ascending order.
+        """
+        nx, ny = self.shape
+        x0, x1, y0, y1 = self._cell_range(np.array((minX, maxX, minY, maxY)))
+
+        rows = np.arange(y0, y1 + 1) * nx
+        starts = self.cell_starts[rows + x0]
+        ends = self.cell_starts[rows + x1 + 1]
+        chunks = [self.cell_items[start:end] for start, end in zip(starts, ends)]
+        chunks.append(self.large_items)
+        candidates = np.unique(np.concatenate(chunks))
+
+        b = self.bounds[candidates]
+        overlap = bounds_overlap(minX, maxX, b[:, 0], b[:, 1], minY, maxY, b[:, 2], b[:, 3])
+        return candidates[overlap].tolist()
+
+
+class EdgeMap(object):
+    """
+    Edges tested against by the GEOMETRIC depth test, stored as arrays.
+
+    starts, ends: (N,3) world space end points
+    ss_starts, ss_ends: (N,2) screen space end points
+    bounds: (N,4) screen space [minX, maxX, minY, maxY]
+    """
+
+    def __init__(self, starts, ends):
+        self.starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        self.ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        self.ss_starts = get_ss_points(self.starts)
+        self.ss_ends = get_ss_points(self.ends)
+        self.bounds = np.stack((
+            np.minimum(self.ss_starts[:, 0], self.ss_ends[:, 0]),
+            np.maximum(self.ss_starts[:, 0], self.ss_ends[:, 0]),
+            np.minimum(self.ss_starts[:, 1], self.ss_ends[:, 1]),
+            np.maximum(self.ss_starts[:, 1], self.ss_ends[:, 1])), axis=1)
+        self.grid = SpatialGrid(self.bounds)
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class FaceMap(object):
+    """
+    Faces tested against by the GEOMETRIC depth test, stored as arrays.
+
+    centers, normals: (N,3) world space plane of each face
+    depths: (N,) camera depth of each face center
+    coords: (L,3) world space corners of all faces, face i's corners are
+        coords[loop_starts[i]:loop_starts[i] + loop_totals[i]]
+    bounds: (N,4) screen space [minX, maxX, minY, maxY]
+    """
+
+    def __init__(self, centers, normals, coords, loop_starts, loop_totals):
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+        self.loop_starts = np.asarray(loop_starts, dtype=np.int64)
+        self.loop_totals = np.asarray(loop_totals, dtype=np.int64)
+        self.depths = world_to_camera_view_batch(self.centers)[:, 2]
+
+        if len(self.centers) > 0:
+            ss = get_ss_points(self.coords)
+            self.bounds = np.stack((
+                np.minimum.reduceat(ss[:, 0], self.loop_starts),
+                np.maximum.reduceat(ss[:, 0], self.loop_starts),
+                np.minimum.reduceat(ss[:, 1], self.loop_starts),
+                np.maximum.reduceat(ss[:, 1], self.loop_starts)), axis=1)
+        else:
+            self.bounds = np.zeros((0, 4))
+        self.grid = SpatialGrid(self.bounds)
+
+    def __len__(self):
+        return len(self.centers)
+
+    def face_coords(self, idx):
+        start = self.loop_starts[idx]
+        return self.coords[start:start + self.loop_totals[idx]]
+
+
+def get_world_vertices(mesh, mat):
+    """
+    Reads a mesh's vertex co-ordinates with foreach_get and returns them as
+    an (N,3) array transformed by mat
+    """
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    np_mat = np.array(mat, dtype=np.float64)
+    return coords.reshape(-1, 3) @ np_mat[:3, :3].T + np_mat[:3, 3]
+
+
 def generate_edgemap():
+    global edgemap
     startTime = time.time()
     deps = bpy.context.view_layer.depsgraph
+    starts = []
+    ends = []
     for obj_int in deps.object_instances:
         obj = obj_int.object
         parent = obj_int.parent
@@ -288,58 +722,77 @@ def generate_edgemap():
             ignore = obj.MeasureItArchProps.ignore_in_depth_test or parent.MeasureItArchProps.ignore_in_depth_test
 
         if obj.type == 'MESH' and not(obj.hide_render or obj.display_type == "WIRE" or ignore):
-            mat = obj.matrix_world
             obj_eval = obj.evaluated_get(deps)
             mesh = obj_eval.to_mesh(
                 preserve_all_data_layers=False, depsgraph=bpy.context.view_layer.depsgraph)
 
-            for edge in mesh.edges:
-                p1 = mat @ mesh.vertices[edge.vertices[0]].co
-                p2 = mat @ mesh.vertices[edge.vertices[1]].co
-                map_edge = MapEdge(p1,p2)
-                edgemap.append(map_edge)
+            verts = get_world_vertices(mesh, obj_int.matrix_world)
+            edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+            mesh.edges.foreach_get('vertices', edge_verts)
+            edge_verts = edge_verts.reshape(-1, 2)
+            starts.append(verts[edge_verts[:, 0]])
+            ends.append(verts[edge_verts[:, 1]])
+            obj_eval.to_mesh_clear()
+
+    if len(starts) > 0:
+        edgemap = EdgeMap(np.concatenate(starts), np.concatenate(ends))
+    else:
+        edgemap = EdgeMap(np.zeros((0, 3)), np.zeros((0, 3)))
     endTime = time.time()
     print('EdgeMap Generated with: {} Edges in: {}'.format(len(edgemap), str(endTime - startTime)))
 
 def generate_facemap():
+    global facemap
     startTime = time.time()
     context = bpy.context
-    scene = context.scene
-    sceneProps = scene.MeasureItArchProps
-    global facemap
+    deps = context.view_layer.depsgraph
     objlist = context.view_layer.objects
 
+    centers = []
+    normals = []
+    coords = []
+    loop_starts = []
+    loop_totals = []
+    num_coords = 0
     for obj in objlist:
         if obj.type != 'MESH':
             continue
-        mat = obj.matrix_world
-        bm = bmesh.new()
+        obj_eval = obj.evaluated_get(deps)
         try:
-            bm.from_object(obj, bpy.context.view_layer.depsgraph)
-        except ValueError:
+            mesh = obj_eval.to_mesh(preserve_all_data_layers=False, depsgraph=deps)
+        except RuntimeError:
+            mesh = None
+        if mesh is None:
             print("Error generating face map from: {} Skipping".format(obj.name))
-        
-        faces = bm.faces
-        for face in faces:
-            center = mat @ face.calc_center_bounds()
-            depth = get_camera_z_dist(center)
-            normal = mat @ face.normal
-            edge_array = []
-            minX = math.inf
-            maxX = -math.inf
-            minY = math.inf
-            maxY = -math.inf
-            for edge in face.edges:
-                start = mat @ edge.verts[0].co
-                end = mat @ edge.verts[1].co
-                edge = MapEdge(start,end)
-                if edge.minX < minX: minX = edge.minX
-                if edge.minY < minY: minY = edge.minY
-                if edge.maxX > maxX: maxX = edge.maxX
-                if edge.maxY > maxY: maxY = edge.maxY
-                edge_array.append(edge)
-            facemap.append(MapPolygon(edge_array,depth,center,normal,minX,maxX,minY,maxY))
-    
+            continue
+
+        mat = np.array(obj.matrix_world, dtype=np.float64)
+        num_faces = len(mesh.polygons)
+        face_centers = np.empty(num_faces * 3, dtype=np.float32)
+        face_normals = np.empty(num_faces * 3, dtype=np.float32)
+        face_starts = np.empty(num_faces, dtype=np.int32)
+        face_totals = np.empty(num_faces, dtype=np.int32)
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.polygons.foreach_get('center', face_centers)
+        mesh.polygons.foreach_get('normal', face_normals)
+        mesh.polygons.foreach_get('loop_start', face_starts)
+        mesh.polygons.foreach_get('loop_total', face_totals)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+
+        # Normals transform by the inverse transpose to stay perpendicular
+        centers.append(face_centers.reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3])
+        normals.append(face_normals.reshape(-1, 3) @ np.linalg.pinv(mat[:3, :3]))
+        coords.append(get_world_vertices(mesh, obj.matrix_world)[loop_verts])
+        loop_starts.append(face_starts + num_coords)
+        loop_totals.append(face_totals)
+        num_coords += len(loop_verts)
+        obj_eval.to_mesh_clear()
+
+    if len(centers) > 0:
+        facemap = FaceMap(np.concatenate(centers), np.concatenate(normals), np.concatenate(coords),
+                          np.concatenate(loop_starts), np.concatenate(loop_totals))
+    else:
+        facemap = FaceMap(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3)), [], [])
     endTime = time.time()
     print('FaceMap Generated with: {} Faces in: {}'.format(len(facemap), str(endTime - startTime)))
 
@@ -379,94 +832,120 @@ def get_axis_aligned_bounds(coords):
 
     return [maxX, minX, maxY, minY, maxZ, minZ]
 
-# Calculates the intersection point of line A (p1,p2) and line B (p3,p4)
-# returns the intersect point in 2D and factor along the line from p1
-def line_segment_intersection_2D(p1,p2,p3,p4):
-
-    denom = (p4.y-p3.y) * (p2.x-p1.x) - (p4.x-p3.x) * (p2.y-p1.y)
-
-    if denom == 0: # parallel
-        #print('parallel')
-        return None
-
-    ua = ((p4.x-p3.x) * (p1.y-p3.y) - (p4.y-p3.y) * (p1.x - p3.x)) / denom
-    if ua < 0 or ua > 1: # out of range
-        #print('out of range')
-        return None
-
-    ub = ((p2.x-p1.x)*(p1.y-p3.y) - (p2.y-p1.y)*(p1.x-p3.x)) / denom
-    if ub < 0 or ub > 1: # out of range
-        #print('out of range')
-        return None
 
-    x = p1.x + ua * (p2.x-p1.x)
-    y = p1.y + ua * (p2.y-p1.y)
+def chain_segments(segments, merge_collinear=False, tolerance=0.0):
+    """
+    Joins 2D segments that share endpoints into polylines. Endpoints must
+    be hashable and already snapped, so shared points compare equal.
+    Returns a list of point lists, closed loops repeat their first point.
+    With merge_collinear, points where a polyline runs straight on are
+    dropped, tolerance is the sine of the largest angle treated as straight
+    """
+    adjacency = {}
+    for idx, (p1, p2) in enumerate(segments):
+        adjacency.setdefault(p1, []).append(idx)
+        adjacency.setdefault(p2, []).append(idx)
+
+    used = [False] * len(segments)
+
+    def walk(point, idx):
+        chain = [point]
+        while idx is not None:
+            used[idx] = True
+            p1, p2 = segments[idx]
+            point = p2 if p1 == point else p1
+            chain.append(point)
+            idx = next((i for i in adjacency[point] if not used[i]), None)
+        return chain
+
+    # Start from the ends and junctions first so open chains aren't split,
+    # anything left after that is a closed loop
+    chains = []
+    for point, idxs in adjacency.items():
+        if len(idxs) != 2:
+            for idx in idxs:
+                if not used[idx]:
+                    chains.append(walk(point, idx))
+
+    for idx, seg in enumerate(segments):
+        if not used[idx]:
+            chains.append(walk(seg[0], idx))
+
+    if merge_collinear:
+        chains = [merge_collinear_points(chain, tolerance) for chain in chains]
+
+    return chains
+
+
+def merge_collinear_points(chain, tolerance=0.0):
+    """ Drops the points of a polyline where it continues in a straight line """
+    if len(chain) < 3:
+        return chain
+
+    merged = [chain[0]]
+    for idx in range(1, len(chain) - 1):
+        prev = merged[-1]
+        point = chain[idx]
+        nxt = chain[idx + 1]
+        d1x, d1y = point[0] - prev[0], point[1] - prev[1]
+        d2x, d2y = nxt[0] - point[0], nxt[1] - point[1]
+        cross = d1x * d2y - d1y * d2x
+        dot = d1x * d2x + d1y * d2y
+        limit = tolerance * sqrt((d1x * d1x + d1y * d1y) * (d2x * d2x + d2y * d2y))
+        if dot > 0 and abs(cross) <= limit:
+            continue
+        merged.append(point)
+    merged.append(chain[-1])
+    return merged
 
-    #print('Intersected')
-    intersect = Vector((x,y))
-    factor = (intersect-p1).length / (p2-p1).length
+# Intersects the 2D line A (p1,p2) with each line B in the (N,2) arrays (p3,p4)
+# returns the factor along line A from p1 of every intersection
+def segment_intersections_2D(p1, p2, p3, p4):
+    d1 = p2 - p1
+    d2 = p4 - p3
+    diff = p1 - p3
 
-    return IntersectPoint(intersect,factor)
+    denom = d2[:, 1] * d1[0] - d2[:, 0] * d1[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ua = (d2[:, 0] * diff[:, 1] - d2[:, 1] * diff[:, 0]) / denom
+        ub = (d1[0] * diff[:, 1] - d1[1] * diff[:, 0]) / denom
 
+    # Skip parallel and out of range lines
+    hit = (denom != 0) & (ua >= 0) & (ua <= 1) & (ub >= 0) & (ub <= 1)
+    return ua[hit]
 
-def get_line_plane_intersection(p0, p1, p_co, p_no, epsilon=1e-6):
 
+def line_plane_intersections(p0, p1, p_co, p_no, epsilon=1e-6):
     """
     modified from https://stackoverflow.com/questions/5666222/3d-line-plane-intersection
     p0, p1: Define the line.
-    p_co, p_no: define the plane:
+    p_co, p_no: (N,3) arrays defining the planes:
         p_co Is a point on the plane (plane coordinate).
         p_no Is a normal vector defining the plane direction;
              (does not need to be normalized).
 
-    Return a Vector or None (when the intersection can't be found).
+    Returns the factor of each intersection along p0 -> p1, planes parallel
+    to the line are skipped. If the factor is between (0 - 1) the point
+    intersects with the segment. Otherwise:
+      < 0.0: behind p0.
+      > 1.0: infront of p1.
     """
+    u = p1 - p0
+    dot = p_no @ u
+    w = p0 - p_co
 
-    u = p1-p0
-    dot = p_no.dot(u)
-
-    if abs(dot) > epsilon:
-        # The factor of the point between p0 -> p1 (0 - 1)
-        # if 'fac' is between (0 - 1) the point intersects with the segment.
-        # Otherwise:
-        #  < 0.0: behind p0.
-        #  > 1.0: infront of p1.
-        w = p0 - p_co
-        fac = -p_no.dot(w) / dot
-        u = u* fac
-        intersect = p0 + u
-        factor = (intersect-p0).length / (p1-p0).length
-        return IntersectPoint(intersect,factor)
-
-    # The segment is parallel to plane.
-    return None
+    not_parallel = np.abs(dot) > epsilon
+    fac = -np.einsum('ij,ij->i', p_no[not_parallel], w[not_parallel]) / dot[not_parallel]
+    return fac
 
 
 def get_clip_space_coord(mypoint):
-    scene = bpy.context.scene
-
-    v1 = Vector(mypoint)
-    co_camera_space = object_utils.world_to_camera_view(
-        scene, scene.camera, v1)
-
-    co_clip = Vector((co_camera_space.x, co_camera_space.y, co_camera_space.z))
-
-    return co_clip
+    return Vector(projection.camera_view([mypoint])[0])
 
 # Culls points if they are beyond the camera near or far clip distance
 def camera_cull(points, mat = Matrix.Identity(4)):
-    should_cull = []
-    for point in points:
-        dist = get_camera_z_dist(mat @ Vector(point))
-        if dist < near_clip or dist > far_clip:
-            should_cull.append(True)
-        else:
-            should_cull.append(False)
-
-    if any(cull is False for cull in should_cull):
-        return False
-    else:
-        return True
+    dists = projection.camera_z_dist(points, mat)
+    return not np.any((dists >= near_clip) & (dists <= far_clip))
 
 def true_z_buffer(zValue):
     global near_clip
@@ -503,120 +982,116 @@ def curve_depth_test(p1,p2,h1,h2,mat,item):
     return line_segs
 
 def depth_test(p1, p2, mat, item):
-    scene = bpy.context.scene
+    return depth_test_lines([p1, p2], mat, item)[0]
+
+def depth_test_lines(coords, mat, item):
+    """
+    Depth tests every segment of a flat [p1, p2, p1, p2, ...] coord buffer.
+    Depth buffer samples for the whole buffer are projected and classified
+    in a single batch. Returns one line segment list per input segment.
+    """
     sceneProps = bpy.context.scene.MeasureItArchProps
+    num_segs = len(coords) // 2
+    if num_segs == 0:
+        return []
+
+    p1s = [coords[2 * i] for i in range(num_segs)]
+    p2s = [coords[2 * i + 1] for i in range(num_segs)]
+
+    local = np.array([(c[0], c[1], c[2]) for c in coords[:num_segs * 2]], dtype=np.float64).reshape(-1, 2, 3)
+    np_mat = np.array(mat, dtype=np.float64)
+    world = local @ np_mat[:3, :3].T + np_mat[:3, 3]
+
     # Don't depth test if out of culling
-    if camera_cull([mat @ Vector(p1), mat @ Vector(p2)]):
-        return [[-1, p1, p2]]
+    dists = world_to_camera_view_batch(world.reshape(-1, 3))[:, 2].reshape(-1, 2)
+    culled = np.all((dists < near_clip) | (dists > far_clip), axis=1)
 
-    # Don't Depth test if not enabled
     view = get_view()
-    if not view.vector_depthtest or item.inFront:
-        return [[True, p1, p2]]
-
     method = sceneProps.depth_test_method
     if item.depth_test_override != 'NONE':
         method = item.depth_test_override
+
     # a line segment is a list [intiger visibility, start point, end point]
-    if method == 'DEPTH_BUFFER':
-        line_segs = vis_sampling(p1, p2, mat, item,)
-    elif method == 'GEOMETRIC':
-        line_segs = geometric_vis_calc(p1,p2,mat,item)
+    all_line_segs = [None] * num_segs
+    to_test = []
+    for i in range(num_segs):
+        if culled[i]:
+            all_line_segs[i] = [[-1, p1s[i], p2s[i]]]
+        # Don't Depth test if not enabled
+        elif not view.vector_depthtest or item.inFront:
+            all_line_segs[i] = [[True, p1s[i], p2s[i]]]
+        elif method == 'GEOMETRIC':
+            all_line_segs[i] = geometric_vis_calc(p1s[i], p2s[i], mat, item)
+        else:
+            to_test.append(i)
 
-    return line_segs
+    if len(to_test) > 0:
+        idxs = np.array(to_test)
+        sampled = vis_sample_segments(local[idxs], world[idxs], item)
+        for i, line_segs in zip(to_test, sampled):
+            line_segs[0][1] = p1s[i]
+            line_segs[-1][2] = p2s[i]
+            all_line_segs[i] = line_segs
+
+    return all_line_segs
 
 def bounds_overlap(x1min,x1max,x2min,x2max,y1min,y1max,y2min,y2max):
     isOverlapping = ((x1min < x2max) & (x2min < x1max) & (y1min < y2max) & (y2min < y1max))
     return isOverlapping
 
 def geometric_vis_calc(p1,p2,mat,item):
-    p1Global = mat @ Vector(p1)
-    p2Global = mat @ Vector(p2)
+    # Generate Edge and Face Maps if a depth test override asks for them
+    if edgemap is None:
+        generate_edgemap()
+    if facemap is None:
+        generate_facemap()
+
+    local = np.array([(p1[0], p1[1], p1[2]), (p2[0], p2[1], p2[2])], dtype=np.float64)
+    np_mat = np.array(mat, dtype=np.float64)
+    world = local @ np_mat[:3, :3].T + np_mat[:3, 3]
 
     # Get Screen Space Points
-    p1ss = get_ss_point(p1Global)
-    p2ss = get_ss_point(p2Global)
+    p1ss, p2ss = get_ss_points(world)
 
-    # Get ss normal vectorsP
+    # Get ss normal vectors
     dir_vec = p1ss - p2ss
-    n1ss = Vector((dir_vec.y, -dir_vec.x))
-    n2ss = Vector((-dir_vec.y, dir_vec.x))
-
-    ss_norms = [n1ss,n2ss]
-
-    intersect_points = []
+    ss_norms = np.array(((dir_vec[1], -dir_vec[0]), (-dir_vec[1], dir_vec[0])))
 
     # Only test for intersection if bounding boxes overlap.
-    maxX, minX, maxY, minY = ss_line_min_max(p1ss,p2ss)
-    overlap_edgemap = [edge for edge in edgemap if bounds_overlap(minX,maxX,edge.minX,edge.maxX,minY,maxY,edge.minY,edge.maxY)]
+    minX, minY = np.minimum(p1ss, p2ss)
+    maxX, maxY = np.maximum(p1ss, p2ss)
 
     # Get all 2D edge intersections with overlapping edges
-    for edge in overlap_edgemap:
-        p3ss = edge.ss_start_coord
-        p4ss = edge.ss_end_coord
-
-        intersection = line_segment_intersection_2D(p1ss,p2ss,p3ss,p4ss)
-        if intersection != None:
-            intersect_points.append(intersection)
-
-   
-    # Only test for intersection if bounding boxes overlap.
-    overlap_facemap = [face for face in facemap if bounds_overlap(minX,maxX,face.minX,face.maxX,minY,maxY,face.minY,face.maxY)]
-
-    # Get all 3D face intersections
-    for face in overlap_facemap:
-        intersection = get_line_plane_intersection(p1Global,p2Global,face.center,face.normal)
-        if intersection != None and intersection.factor < 1.0 and intersection.factor > 0.0:
-            intersect_points.append(intersection)
-
-    # Check vis of each segment defined by the intersect points
-    line_segs = []
-    if len(intersect_points) > 0:
-        intersect_points.sort() # Sorts by distance from p1
+    edge_idxs = edgemap.grid.query(minX, maxX, minY, maxY)
+    edge_factors = segment_intersections_2D(
+        p1ss, p2ss, edgemap.ss_starts[edge_idxs], edgemap.ss_ends[edge_idxs])
 
-        last_point = Vector(p1)
-        for ip in intersect_points:
-            dist = (Vector(p2)-Vector(p1)).length * ip.factor
-            point = interpolate3d(Vector(p1),Vector(p2),dist)
+    # Get all 3D face intersections with overlapping faces
+    face_idxs = facemap.grid.query(minX, maxX, minY, maxY)
+    face_factors = line_plane_intersections(
+        world[0], world[1], facemap.centers[face_idxs], facemap.normals[face_idxs])
+    face_factors = face_factors[(face_factors > 0.0) & (face_factors < 1.0)]
 
-            vis_sample_point = (last_point + point) / 2
-            visible = check_visible(item, mat @ vis_sample_point,ss_norms)
-
-            segment = [visible,last_point, point]
-            line_segs.append(segment)
-            last_point = Vector(point)
-
-        # Last segment
-        vis_sample_point = (last_point + Vector(p2)) / 2
-        visible = check_visible(item, mat @ vis_sample_point, ss_norms)
-
-        line_segs.append([visible,last_point,p2])
-
-    else:
-        vis_sample_point = (Vector(p1) + Vector(p2)) / 2
-        visible = check_visible(item, mat @ vis_sample_point, ss_norms)
-
-        line_segs.append([visible,p1,p2])
+    # Check vis of each segment defined by the intersect points, sorted by distance from p1
+    factors = np.concatenate(([0.0], np.unique(np.concatenate((edge_factors, face_factors))), [1.0]))
+    sample_factors = ((factors[:-1] + factors[1:]) / 2)[:, np.newaxis]
+    vis = check_visible_batch(item, world[0] + (world[1] - world[0]) * sample_factors, ss_norms)
 
     # Join segments where no visibility change occurs
+    changes = np.nonzero(vis[1:] != vis[:-1])[0] + 1
+    vis = vis.tolist()
 
-    joined_line_segs=[]
-    idx = 0
-    start_point = line_segs[idx][1]
-    prv_seg_vis = line_segs[idx][0]
-    while idx + 1 < len(line_segs):
-        idx += 1
-        seg_vis = line_segs[idx][0]
-        if seg_vis != prv_seg_vis:
-            segment = [prv_seg_vis,start_point,line_segs[idx][1]]
-            prv_seg_vis = line_segs[idx][0]
-            start_point = line_segs[idx][1]
-            joined_line_segs.append(segment)
-
-    final_segment = [prv_seg_vis,start_point, line_segs[-1][2]]
-    joined_line_segs.append(final_segment)
-
-    return joined_line_segs
+    line_segs = []
+    start_point = p1
+    prv_seg_vis = vis[0]
+    for idx in changes:
+        point = Vector(local[0] + (local[1] - local[0]) * factors[idx])
+        line_segs.append([prv_seg_vis, start_point, point])
+        start_point = point
+        prv_seg_vis = vis[idx]
+
+    line_segs.append([prv_seg_vis, start_point, p2])
+    return line_segs
 
 # Bernstein Polynomial Curve Evaluation
 def bp_curve_eval(p1,p2,h1,h2,t):
@@ -653,20 +1128,24 @@ def curve_vis_sample(p1,p2,h1,h2,mat,item):
     n2ss = Vector((-p_tan_ss.y, p_tan_ss.x))
     ss_norms = [n1ss,n2ss]
     last_vis_state = check_visible(item, p1_world, ss_norms)
+
+    # Evaluate and classify all curve samples in one batch
+    t = np.arange(ss_samples)[:, np.newaxis] / ss_samples
+    pts = np.array([p1_world[:], p2_world[:], h1_world[:], h2_world[:]])
+    tans = np.array([p1_ss[:], p2_ss[:], h1_ss[:], h2_ss[:]])
+    p_check_world = bp_curve_eval(pts[0], pts[1], pts[2], pts[3], t)
+    p_tan_ss = bp_curve_derivative(tans[0], tans[1], tans[2], tans[3], t)
+    n1ss = np.stack((p_tan_ss[:, 1], -p_tan_ss[:, 0]), axis=1)
+    n2ss = np.stack((-p_tan_ss[:, 1], p_tan_ss[:, 0]), axis=1)
+    ss_norms = np.stack((n1ss, n2ss), axis=1)
+    p_check_vis = check_visible_batch(item, p_check_world, ss_norms).tolist()
+
     vis_changes = []
     for i in range(ss_samples):
-        t = 1/ss_samples * i
-        p_check_world = mat @ bp_curve_eval(p1,p2,h1,h2,t)
-        p_tan_ss = bp_curve_derivative(p1_ss,p2_ss,h1_ss,h2_ss,t)
-        n1ss = Vector((p_tan_ss.y, -p_tan_ss.x))
-        n2ss = Vector((-p_tan_ss.y, p_tan_ss.x))
-        ss_norms = [n1ss,n2ss]
-        p_check_vis = check_visible(item, p_check_world, ss_norms) # Check the visibility of that point
+        if p_check_vis[i] != last_vis_state:
+            vis_changes.append([last_vis_state,t[i][0]])
 
-        if p_check_vis != last_vis_state:
-            vis_changes.append([last_vis_state,t])
-
-        last_vis_state = p_check_vis
+        last_vis_state = p_check_vis[i]
 
 
     # Subdivide curve at visibility changes
@@ -690,46 +1169,316 @@ def curve_vis_sample(p1,p2,h1,h2,mat,item):
 
 
 def vis_sampling(p1, p2, mat, item,):
-    p1Local = mat @ Vector(p1)
-    p2Local = mat @ Vector(p2)
+    local = np.array([[(p1[0], p1[1], p1[2]), (p2[0], p2[1], p2[2])]], dtype=np.float64)
+    np_mat = np.array(mat, dtype=np.float64)
+    world = local @ np_mat[:3, :3].T + np_mat[:3, 3]
 
-    # Get Screen Space Points
-    p1ss = get_ss_point(p1Local)
-    p2ss = get_ss_point(p2Local)
+    line_segs = vis_sample_segments(local, world, item)[0]
+    line_segs[0][1] = p1
+    line_segs[-1][2] = p2
+    return line_segs
 
-    # Get ss normal vectorsP
-    dir_vec = p1ss - p2ss
-    n1ss = Vector((dir_vec.y, -dir_vec.x))
-    n2ss = Vector((-dir_vec.y, dir_vec.x))
 
-    ss_norms = [n1ss,n2ss]
+def vis_sample_segments(local, world, item):
+    """
+    Samples the depth buffer along a batch of segments.
+
+    local and world are (N,2,3) arrays of segment end points. Each segment is
+    sampled roughly once per screen space pixel by sample_segments(), split
+    over the sampling pool for large batches, and each segment is split where
+    its visibility changes. Returns one line segment list per segment.
+    """
+    global _pass_samples
+    co_cam = world_to_camera_view_batch(world.reshape(-1, 3)).reshape(-1, 2, 3)
+
+    # Segments wholly in front of or behind everything around them are
+    # resolved from the depth pyramid without sampling
+    hiz_vis = classify_segments_hiz(co_cam[..., :2] * (width, height), co_cam[..., 2], item)
+    all_line_segs = [None] * len(local)
+    for i in np.flatnonzero(hiz_vis != HIZ_UNKNOWN):
+        all_line_segs[i] = [[int(hiz_vis[i]), Vector(local[i, 0]), Vector(local[i, 1])]]
+
+    to_sample = np.flatnonzero(hiz_vis == HIZ_UNKNOWN)
+    if len(to_sample) == 0:
+        return all_line_segs
+
+    local = local[to_sample]
+    z_offset = get_z_offset(item)
+    ss = co_cam[to_sample, :, :2] * (width, height)
+    num_samples = segment_sample_counts(ss)
+
+    # The pool is used once the pass has taken enough samples, so many medium
+    # sized line groups use it as well as a few large ones
+    group_samples = num_samples.sum()
+    _pass_samples += group_samples
+    pool = None
+    if group_samples >= POOL_MIN_GROUP_SAMPLES and _pass_samples >= POOL_MIN_SAMPLES:
+        pool = get_sampling_pool()
+    if pool is None:
+        start_vis, change_segs, change_factors, change_vis = sample_segments(
+            world[to_sample], z_offset)
+    else:
+        start_vis, change_segs, change_factors, change_vis = pool_sample_segments(
+            pool, world[to_sample], num_samples, z_offset)
+
+    # Split each segment where its visibility changes
+    change_bounds = np.searchsorted(change_segs, np.arange(len(local) + 1))
+    change_points = local[change_segs, 0] + (
+        local[change_segs, 1] - local[change_segs, 0]) * change_factors[:, np.newaxis]
+
+    start_vis = start_vis.tolist()
+    change_vis = change_vis.tolist()
+    for i in range(len(local)):
+        last_vis_state = start_vis[i]
+        seg_start = Vector(local[i, 0])
+        line_segs = []
+        for change in range(change_bounds[i], change_bounds[i + 1]):
+            p_check = Vector(change_points[change])
+            line_segs.append([last_vis_state, seg_start, p_check])
+            seg_start = p_check
+            last_vis_state = change_vis[change]
+
+        line_segs.append([last_vis_state, seg_start, Vector(local[i, 1])])
+        all_line_segs[to_sample[i]] = line_segs
 
+    return all_line_segs
+
+
+def segment_sample_counts(ss):
     # Length in ss is ~number of pixels. use for num of visibility samples
-    ss_length_vec = p1ss-p2ss
-    ss_samples = math.floor(ss_length_vec.length)
-    if ss_samples < 1: ss_samples = 1
+    ss_samples = np.floor(np.linalg.norm(ss[:, 0] - ss[:, 1], axis=1)).astype(np.int64)
+    ss_samples[ss_samples < 1] = 1
+    return ss_samples
 
-    last_vis_state = check_visible(item, p1Local, ss_norms)
-    line_segs = []
-    seg_start = p1
-    distVector = Vector(p1) - Vector(p2)
-    dist = distVector.length
-    iter_dist = fabs((dist / ss_samples))
-
-    for i in range(1,ss_samples):
-        p_check = interpolate3d(Vector(p1), Vector(p2), iter_dist * i) # interpolate line to get point to check
-        p_check_vis = check_visible(item, mat @ Vector(p_check), ss_norms) # Check the visibility of that point
-
-        if last_vis_state is not p_check_vis:
-            line = [last_vis_state, seg_start, p_check]
-            line_segs.append(line)
-            seg_start = p_check
-            last_vis_state = p_check_vis
 
-    line_segs.append([last_vis_state, seg_start, p2])
+def sample_segments(world, z_offset):
+    """
+    Samples the depth buffer along an (N,2,3) array of world space segments,
+    roughly once per screen space pixel. Only uses module state that
+    set_sampling_state() restores, so it also runs in pool workers.
+    Returns the visibility at each segment start, and the segment index,
+    factor along the segment and new visibility of every change.
+    """
+    num_segs = len(world)
+
+    # Get Screen Space Points
+    ss = world_to_camera_view_batch(world.reshape(-1, 3))[:, :2] * (width, height)
+    ss = ss.reshape(-1, 2, 2)
 
+    # Get ss normal vectors
+    dir_vec = ss[:, 0] - ss[:, 1]
+    ss_norms = np.stack((
+        np.stack((dir_vec[:, 1], -dir_vec[:, 0]), axis=1),
+        np.stack((-dir_vec[:, 1], dir_vec[:, 0]), axis=1)), axis=1)
 
-    return line_segs
+    ss_samples = segment_sample_counts(ss)
+
+    # Flatten all samples of all segments into one array
+    seg_idx = np.repeat(np.arange(num_segs), ss_samples)
+    seg_start_idx = np.cumsum(ss_samples) - ss_samples
+    sample_num = np.arange(len(seg_idx)) - seg_start_idx[seg_idx]
+    factors = sample_num / ss_samples[seg_idx]
+
+    world_samples = world[seg_idx, 0] + (world[seg_idx, 1] - world[seg_idx, 0]) * factors[:, np.newaxis]
+
+    vis = check_visible_batch(None, world_samples, ss_norms[seg_idx], z_offset)
+
+    changes = np.nonzero(vis[1:] != vis[:-1])[0] + 1
+    changes = changes[sample_num[changes] != 0]
+
+    return vis[seg_start_idx], seg_idx[changes], factors[changes], vis[changes]
+
+
+def get_sampling_state():
+    """ The module state sample_segments() needs, sent with every pool task """
+    return {
+        'width': width,
+        'height': height,
+        'near_clip': near_clip,
+        'far_clip': far_clip,
+        'camera_type': camera_type,
+        'projection': projection,
+        'depth_name': _shared_depth.name,
+        'depth_size': true_depthbuffer.size,
+        'depth_dtype': true_depthbuffer.dtype.str,
+    }
+
+
+def set_sampling_state(state):
+    """ Restores the state from get_sampling_state() in a pool worker """
+    global width
+    global height
+    global near_clip
+    global far_clip
+    global camera_type
+    global projection
+    global true_depthbuffer
+    global _shared_depth
+
+    width = state['width']
+    height = state['height']
+    near_clip = state['near_clip']
+    far_clip = state['far_clip']
+    camera_type = state['camera_type']
+    projection = state['projection']
+
+    if _shared_depth is None or _shared_depth.name != state['depth_name']:
+        if _shared_depth is not None:
+            _shared_depth.close()
+        _shared_depth = shared_memory.SharedMemory(name=state['depth_name'])
+    true_depthbuffer = np.ndarray(
+        state['depth_size'], dtype=state['depth_dtype'], buffer=_shared_depth.buf)
+
+
+def sample_segments_task(args):
+    state, world, z_offset = args
+    set_sampling_state(state)
+    return sample_segments(world, z_offset)
+
+
+def get_sampling_pool():
+    """
+    Returns the process pool for depth buffer sampling, started on first
+    use and kept for the session, or None if sampling runs in process.
+    Workers are forked, as spawned workers can't import the add-on
+    without bpy, so the pool isn't used where fork isn't safe. Forking
+    copies only the calling thread of a multi-threaded Blender, so a lock
+    held by another thread (GPU driver, Python threads) at fork time can
+    deadlock a worker. The pool is opt in with the parallel_depth_test
+    scene setting for that reason.
+    """
+    global _sampling_pool
+    if not use_sampling_pool or true_depthbuffer is None:
+        return None
+
+    if _sampling_pool is None:
+        if sys.platform == 'darwin' or 'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        processes = os.cpu_count() or 1
+        if processes < 2:
+            return None
+        # Workers share the resource tracker when it's started before them,
+        # otherwise each would unlink the shared depth buffer when it exits
+        resource_tracker.ensure_running()
+        _sampling_pool = multiprocessing.get_context('fork').Pool(processes)
+        _sampling_pool.size = processes
+
+    return _sampling_pool
+
+
+def share_depthbuffer():
+    """ Copies true_depthbuffer into shared memory once per export """
+    global _shared_depth
+    global _shared_depth_stale
+
+    nbytes = true_depthbuffer.nbytes
+    if _shared_depth is None or _shared_depth.size < nbytes:
+        release_shared_depth()
+        _shared_depth = shared_memory.SharedMemory(create=True, size=nbytes)
+        _shared_depth_stale = True
+
+    if _shared_depth_stale:
+        shared = np.ndarray(true_depthbuffer.shape, dtype=true_depthbuffer.dtype,
+                            buffer=_shared_depth.buf)
+        shared[:] = true_depthbuffer
+        del shared
+        _shared_depth_stale = False
+
+
+def pool_sample_segments(pool, world, num_samples, z_offset):
+    """
+    sample_segments() split over the pool, in chunks with a similar number
+    of samples. Results are merged back in segment order.
+    """
+    share_depthbuffer()
+    state = get_sampling_state()
+
+    num_chunks = min(len(world), pool.size * POOL_CHUNKS_PER_WORKER)
+    sample_ends = np.cumsum(num_samples)
+    bounds = np.searchsorted(
+        sample_ends, np.linspace(0, sample_ends[-1], num_chunks + 1)[1:-1], side='right')
+    bounds = np.unique(np.concatenate(([0], bounds, [len(world)])))
+
+    tasks = [(state, world[start:end], z_offset)
+             for start, end in zip(bounds[:-1], bounds[1:])]
+    results = pool.map(sample_segments_task, tasks)
+
+    start_vis, change_segs, change_factors, change_vis = zip(*results)
+    change_segs = [segs + start for segs, start in zip(change_segs, bounds[:-1])]
+    return (np.concatenate(start_vis), np.concatenate(change_segs),
+            np.concatenate(change_factors), np.concatenate(change_vis))
+
+
+def release_shared_depth():
+    global _shared_depth
+    if _shared_depth is not None:
+        _shared_depth.close()
+        _shared_depth.unlink()
+        _shared_depth = None
+
+
+def close_sampling_pool():
+    """ Stops the sampling pool and frees the shared depth buffer """
+    global _sampling_pool
+    if _sampling_pool is not None:
+        _sampling_pool.terminate()
+        _sampling_pool.join()
+        _sampling_pool = None
+    release_shared_depth()
+
+atexit.register(close_sampling_pool)
+
+
+def classify_segments_hiz(ss, depths, item):
+    """
+    Conservatively classifies segments against the depth pyramid. ss is an
+    (N,2,2) array of screen space end points and depths an (N,2) array of
+    their camera depths. Each segment is checked against the coarsest level
+    where 2x2 texels cover every pixel its samples and adjacent samples
+    read. Returns an int8 array of 1 visible, 0 hidden, or HIZ_UNKNOWN for
+    segments that straddle an occluder and need sampling per pixel.
+    """
+    result = np.full(len(ss), HIZ_UNKNOWN, dtype=np.int8)
+    if depth_pyramid is None or len(ss) == 0:
+        return result
+
+    z_offset = get_z_offset(item)
+
+    # Pixels read by the samples and their adjacent samples, one pixel out
+    x_lo = np.floor(ss[..., 0].min(axis=1) - 1).astype(np.int64)
+    x_hi = np.floor(ss[..., 0].max(axis=1) + 1).astype(np.int64)
+    y_lo = np.floor(ss[..., 1].min(axis=1) - 1).astype(np.int64)
+    y_hi = np.floor(ss[..., 1].max(axis=1) + 1).astype(np.int64)
+
+    # Off screen or clipped segments are classified per sample instead
+    near_depth = depths.min(axis=1)
+    far_depth = depths.max(axis=1)
+    candidates = np.flatnonzero(
+        (x_lo >= 0) & (x_hi < width) & (y_lo >= 0) & (y_hi < height) &
+        (near_depth >= near_clip) & (far_depth <= far_clip))
+    if len(candidates) == 0:
+        return result
+
+    extent = np.maximum(x_hi - x_lo, y_hi - y_lo)[candidates]
+    levels = np.ceil(np.log2(np.maximum(extent, 1))).astype(np.int64)
+    levels = np.minimum(levels, len(depth_pyramid) - 1)
+
+    for level in np.unique(levels):
+        sel = candidates[levels == level]
+        level_min, level_max = depth_pyramid[level]
+        tx = (x_lo[sel] >> level, x_hi[sel] >> level)
+        ty = (y_lo[sel] >> level, y_hi[sel] >> level)
+
+        buffer_near = np.minimum.reduce([level_min[y, x] for y in ty for x in tx])
+        buffer_far = np.maximum.reduce([level_max[y, x] for y in ty for x in tx])
+
+        # The same tests as check_visible_batch(), for the whole segment
+        visible = (buffer_near - (far_depth[sel] - z_offset)) > -DEPTH_EPSILON
+        hidden = (buffer_far - (near_depth[sel] - z_offset)) <= -DEPTH_EPSILON
+        result[sel[visible]] = 1
+        result[sel[hidden & ~visible]] = 0
+
+    return result
 
 
 def clamp(minimum, x, maximum):
@@ -745,55 +1494,75 @@ def get_ss_point(point):
 
     return p1ss
 
+# Batched get_ss_point() for an (N,3) array of world space points
+def get_ss_points(points):
+    return projection.screen(points)
+
 
 def check_visible(item, point, ss_norms):
-    epsilon = 0.0001
-    global width
+    norms = np.array([ss_norms[0][:2], ss_norms[1][:2]], dtype=np.float64)
+    point = np.array([(point[0], point[1], point[2])], dtype=np.float64)
+    pointVisible = check_visible_batch(item, point, norms)[0]
+    if pointVisible == -1:
+        return -1
+    return bool(pointVisible)
+
 
-    #Set Z-offset
+def get_z_offset(item):
     z_offset = 0.0
     if item != None:
         if 'lineDepthOffset' in item:
             z_offset += item.lineDepthOffset / 10
+    return z_offset
 
-    dist = get_camera_z_dist(point)
-    if dist < 0:
-        return -1
 
-    if dist < near_clip or dist > far_clip:
-        return -1
-
-    #Get Render info
-
-    # Get ss_point and adjacent normal points
-    point_ss = get_ss_point(point)
-    ss2 = point_ss + ss_norms[0].normalized()
-    ss3 = point_ss + ss_norms[1].normalized()
-
-    # Get Clip space depth
-    point_clip = get_clip_space_coord(point)
+def check_visible_batch(item, points, ss_norms, z_offset=None):
+    """
+    Classifies an (N,3) array of world space points against the depth buffer.
+    ss_norms holds the two screen space normals used for the adjacent samples,
+    either once (2,2) for all points or per point (N,2,2).
+    Returns an int8 array: 1 visible, 0 hidden, -1 culled.
+    """
+    if z_offset is None:
+        z_offset = get_z_offset(item)
+
+    # Get ss points and clip space depth
+    co_cam = world_to_camera_view_batch(points)
+    point_ss = co_cam[:, :2] * (width, height)
+    dist = co_cam[:, 2]
+
+    culled = (dist < 0) | (dist < near_clip) | (dist > far_clip)
+    if true_depthbuffer is None:
+        return np.where(culled, -1, 1).astype(np.int8)
+
+    # Get adjacent normal points
+    ss_norms = np.asarray(ss_norms, dtype=np.float64)
+    norm_lengths = np.linalg.norm(ss_norms, axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit_norms = np.where(norm_lengths > 0, ss_norms / norm_lengths, 0.0)
+    ss2 = point_ss + unit_norms[..., 0, :]
+    ss3 = point_ss + unit_norms[..., 1, :]
 
-    # Get Depth buffer Pixel Index based on SS Point
-    db_idx1 = int(((width * math.floor(point_ss[1]))+1 + math.floor(point_ss[0])) -1)
-    db_idx2 = int(((width * math.floor(ss2[1]))+1 + math.floor(ss2[0])) -1)
-    db_idx3 = int(((width * math.floor(ss3[1]))+1 + math.floor(ss3[0])) -1)
+    # Get Depth From Clip Space point
+    point_vecdepth = dist - z_offset
 
-    # Get 3 points depths
-    bd1 = get_true_z_at_idx(db_idx1)
-    bd2 = get_true_z_at_idx(db_idx2)
-    bd3 = get_true_z_at_idx(db_idx3)
+    # Check Clip space point against depth buffer value at 3 points
+    pointVisible = np.zeros(len(points), dtype=bool)
+    for ss_point in (point_ss, ss2, ss3):
+        bd = get_true_z_at_ss(ss_point)
+        pointVisible |= (bd - point_vecdepth) > -DEPTH_EPSILON
 
-    # Get Depth From Clip Space point
-    point_vecdepth = (point_clip[2]) - z_offset
+    return np.where(culled, -1, pointVisible).astype(np.int8)
 
-    # Check Clip space point against depth buffer value
-    check1 = (bd1 - point_vecdepth) > -epsilon
-    check2 = (bd2 - point_vecdepth) > -epsilon
-    check3 = (bd3 - point_vecdepth) > -epsilon
 
-    pointVisible = check1 or check2 or check3
+def get_true_z_at_ss(ss_points):
+    # Get Depth Buffer Pixel Index based on SS Point
+    idx = (width * np.floor(ss_points[:, 1]) + np.floor(ss_points[:, 0])).astype(np.int64)
+    in_buffer = (idx >= 0) & (idx < true_depthbuffer.size)
+    depths = np.full(len(idx), true_z_buffer(0.0))
+    depths[in_buffer] = true_depthbuffer[idx[in_buffer]]
+    return depths
 
-    return pointVisible
 
 def get_true_z_at_idx(idx):
     val = get_bufffer_at_idx(idx)
@@ -808,4 +1577,4 @@ def get_bufffer_at_idx(idx):
     except IndexError:
         #print('Index not in Depth Buffer:{}'.format(idx))
         point_depth = 0
-    return point_depth
\ No newline at end of file
+    return point_depth